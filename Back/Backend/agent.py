@@ -0,0 +1,274 @@
+"""
+Lightweight agent: samples this host with the usual sampler and process
+collector (no model, no web server) and ships the ticks to a central
+collector (cluster.py) over one persistent TCP connection.
+
+Ticks are delta-encoded (only the process rows added, changed and removed
+since the previous tick, with a full key tick on every new connection and
+every AGENT_KEYFRAME ticks), batched (AGENT_BATCH_TICKS per message) and
+zlib-compressed. While the collector is unreachable the agent keeps sampling
+and retries with backoff; ticks it cannot deliver are dropped.
+
+Usage (from Back/Backend):
+    python agent.py --collector 10.0.0.5:7070
+    python agent.py --collector 127.0.0.1:7070 --name node --simulate 50
+
+--simulate N opens N connections reporting this host's data under the names
+node-0 ... node-(N-1), to load-test a collector from one machine.
+"""
+# Import required libraries
+import argparse
+import os
+import platform
+import signal
+import socket
+import threading
+import time
+
+from cluster import CLUSTER_TOKEN, PROTOCOL_VERSION, recv_message, send_message
+from governor import SamplingGovernor
+from process_cache import ProcessCache
+from recorder import pack_rows
+from sampler import DEFAULT_INTERVAL, MetricsSampler
+
+# Collector address, "host:port"
+DEFAULT_COLLECTOR = os.environ.get("AGENT_COLLECTOR", "127.0.0.1:7070")
+
+# Ticks per message
+DEFAULT_BATCH_TICKS = int(os.environ.get("AGENT_BATCH_TICKS", "5"))
+
+# Ticks between key ticks (full process tables) on a connection
+DEFAULT_KEYFRAME = int(os.environ.get("AGENT_KEYFRAME", "300"))
+
+# zlib level for messages (1 fastest, 9 smallest)
+DEFAULT_LEVEL = int(os.environ.get("AGENT_LEVEL", "6"))
+
+# Undelivered ticks kept per connection while the collector is unreachable
+MAX_PENDING = 600
+
+# Seconds to wait for a connection or a send; longest pause between reconnects
+CONNECT_TIMEOUT = 5.0
+MAX_BACKOFF = 30.0
+
+
+class Connection:
+    """
+    One persistent connection to the collector, reporting as host `name`.
+    Holds the ticks not sent yet; they always start with a key tick, so
+    the collector can apply them in order whenever they arrive.
+    """
+
+    def __init__(self, address, name, token=CLUSTER_TOKEN, level=DEFAULT_LEVEL):
+        self.address = address
+        self.name = name
+        self.token = token
+        self.level = level
+        self.sock = None
+        self.pending = []
+        self.need_key = True
+        self.since_key = 0
+        self.retry_at = 0.0
+        self.backoff = 1.0
+        self.ticks_sent = 0
+        self.bytes_sent = 0
+        self.connects = 0
+
+    def open(self):
+        """
+        Connect and complete the hello/welcome handshake. Raises on failure.
+        """
+        sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            send_message(sock, {
+                "type": "hello",
+                "version": PROTOCOL_VERSION,
+                "host": self.name,
+                "token": self.token,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            })
+            with sock.makefile("rb") as rfile:
+                reply, _ = recv_message(rfile)
+            if not reply or reply.get("type") != "welcome":
+                raise ConnectionError((reply or {}).get("error", "Collector closed the connection"))
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
+        self.connects += 1
+        self.backoff = 1.0
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def status(self):
+        return {
+            "host": self.name,
+            "connected": self.sock is not None,
+            "connects": self.connects,
+            "ticks_sent": self.ticks_sent,
+            "bytes_sent": self.bytes_sent,
+            "bytes_per_tick": round(self.bytes_sent / self.ticks_sent, 1) if self.ticks_sent else None,
+            "pending": len(self.pending),
+        }
+
+
+class Agent:
+    """
+    Sampler plus a sender thread flushing every connection's pending ticks
+    once per batch. Each tick is encoded once and shared by all connections.
+    """
+
+    def __init__(self, collector=DEFAULT_COLLECTOR, names=None, interval=DEFAULT_INTERVAL,
+                 batch_ticks=DEFAULT_BATCH_TICKS, keyframe=DEFAULT_KEYFRAME, token=CLUSTER_TOKEN,
+                 level=DEFAULT_LEVEL):
+        host, _, port = collector.rpartition(":")
+        address = (host or "127.0.0.1", int(port))
+        self.connections = [Connection(address, name, token, level)
+                            for name in names or [socket.gethostname()]]
+        self.keyframe = keyframe
+        self.flush_interval = interval * batch_ticks
+        self.process_cache = ProcessCache()
+        self.governor = SamplingGovernor(interval=interval)  # Same CPU budget as the app
+        self.sampler = MetricsSampler(process_cache=self.process_cache, interval=interval, governor=self.governor)
+        self.sampler.add_hook(self.record)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sender = None
+
+    def record(self, snapshot, processes=None, changes=None):
+        """
+        Sampler hook: queue this tick on every connection.
+        """
+        key = delta = None
+        with self._lock:
+            if processes is None:
+                # No process refresh this tick: send the metrics only
+                for conn in self.connections:
+                    if not conn.need_key:
+                        conn.pending.append({"metrics": snapshot, "key": False})
+                return
+            for conn in self.connections:
+                if conn.need_key or conn.since_key + 1 >= self.keyframe:
+                    if key is None:
+                        key = {"metrics": snapshot, "key": True, "added": pack_rows(processes)}
+                    if conn.need_key:
+                        conn.pending = []  # Nothing before a key tick can be applied
+                    conn.pending.append(key)
+                    conn.need_key = False
+                    conn.since_key = 0
+                    continue
+                if delta is None:
+                    delta = {
+                        "metrics": snapshot,
+                        "key": False,
+                        "added": pack_rows(changes["added"]),
+                        "changed": pack_rows(changes["changed"]),
+                        "removed": list(changes["removed"]),
+                    }
+                conn.pending.append(delta)
+                conn.since_key += 1
+                if len(conn.pending) > MAX_PENDING:
+                    conn.pending = []
+                    conn.need_key = True
+
+    def flush(self):
+        """
+        Send each connection's pending ticks as one message, connecting first if needed.
+        """
+        now = time.monotonic()
+        for conn in self.connections:
+            if conn.sock is None:
+                if now < conn.retry_at or not conn.pending:
+                    continue
+                try:
+                    conn.open()
+                except Exception as e:
+                    if conn.backoff == 1.0:  # Report the first failure of an outage only
+                        print(f"Cannot reach collector {conn.address[0]}:{conn.address[1]} as {conn.name}: {e}")
+                    conn.retry_at = now + conn.backoff
+                    conn.backoff = min(conn.backoff * 2, MAX_BACKOFF)
+                    continue
+                with self._lock:
+                    # A new connection starts from a key tick
+                    if conn.pending and not conn.pending[0]["key"]:
+                        conn.pending = []
+                        conn.need_key = True
+
+            with self._lock:
+                batch, conn.pending = conn.pending, []
+            if not batch:
+                continue
+            try:
+                conn.bytes_sent += send_message(conn.sock, {"type": "batch", "ticks": batch}, conn.level)
+                conn.ticks_sent += len(batch)
+            except OSError as e:
+                print(f"Lost collector connection for {conn.name}: {e}")
+                conn.close()
+                with self._lock:
+                    # Ticks after the lost batch are deltas the collector cannot apply
+                    conn.pending = []
+                    conn.need_key = True
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error sending to collector: {e}")
+
+    def start(self):
+        self.sampler.start()
+        self._sender = threading.Thread(target=self._run, name="agent-sender", daemon=True)
+        self._sender.start()
+
+    def stop(self):
+        self._stop.set()
+        self.sampler.stop()
+        if self._sender is not None:
+            self._sender.join(timeout=self.flush_interval + CONNECT_TIMEOUT)
+        self.flush()  # Deliver what is left
+        for conn in self.connections:
+            conn.close()
+
+    def status(self):
+        return [conn.status() for conn in self.connections]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ship this host's metrics to a cluster collector.")
+    parser.add_argument("--collector", default=DEFAULT_COLLECTOR, help="collector address, host:port")
+    parser.add_argument("--name", default=socket.gethostname(), help="host name reported to the collector")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between ticks")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_TICKS, help="ticks per message")
+    parser.add_argument("--simulate", type=int, default=0,
+                        help="report as N hosts named NAME-0..NAME-(N-1) (load testing)")
+    parser.add_argument("--report", type=float, default=0, help="print traffic stats every N seconds")
+    args = parser.parse_args()
+
+    names = [f"{args.name}-{i}" for i in range(args.simulate)] if args.simulate else [args.name]
+    agent = Agent(args.collector, names, interval=args.interval, batch_ticks=args.batch)
+    agent.start()
+    print(f"Agent reporting {len(names)} host(s) to {args.collector} every {agent.flush_interval:g}s")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(args.report or None):
+            ticks = sum(c["ticks_sent"] for c in agent.status())
+            sent = sum(c["bytes_sent"] for c in agent.status())
+            print(f"Sent {ticks} ticks in {sent} bytes ({sent / ticks if ticks else 0:.0f} bytes/tick), "
+                  f"sampling at {agent.governor.cpu_fraction():.2%} of a core")
+    except KeyboardInterrupt:
+        pass
+    agent.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
 from flask_cors import CORS
-import psutil
-import joblib
+import json
+import numpy as np
 import os
-from processes_page import live_processes
+import queue
+import time
+from processes_page import live_processes, process_list_api, process_tree_api
+from process_cache import process_cache
+from sampler import DEFAULT_INTERVAL, MetricsSampler, snapshot_age
+from governor import SamplingGovernor
+from history import MetricsHistory
+from response_cache import response_cache
+from model_store import ModelStore, scale_features
+from online_detector import OnlineDetector
+from recorder import DEFAULT_PATH as RECORD_PATH, Recorder
+from cluster import DEFAULT_LISTEN as CLUSTER_LISTEN, ClusterCollector
+import instrumentation
+from instrumentation import timed_stage
 
 # Initialize Flask app with custom static and template folders
 app = Flask(__name__,
@@ -12,24 +25,169 @@ app = Flask(__name__,
 CORS(app)  # Enable CORS for all routes
 
 # Add the live processes route
-app.add_url_rule('/processes', 'live_processes', live_processes)
-
-# Get the directory of the current script
-current_dir = os.path.dirname(os.path.abspath(__file__))
-models_dir = os.path.join(current_dir, 'models')
-
-# Load the trained model and scaler
-try:
-    model_path = os.path.join(models_dir, 'anomaly_detection_model.pkl')
-    scaler_path = os.path.join(models_dir, 'scaler.pkl')
-    
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
-    print("Model and scaler loaded successfully.")
-except Exception as e:
-    print(f"Error loading model or scaler: {e}")
-    print(f"Looking for models in: {models_dir}")
-    exit()
+app.add_url_rule('/processes', 'live_processes', response_cache.cached()(live_processes))
+app.add_url_rule('/api/processes', 'process_list_api', process_list_api)
+app.add_url_rule('/api/process-tree', 'process_tree_api', process_tree_api)
+
+# Models load lazily on first use and hot-swap when the registry's current
+# version changes; cached responses are dropped on every swap
+model_store = ModelStore(on_swap=lambda bundle: response_cache.clear())
+
+# Detection engines: the trained IsolationForest ("forest") or the online
+# detector that learns this host's baseline from live samples ("online").
+# Endpoints take ?engine=; DETECTION_ENGINE sets the default.
+ENGINES = ("forest", "online")
+DEFAULT_ENGINE = os.environ.get("DETECTION_ENGINE", "forest")
+
+# Optional token for the admin endpoints; without it they only answer localhost
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+@timed_stage("model_predict")
+def decision_scores(bundle, scaled):
+    """
+    Model scores for scaled rows; negative means anomaly (the rule predict() applies).
+    """
+    return bundle.detector.decision_function(scaled)
+
+
+def classify(cpu_usage, memory_usage):
+    """
+    Run the scaler and model on one [cpu, memory] reading.
+    """
+    bundle = model_store.get()
+    if bundle is None:
+        return "Unknown"  # No model available yet
+    score = decision_scores(bundle, scale_features(bundle, [[cpu_usage, memory_usage]]))[0]
+    return "Anomaly" if score < 0 else "Normal"
+
+
+def score_processes(bundle, processes):
+    """
+    Score every process in one batch: build a single [cpu, memory] feature
+    matrix, scale it once and run one vectorized decision_function call.
+    Returns (scores, predictions); lower scores are more anomalous.
+    """
+    features = np.array(
+        [[p['cpu_percent'], p['memory_percent']] for p in processes],
+        dtype=float
+    ).reshape(-1, 2)
+    scores = decision_scores(bundle, scale_features(bundle, features))
+    predictions = np.where(scores < 0, -1, 1)  # Same rule predict() applies
+    return scores, predictions
+
+
+def request_engine():
+    """
+    Detection engine named by the ?engine= query parameter.
+    """
+    engine = request.args.get('engine', default=DEFAULT_ENGINE)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose from: {', '.join(ENGINES)}")
+    if engine == "online" and SNAPSHOT_SHM:
+        raise ValueError("The online engine runs in the single-process app only")
+    return engine
+
+
+def apply_engine(snapshot, engine):
+    """
+    The snapshot with its status from `engine` (the sampler classifies with the forest).
+    """
+    if engine == "online":
+        result = online_detector.system_result
+        snapshot["status"] = result["status"] if result else "Unknown"
+    snapshot["engine"] = engine
+    return snapshot
+
+
+def build_suggestions(snapshot):
+    """
+    Suggestions based on anomalies in a metrics snapshot and on what the
+    process tree actually found (zombies, orphans, runaway fork trees).
+    """
+    suggestions = []
+    if snapshot["status"] == "Anomaly":
+        if snapshot["cpu_usage"] > 90:
+            suggestions.append("High CPU usage detected. Close unnecessary applications.")
+        if snapshot["memory_usage"] > 90:
+            suggestions.append("High memory usage detected. Free up memory by closing unused apps.")
+
+    tree = process_cache.tree.summary()
+    for parent in tree["runaway"]:
+        suggestions.append(
+            f"Runaway fork tree under {parent['name']} (PID {parent['pid']}): "
+            f"{parent['births']} processes started recently, {parent['descendants']} still running. "
+            f"Stop the tree's root process."
+        )
+    for parent in tree["zombies"]["parents"][:3]:
+        suggestions.append(
+            f"{len(parent['zombies'])} zombie process(es) waiting on {parent['name']} (PID {parent['pid']}) "
+            f"to reap them. Restart or signal the parent."
+        )
+    if tree["orphans"]:
+        suggestions.append(
+            f"{len(tree['orphans'])} orphaned process(es) were adopted after their parent exited. "
+            f"Check them on the processes page."
+        )
+    return suggestions
+
+
+def sampling_score():
+    """
+    The online detector's latest system score for the sampling governor,
+    or None while it is warming up.
+    """
+    result = online_detector.system_result
+    if result is None or result["warming_up"]:
+        return None
+    return result["score"]
+
+
+# Sample system metrics in the background so requests never block on psutil.
+# Worker processes started by serve.py (SNAPSHOT_SHM set) read the collector
+# process's shared-memory snapshots instead of sampling themselves.
+SNAPSHOT_SHM = os.environ.get("SNAPSHOT_SHM")
+governor = None
+if SNAPSHOT_SHM:
+    from shared_snapshot import SharedMemorySampler
+    sampler = SharedMemorySampler(SNAPSHOT_SHM, process_cache=process_cache)
+else:
+    # Pace sampling under a CPU budget (SAMPLING_BUDGET, share of one core),
+    # refreshing the process table faster while online anomaly scores rise
+    governor = SamplingGovernor(interval=DEFAULT_INTERVAL, score=sampling_score)
+    sampler = MetricsSampler(classify=classify, process_cache=process_cache, governor=governor)
+    # Requests read the governed table instead of refreshing it themselves
+    process_cache.max_age = governor.max_process_interval * 2
+
+# Keep a columnar history of every tick and of the process table every
+# HISTORY_PROCESS_INTERVAL seconds (memory-mapped when HISTORY_PATH is set).
+# Learn every tick with the online detector so ?engine=online is always current.
+# Under serve.py only the collector process does either; workers answer
+# /api/history with 404 and reject ?engine=online.
+history = None
+online_detector = OnlineDetector()
+if not SNAPSHOT_SHM:
+    history = MetricsHistory()
+    sampler.add_hook(history.record)
+    sampler.add_hook(online_detector.record)
+
+# Append every tick to a replayable log when RECORD_PATH is set (see replay.py).
+# Under serve.py only the collector process records.
+recorder = None
+if RECORD_PATH and not SNAPSHOT_SHM:
+    recorder = Recorder(RECORD_PATH)
+    sampler.add_hook(recorder.record)
+if instrumentation.ENABLED:
+    sampler.add_hook(instrumentation.record_tick)
+sampler.start()
+model_store.watch()
+
+# Collect ticks from remote agents (agent.py) when CLUSTER_LISTEN is set.
+# Under serve.py only the collector process listens; workers answer 404.
+cluster = None
+if CLUSTER_LISTEN and not SNAPSHOT_SHM:
+    cluster = ClusterCollector(CLUSTER_LISTEN, model_store=model_store)
+    cluster.start()
 
 # Serve the frontend
 @app.route('/')
@@ -37,54 +195,318 @@ def index():
     return render_template('index.html')
 
 @app.route('/api/anomalies', methods=['GET'])
+@response_cache.cached()
 def get_anomalies():
     """
-    Fetch anomalies detected by the model.
+    Fetch anomalies detected by the model (or ?engine=online).
     """
     try:
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory_usage = psutil.virtual_memory().percent
-
-        scaled_data = scaler.transform([[cpu_usage, memory_usage]])
-        prediction = model.predict(scaled_data)
-        status = "Anomaly" if prediction == -1 else "Normal"
-
-        # Suggestions based on anomalies
-        suggestions = []
-        if status == "Anomaly":
-            if cpu_usage > 90:
-                suggestions.append("High CPU usage detected. Close unnecessary applications.")
-            if memory_usage > 90:
-                suggestions.append("High memory usage detected. Free up memory by closing unused apps.")
-            suggestions.append("Check for zombie or orphan processes and terminate them.")
+        engine = request_engine()
+        snapshot = sampler.latest(timeout=sampler.interval * 2)
+        if snapshot is None:
+            return jsonify({"error": "Metrics not sampled yet"}), 503
 
+        snapshot = apply_engine(snapshot, engine)
         return jsonify({
-            "status": status,
-            "suggestions": suggestions
+            "status": snapshot["status"],
+            "engine": engine,
+            "suggestions": build_suggestions(snapshot),
+            "snapshot_age": snapshot_age(snapshot)
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # API endpoint to fetch real-time system metrics
 @app.route('/api/system-metrics', methods=['GET'])
+@response_cache.cached()
 def get_system_metrics():
     try:
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory_usage = psutil.virtual_memory().percent
-        disk_usage = psutil.disk_usage('/').percent
+        engine = request_engine()
+        snapshot = sampler.latest(timeout=sampler.interval * 2)
+        if snapshot is None:
+            return jsonify({"error": "Metrics not sampled yet"}), 503
+
+        snapshot = apply_engine(snapshot, engine)
+        return jsonify({
+            "cpu_usage": snapshot["cpu_usage"],
+            "memory_usage": snapshot["memory_usage"],
+            "disk_usage": snapshot["disk_usage"],
+            "status": snapshot["status"],
+            "engine": engine,
+            "snapshot_age": snapshot_age(snapshot)
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# API endpoint to rank live processes by anomaly score
+@app.route('/api/process-anomalies', methods=['GET'])
+@response_cache.cached()
+def get_process_anomalies():
+    """
+    Score every live process with the model and return them ranked,
+    most anomalous first. Use ?limit=N to cap the number of rows returned
+    and ?engine=online to rank by the online detector instead.
+    """
+    try:
+        limit = request.args.get('limit', default=50, type=int)
+        engine = request_engine()
+        bundle = model_store.get() if engine == "forest" else None
+        if engine == "forest" and bundle is None:
+            return jsonify({"error": "Model not available"}), 503
+
+        processes = process_cache.processes()
+        if not processes:
+            return jsonify({"total": 0, "anomalies": 0, "processes": []})
+
+        if engine == "online":
+            scores, predictions = online_detector.score_processes(processes)
+        else:
+            scores, predictions = score_processes(bundle, processes)
+        order = np.argsort(scores, kind='stable')
+        if limit is not None and limit >= 0:
+            order = order[:limit]
 
-        scaled_data = scaler.transform([[cpu_usage, memory_usage]])
-        prediction = model.predict(scaled_data)
-        status = "Normal" if prediction == 1 else "Anomaly"
+        ranked = []
+        for i in order:
+            proc = processes[i]
+            ranked.append({
+                "pid": proc['pid'],
+                "name": proc['name'],
+                "cpu_percent": proc['cpu_percent'],
+                "memory_percent": proc['memory_percent'],
+                "status": proc['status'],
+                "anomaly_score": round(float(scores[i]), 6),
+                "verdict": "Anomaly" if predictions[i] == -1 else "Normal"
+            })
 
         return jsonify({
-            "cpu_usage": cpu_usage,
-            "memory_usage": memory_usage,
-            "disk_usage": disk_usage,
-            "status": status
+            "total": len(processes),
+            "anomalies": int((predictions == -1).sum()),
+            "engine": engine,
+            "processes": ranked
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# API endpoint to query recorded history
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """
+    Return a metric's history downsampled on the server.
+    Query parameters: metric (cpu_usage, memory_usage, disk_usage,
+    process.cpu_percent, process.memory_percent), from/to (epoch seconds;
+    negative values are relative to now), step (bucket size in seconds)
+    and, for process metrics, pid or name.
+    """
+    if history is None:
+        return jsonify({"error": "History is kept by the collector process"}), 404
+    try:
+        now = time.time()
+        start = request.args.get('from', type=float)
+        end = request.args.get('to', type=float)
+        if start is not None and start < 0:
+            start += now
+        if end is not None and end < 0:
+            end += now
+
+        data = history.query(
+            request.args.get('metric', default='cpu_usage'),
+            start=start,
+            end=end,
+            step=request.args.get('step', type=float),
+            pid=request.args.get('pid', type=int),
+            name=request.args.get('name')
+        )
+        return jsonify(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# API endpoint to inspect the response cache
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
+# API endpoint to inspect the loaded model and the online detector
+@app.route('/api/model', methods=['GET'])
+def get_model_status():
+    status = model_store.status()
+    status["online"] = online_detector.status()
+    return jsonify(status)
+
+# API endpoint to check sampling cost against the CPU budget
+@app.route('/api/sampling', methods=['GET'])
+def get_sampling_status():
+    if governor is None:
+        return jsonify({"error": "Sampling is governed by the collector process"}), 404
+    return jsonify(governor.status())
+
+# Admin endpoint to load a model version without restarting
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_model():
+    """
+    Load the registry's current model (or {"version": "vNNNN"}) and swap it in.
+    Requests keep being served by the old model until the new one is ready.
+    Needs the X-Admin-Token header when ADMIN_TOKEN is set, else a local client.
+    """
+    if ADMIN_TOKEN is not None:
+        if request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+            return jsonify({"error": "Forbidden"}), 403
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({"error": "Forbidden"}), 403
+
+    try:
+        version = (request.get_json(silent=True) or {}).get('version')
+        loaded = model_store.reload(version)
+        return jsonify({"version": loaded})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def cluster_required():
+    """
+    Error response for the cluster endpoints when cluster mode is off, else None.
+    """
+    if cluster is None:
+        return jsonify({"error": "Cluster collector is not enabled (set CLUSTER_LISTEN)"}), 404
+    return None
+
+# API endpoint summarizing every host reporting to this collector
+@app.route('/api/cluster', methods=['GET'])
+def get_cluster():
+    error = cluster_required()
+    if error:
+        return error
+    try:
+        status = cluster.status()
+        status["hosts"] = cluster.view.host_summaries()
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# API endpoint with one host's metrics and most anomalous processes
+@app.route('/api/cluster/hosts/<name>', methods=['GET'])
+def get_cluster_host(name):
+    error = cluster_required()
+    if error:
+        return error
+    try:
+        return jsonify(cluster.view.host(name, limit=request.args.get('limit', default=20, type=int)))
+    except KeyError:
+        return jsonify({"error": f"Unknown host '{name}'"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# API endpoint ranking processes across all hosts
+@app.route('/api/cluster/processes', methods=['GET'])
+def get_cluster_processes():
+    """
+    Processes from every host (or ?host=), ranked by ?sort=score (most
+    anomalous first), cpu or memory. ?name= finds a process name on all
+    hosts through the index, ?anomalies=1 keeps only anomalous rows and
+    ?engine=online uses the per-host online detectors (CLUSTER_ONLINE=1).
+    """
+    error = cluster_required()
+    if error:
+        return error
+    try:
+        host = request.args.get('host')
+        rows = cluster.view.processes(
+            host=host,
+            name=request.args.get('name') or None,
+            sort=request.args.get('sort', default='score'),
+            limit=request.args.get('limit', default=50, type=int),
+            anomalies=request.args.get('anomalies', default=0, type=int) == 1,
+            engine=request_engine()
+        )
+        return jsonify({"count": len(rows), "processes": rows})
+    except KeyError:
+        return jsonify({"error": f"Unknown host '{host}'"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def sse_event(event, data):
+    """
+    Format one Server-Sent Events message.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Server-Sent Events stream of metric snapshots and process-table changes
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """
+    Push every sampler tick to the client as it happens.
+    All clients share the background sampler, so no client triggers sampling.
+    Add ?processes=1 to also receive the process table: a full `snapshot`
+    event first, then only added/removed/changed rows on each `tick` event.
+    """
+    include_processes = request.args.get('processes', default=0, type=int) == 1
+
+    def metrics_payload(snapshot):
+        payload = dict(snapshot)
+        payload["suggestions"] = build_suggestions(snapshot)
+        payload["snapshot_age"] = snapshot_age(snapshot)
+        return payload
+
+    def full_snapshot():
+        snapshot = sampler.latest(timeout=sampler.interval * 2)
+        data = {"tick": sampler.ticks}
+        if snapshot is not None:
+            data["metrics"] = metrics_payload(snapshot)
+        if include_processes:
+            data["processes"] = process_cache.processes()
+            data["tree"] = process_cache.tree.flags()
+        return data
+
+    def generate():
+        listener = sampler.subscribe()
+        try:
+            first = full_snapshot()
+            last_tick = first["tick"]
+            yield sse_event("snapshot", first)
+            while True:
+                try:
+                    event = listener.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event["tick"] <= last_tick:
+                    continue  # Already covered by the initial snapshot
+                if include_processes and event["tick"] != last_tick + 1:
+                    # Ticks were dropped for this client: resend the full table
+                    data = full_snapshot()
+                    last_tick = max(data["tick"], event["tick"])
+                    yield sse_event("snapshot", data)
+                    continue
+
+                last_tick = event["tick"]
+                data = {"tick": event["tick"], "metrics": metrics_payload(event["metrics"])}
+                if include_processes:
+                    data["processes"] = event["processes"]
+                    data["tree"] = process_cache.tree.flags()
+                yield sse_event("tick", data)
+        finally:
+            sampler.unsubscribe(listener)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
+
+# Prometheus metrics about the analyzer itself (off with METRICS_ENABLED=0)
+if instrumentation.ENABLED:
+    app.add_url_rule('/metrics', 'metrics', instrumentation.metrics_view)
+    instrumentation.instrument_routes(app)
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
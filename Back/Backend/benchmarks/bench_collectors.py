@@ -0,0 +1,81 @@
+"""
+Benchmark the process collector backends (psutil vs /proc reader).
+
+Usage (from Back/Backend):
+    python benchmarks/bench_collectors.py --spawn 3000 --rounds 20
+"""
+# Import required libraries
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collectors import ProcfsCollector, PsutilCollector  # noqa: E402
+
+
+def spawn_processes(count):
+    """
+    Start `count` idle child processes so the host has a realistic process count.
+    """
+    children = []
+    for _ in range(count):
+        children.append(subprocess.Popen(["sleep", "3600"], stdin=subprocess.DEVNULL,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    return children
+
+
+def time_collector(collector, rounds):
+    """
+    Time `rounds` ticks of a collector (after one warm-up tick).
+    Returns per-tick timings in milliseconds and the last tick's row count.
+    """
+    collector.collect()  # Warm-up: first tick builds handles / baselines
+    timings = []
+    rows = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = collector.collect()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "processes": len(rows),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def run(spawn=0, rounds=20):
+    """
+    Compare both backends on the current host, optionally after spawning
+    `spawn` idle processes. Returns a dict of results.
+    """
+    children = spawn_processes(spawn) if spawn else []
+    try:
+        results = {"spawned": spawn, "rounds": rounds}
+        results["psutil"] = time_collector(PsutilCollector(), rounds)
+        if sys.platform.startswith("linux"):
+            results["procfs"] = time_collector(ProcfsCollector(), rounds)
+            results["speedup"] = round(results["psutil"]["mean_ms"] / results["procfs"]["mean_ms"], 2)
+        return results
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--spawn", type=int, default=0, help="idle processes to start before measuring")
+    parser.add_argument("--rounds", type=int, default=20, help="ticks timed per backend")
+    args = parser.parse_args()
+    print(json.dumps(run(args.spawn, args.rounds), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Measure API endpoint latency and throughput under concurrent load.
+
+Usage (from Back/Backend):
+    python benchmarks/bench_endpoints.py --concurrency 1 8 --requests 200
+    python benchmarks/bench_endpoints.py --url http://127.0.0.1:5000
+
+Without --url the app is imported and driven through Flask test clients
+(one per thread, background sampler running); with --url a running server
+is called over HTTP.
+
+Every endpoint is measured twice: "bypass" gives each request a unique
+query string, so none is served from the response cache, and "warm" repeats
+the same URL, so most requests are cache hits. In-process runs also report
+the warm run's cache hits and misses.
+"""
+# Import required libraries
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_ENDPOINTS = [
+    "/api/system-metrics",
+    "/api/anomalies",
+    "/api/process-anomalies?limit=50",
+    "/api/processes",
+    "/processes",
+    "/api/history?metric=cpu_usage&from=-60",
+]
+
+# Response cache use measured per endpoint
+CACHE_MODES = ("bypass", "warm")
+
+# Suffixes making bypass URLs unique across the whole run
+_unique = itertools.count()
+
+
+def make_getter(url=None):
+    """
+    A function path -> status code, backed by a test client or by HTTP.
+    Test clients are created per thread.
+    """
+    if url:
+        def get(path):
+            try:
+                with urllib.request.urlopen(url.rstrip("/") + path, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        get.cache_stats = None  # The server's cache is not visible from here
+        return get
+
+    import app
+    local = threading.local()
+    # Let the sampler take its first reading before measuring
+    app.sampler.latest(timeout=app.sampler.interval * 3)
+
+    def get(path):
+        if not hasattr(local, "client"):
+            local.client = app.app.test_client()
+        response = local.client.get(path)
+        response.get_data()
+        return response.status_code
+    get.cache_stats = app.response_cache.stats
+    return get
+
+
+def load_test(get, path, concurrency, requests, cache="warm"):
+    """
+    Issue `requests` GETs for `path` from `concurrency` threads, bypassing
+    the response cache when `cache` is "bypass".
+    Returns latency percentiles (ms), throughput and error count.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_thread = max(1, requests // concurrency)
+    separator = "&" if "?" in path else "?"
+    before = get.cache_stats() if get.cache_stats else None
+
+    def worker():
+        local_latencies, local_errors = [], 0
+        for _ in range(per_thread):
+            url = f"{path}{separator}_bench={next(_unique)}" if cache == "bypass" else path
+            start = time.perf_counter()
+            status = get(url)
+            local_latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3)
+
+    result = {
+        "path": path,
+        "cache": cache,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+    }
+    if before is not None:
+        after = get.cache_stats()
+        result["cache_hits"] = after["hits"] + after["coalesced"] - before["hits"] - before["coalesced"]
+        result["cache_misses"] = after["misses"] - before["misses"]
+    return result
+
+
+def run(endpoints=DEFAULT_ENDPOINTS, concurrency=(1, 8), requests=200, url=None):
+    """
+    Load-test every endpoint at every concurrency level. Returns a dict of results.
+    """
+    get = make_getter(url)
+    for path in endpoints:
+        get(path)  # Warm-up: first calls load the model and compile templates
+    results = {"target": url or "test_client", "endpoints": []}
+    for path in endpoints:
+        for cache in CACHE_MODES:
+            for level in concurrency:
+                results["endpoints"].append(load_test(get, path, level, requests, cache))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running server (default: in-process test client)")
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency level")
+    args = parser.parse_args()
+    print(json.dumps(run(args.endpoints, args.concurrency, args.requests, args.url), indent=2))
+
+
+if __name__ == "__main__":
+    main()
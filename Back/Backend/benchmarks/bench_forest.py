@@ -0,0 +1,108 @@
+"""
+Check the flattened IsolationForest against sklearn and compare their speed.
+
+Usage (from Back/Backend):
+    python benchmarks/bench_forest.py --batch-sizes 1 100 10000
+
+Exits with status 1 if decision_function or predict disagree with sklearn.
+"""
+# Import required libraries
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fast_forest import FlatIsolationForest, check_parity  # noqa: E402
+
+DEFAULT_MODEL = os.path.join(BACKEND_DIR, "models", "anomaly_detection_model.pkl")
+
+# decision_function differences above this count as a parity failure
+TOLERANCE = 1e-9
+
+
+def parity_inputs(forest, n_random, seed=0):
+    """
+    Random rows around the training range plus rows sitting exactly on split
+    thresholds, where an off-by-one comparison would send a row the wrong way.
+    """
+    rng = np.random.default_rng(seed)
+    random_rows = rng.uniform(-0.5, 1.5, size=(n_random, forest.n_features_in_))
+    on_threshold = np.repeat(forest.threshold[:, None], forest.n_features_in_, axis=1)
+    return np.vstack([random_rows, on_threshold.astype(np.float32)])
+
+
+def time_call(fn, X, min_time=0.5):
+    """
+    Call fn(X) repeatedly for at least `min_time` seconds; return seconds per call.
+    """
+    fn(X)  # Warm-up
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def run(model_path=DEFAULT_MODEL, batch_sizes=(1, 100, 10000), min_time=0.5):
+    """
+    Run the parity check and the latency/throughput comparison.
+    Returns a dict of results.
+    """
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    model = joblib.load(model_path)
+
+    start = time.perf_counter()
+    forest = FlatIsolationForest.from_sklearn(model)
+    flatten_ms = (time.perf_counter() - start) * 1000
+
+    max_diff, labels_match = check_parity(model, forest, parity_inputs(forest, 20000))
+    results = {
+        "flatten_ms": round(flatten_ms, 2),
+        "lookup_table": forest.lookup is not None,
+        "parity": {"max_abs_diff": max_diff, "labels_match": labels_match,
+                   "ok": labels_match and max_diff <= TOLERANCE},
+        "batches": [],
+    }
+
+    rng = np.random.default_rng(1)
+    for size in batch_sizes:
+        X = rng.uniform(0, 1, size=(size, forest.n_features_in_))
+        sklearn_s = time_call(model.decision_function, X, min_time)
+        flat_s = time_call(forest.decision_function, X, min_time)
+        results["batches"].append({
+            "batch_size": size,
+            "sklearn_latency_ms": round(sklearn_s * 1000, 4),
+            "flat_latency_ms": round(flat_s * 1000, 4),
+            "sklearn_rows_per_s": round(size / sklearn_s),
+            "flat_rows_per_s": round(size / flat_s),
+            "speedup": round(sklearn_s / flat_s, 2),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="path to a fitted IsolationForest .pkl")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent timing each case")
+    args = parser.parse_args()
+
+    results = run(args.model, args.batch_sizes, args.min_time)
+    print(json.dumps(results, indent=2))
+    if not results["parity"]["ok"]:
+        print("Parity check FAILED", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
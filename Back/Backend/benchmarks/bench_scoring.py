@@ -0,0 +1,61 @@
+"""
+Measure the API's scoring path (scaler + detector) at several batch sizes.
+
+Usage (from Back/Backend):
+    python benchmarks/bench_scoring.py --batch-sizes 1 100 1000 10000
+
+Scores through model_store exactly as app.py does, with the flattened
+forest and with the sklearn model (FAST_FOREST=0) for comparison.
+"""
+# Import required libraries
+import argparse
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_forest import time_call  # noqa: E402
+from model_store import ModelStore, scale_features  # noqa: E402
+
+
+def run(batch_sizes=(1, 100, 1000, 10000), min_time=0.5):
+    """
+    Time scale_features + decision_function per batch size for both detectors.
+    Returns a dict of results.
+    """
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    bundles = {"flat": ModelStore(fast=True).get(), "sklearn": ModelStore(fast=False).get()}
+    if bundles["flat"] is None or bundles["sklearn"] is None:
+        raise RuntimeError("No model available to benchmark")
+
+    rng = np.random.default_rng(0)
+    results = {"model_version": bundles["flat"].version, "batches": []}
+    for size in batch_sizes:
+        # Raw [cpu %, memory %] readings, as the sampler produces them
+        features = rng.uniform(0, 100, size=(size, 2))
+        entry = {"batch_size": size}
+        for name, bundle in bundles.items():
+            seconds = time_call(
+                lambda X, b=bundle: b.detector.decision_function(scale_features(b, X)), features, min_time
+            )
+            entry[f"{name}_latency_ms"] = round(seconds * 1000, 4)
+            entry[f"{name}_rows_per_s"] = round(size / seconds)
+        results["batches"].append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent timing each case")
+    args = parser.parse_args()
+    print(json.dumps(run(args.batch_sizes, args.min_time), indent=2))
+
+
+if __name__ == "__main__":
+    main()
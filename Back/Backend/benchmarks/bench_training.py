@@ -0,0 +1,98 @@
+"""
+Measure the chunked training pipeline: rows per second and peak RSS by dataset size.
+
+Usage (from Back/Backend):
+    python benchmarks/bench_training.py --rows 1000000 10000000
+
+Each size runs in its own subprocess so peak RSS is measured per run.
+"""
+# Import required libraries
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def write_dataset(path, rows, chunk_rows=1_000_000, seed=0):
+    """
+    Write a synthetic CSV with the generator's columns, one chunk at a time.
+    """
+    rng = np.random.default_rng(seed)
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        pd.DataFrame({
+            "timestamp": written + np.arange(n),
+            "process_name": rng.choice(["chrome.exe", "explorer.exe", "game.exe"], size=n),
+            "cpu_usage": rng.uniform(0, 150, size=n),
+            "memory_usage": rng.uniform(0, 150, size=n),
+            "disk_usage": rng.uniform(0, 50, size=n),
+            "process_state": rng.choice(["Running", "Sleeping", "Zombie"], size=n),
+            "label": rng.choice([-1.0, 1.0], size=n),
+        }).to_csv(path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        written += n
+
+
+def measure(path, chunksize, sample_size):
+    """
+    Run preprocessing and training on one file; called in a fresh subprocess.
+    """
+    import model as trainer
+
+    start = time.perf_counter()
+    df, scaler, stats = trainer.preprocess_stream(path, chunksize=chunksize, sample_size=sample_size)
+    X_train, X_test, y_train, y_test = trainer.split_data(df)
+    trainer.train_model(X_train)
+    stats["total_seconds"] = round(time.perf_counter() - start, 2)
+    stats["peak_rss_mb"] = trainer.peak_rss_mb()
+    return stats
+
+
+def run(sizes=(1_000_000, 10_000_000), chunksize=100_000, sample_size=200_000):
+    """
+    Generate each dataset size and measure it in a subprocess. Returns a list of results.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"bench_{rows}.csv")
+            write_dataset(path, rows)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", path,
+                 "--chunksize", str(chunksize), "--sample-size", str(sample_size)],
+                cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            stats["file_mb"] = round(os.path.getsize(path) / 1024 / 1024, 1)
+            results.append(stats)
+            os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--sample-size", type=int, default=200_000)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)  # Internal: measure one file
+    args = parser.parse_args()
+
+    if args.measure:
+        import warnings
+        warnings.filterwarnings("ignore")
+        print(json.dumps(measure(args.measure, args.chunksize, args.sample_size)))
+        return
+    print(json.dumps(run(args.rows, args.chunksize, args.sample_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
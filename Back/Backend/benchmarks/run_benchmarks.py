@@ -0,0 +1,165 @@
+"""
+Run the whole benchmark suite and store the results as JSON.
+
+Usage (from Back/Backend):
+    python benchmarks/run_benchmarks.py                       # full run
+    python benchmarks/run_benchmarks.py --quick               # smaller sizes
+    python benchmarks/run_benchmarks.py --only scoring endpoints
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+Covers process enumeration at N spawned processes, the scaler + predict path,
+forest parity, training throughput by dataset size and endpoint latency under
+concurrent load. With --compare, every timing that got worse than the baseline
+by more than --threshold is reported and the exit status is 1.
+"""
+# Import required libraries
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import bench_collectors  # noqa: E402
+import bench_endpoints  # noqa: E402
+import bench_forest  # noqa: E402
+import bench_scoring  # noqa: E402
+import bench_training  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Sizes per suite: (full, quick)
+SUITES = {
+    "collectors": (lambda q: bench_collectors.run(spawn=200 if q else 2000, rounds=5 if q else 20)),
+    "scoring": (lambda q: bench_scoring.run(batch_sizes=(1, 100, 1000, 10000), min_time=0.2 if q else 0.5)),
+    "forest": (lambda q: bench_forest.run(batch_sizes=(1, 100, 10000), min_time=0.2 if q else 0.5)),
+    "training": (lambda q: bench_training.run(sizes=(100_000, 1_000_000) if q else (1_000_000, 10_000_000))),
+    "endpoints": (lambda q: bench_endpoints.run(concurrency=(1, 8), requests=50 if q else 200)),
+}
+
+# Keys identifying an entry in a list of results (batch sizes, endpoints, ...)
+IDENTITY_KEYS = ("path", "cache", "concurrency", "batch_size", "rows")
+
+
+def environment():
+    """
+    Where and on what code the benchmarks ran.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def flatten(results, prefix=""):
+    """
+    Flatten nested results into {"suite.batches[batch_size=100].flat_latency_ms": value}.
+    """
+    flat = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(results, list):
+        for i, item in enumerate(results):
+            identity = ",".join(f"{k}={item[k]}" for k in IDENTITY_KEYS if isinstance(item, dict) and k in item)
+            flat.update(flatten(item, f"{prefix}[{identity or i}]"))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        flat[prefix] = results
+    return flat
+
+
+def direction(metric):
+    """
+    1 if a bigger value is better, -1 if smaller is better, 0 if not compared.
+    """
+    name = metric.rsplit(".", 1)[-1]
+    if "per_s" in name or name == "speedup":
+        return 1
+    if name.endswith("_ms") or name.endswith("seconds") or name == "peak_rss_mb":
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Metrics that are worse than the baseline by more than `threshold` (a fraction).
+    Returns a list of {metric, baseline, current, change}.
+    """
+    old, new = flatten(baseline.get("results", {})), flatten(current.get("results", {}))
+    regressions = []
+    for metric, before in old.items():
+        better = direction(metric)
+        after = new.get(metric)
+        if not better or after is None or before == 0:
+            continue
+        change = (after - before) / abs(before)
+        if change * better < -threshold:
+            regressions.append({"metric": metric, "baseline": before, "current": after,
+                                "change": f"{change:+.1%}"})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), help="suites to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast check")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fractional slowdown counted as a regression (default 0.1)")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    report = {"environment": environment(), "quick": args.quick, "results": {}}
+    for name in args.only or SUITES:
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        start = time.perf_counter()
+        try:
+            report["results"][name] = SUITES[name](args.quick)
+        except Exception as e:
+            # Record the failure and keep going with the other suites
+            report["results"][name] = {"error": str(e)}
+            print(f"Error in {name} benchmarks: {e}", file=sys.stderr)
+        print(f"  done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    # Compare before saving, so the results file records the regressions too
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        report["regressions"] = regressions
+        for item in regressions:
+            print(f"REGRESSION {item['metric']}: {item['baseline']} -> {item['current']} ({item['change']})",
+                  file=sys.stderr)
+        if not regressions:
+            print("No regressions against the baseline.", file=sys.stderr)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    if args.compare and report["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,601 @@
+"""
+Central collector for many hosts: agents (agent.py) keep one TCP connection
+open and push batches of ticks; the collector merges every host into one
+indexed view and scores all of them in shared batches.
+
+Enable it in the app with CLUSTER_LISTEN=0.0.0.0:7070, then start agents:
+    python agent.py --collector 127.0.0.1:7070
+    python agent.py --collector 127.0.0.1:7070 --name node --simulate 50   # Load test
+
+Wire format: each message is a 4-byte big-endian length followed by a
+zlib-compressed JSON object. An agent opens with {"type": "hello", "host",
+"token", ...} and the collector answers {"type": "welcome"} or closes the
+connection. Then the agent sends {"type": "batch", "ticks": [...]}, one entry
+per sampler tick: {"metrics", "key", "added", "changed", "removed"}, process
+rows column-wise as in recorder.py. A key tick carries the whole process
+table; the others only what changed since the previous tick. JSON (not
+pickle) keeps a hostile peer from running code on the collector, and every
+message is size-checked before and while it is inflated.
+"""
+# Import required libraries
+import heapq
+import hmac
+import json
+import math
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from model_store import scale_features
+from online_detector import SYSTEM_METRICS, OnlineDetector
+from process_cache import diff_rows
+from recorder import ROW_FIELDS, unpack_rows
+
+# Protocol version sent in the hello message
+PROTOCOL_VERSION = 1
+
+# Address the collector listens on, "host:port" (cluster mode is off when unset)
+DEFAULT_LISTEN = os.environ.get("CLUSTER_LISTEN") or None
+
+# Shared secret agents must present (no check when unset)
+CLUSTER_TOKEN = os.environ.get("CLUSTER_TOKEN") or None
+
+# Seconds between batched scoring passes over all hosts
+SCORE_INTERVAL = float(os.environ.get("CLUSTER_SCORE_INTERVAL", "2.0"))
+
+# Seconds after which a disconnected host is dropped from the view
+HOST_EXPIRY = float(os.environ.get("CLUSTER_HOST_EXPIRY", "300"))
+
+# Seconds an agent may stay silent before its connection is dropped (well
+# above the agent's flush interval); the handshake gets HELLO_TIMEOUT
+READ_TIMEOUT = float(os.environ.get("CLUSTER_READ_TIMEOUT", "120"))
+HELLO_TIMEOUT = 10.0
+
+# Run an OnlineDetector per host (costs CPU per host and tick; off by default)
+ONLINE_PER_HOST = os.environ.get("CLUSTER_ONLINE", "0") == "1"
+
+MESSAGE_HEADER = struct.Struct("!I")
+MAX_MESSAGE = 64 * 1024 * 1024  # Compressed bytes accepted in one message
+MAX_DECOMPRESSED = 256 * 1024 * 1024  # JSON bytes one message may inflate to
+MAX_HELLO = 64 * 1024  # Limit for the handshake, read before the token is checked
+
+
+def encode_message(message, level=6):
+    payload = zlib.compress(json.dumps(message, separators=(",", ":")).encode(), level)
+    return MESSAGE_HEADER.pack(len(payload)) + payload
+
+
+def send_message(sock, message, level=6):
+    """
+    Send one message; returns the number of bytes put on the wire.
+    """
+    data = encode_message(message, level)
+    sock.sendall(data)
+    return len(data)
+
+
+def recv_message(rfile, limit=MAX_DECOMPRESSED):
+    """
+    Read one message from a binary file object; None at a clean end of stream.
+    Returns (message, wire bytes). Messages over MAX_MESSAGE bytes on the wire
+    or `limit` bytes once inflated raise ValueError before they are parsed.
+    """
+    header = rfile.read(MESSAGE_HEADER.size)
+    if not header:
+        return None, 0
+    if len(header) < MESSAGE_HEADER.size:
+        raise ConnectionError("Connection closed mid-message")
+    length = MESSAGE_HEADER.unpack(header)[0]
+    if length > min(MAX_MESSAGE, limit):
+        raise ValueError(f"Message of {length} bytes exceeds the {min(MAX_MESSAGE, limit)}-byte limit")
+    payload = rfile.read(length)
+    if len(payload) < length:
+        raise ConnectionError("Connection closed mid-message")
+    # Inflate at most `limit` bytes, so a small zlib bomb cannot exhaust memory
+    inflater = zlib.decompressobj()
+    data = inflater.decompress(payload, limit)
+    if inflater.unconsumed_tail:
+        raise ValueError(f"Message inflates past the {limit}-byte limit")
+    return json.loads(data), MESSAGE_HEADER.size + length
+
+
+def _number(value):
+    return type(value) in (int, float) and math.isfinite(value)
+
+
+def _check_rows(columns, part):
+    """
+    Raise ValueError unless `columns` are process rows the view can index and score.
+    """
+    if not isinstance(columns, dict) or not all(isinstance(c, list) for c in columns.values()):
+        raise ValueError(f"Tick '{part}' must map fields to lists")
+    if len({len(c) for c in columns.values()}) > 1:
+        raise ValueError(f"Tick '{part}' columns differ in length")
+    for field in ROW_FIELDS:
+        if field not in columns:
+            raise ValueError(f"Tick '{part}' has no '{field}' column")
+    if not all(type(pid) is int for field in ("pid", "ppid") for pid in columns[field]):
+        raise ValueError(f"Tick '{part}' has a pid or ppid that is not an integer")
+    if not all(isinstance(name, str) for name in columns["name"]):
+        raise ValueError(f"Tick '{part}' has a name that is not a string")
+    if not all(status is None or isinstance(status, str) for status in columns["status"]):
+        raise ValueError(f"Tick '{part}' has a status that is not a string")
+    if not all(_number(v) for field in ("cpu_percent", "memory_percent", "create_time") for v in columns[field]):
+        raise ValueError(f"Tick '{part}' has a CPU, memory or start time that is not a number")
+    if len(set(columns["pid"])) < len(columns["pid"]):
+        raise ValueError(f"Tick '{part}' lists a pid twice")
+
+
+def check_tick(tick):
+    """
+    Raise ValueError unless `tick` can be applied and scored. Ticks come from
+    the network, so one malformed tick must not reach the shared scoring pass.
+    """
+    if not isinstance(tick, dict) or not isinstance(tick.get("metrics"), dict):
+        raise ValueError("Tick without metrics")
+    for metric in SYSTEM_METRICS:
+        if not _number(tick["metrics"].get(metric)):
+            raise ValueError(f"Tick metric '{metric}' is not a number")
+    if tick.get("key"):
+        _check_rows(tick.get("added"), "added")
+    elif "added" in tick:
+        _check_rows(tick["added"], "added")
+        _check_rows(tick.get("changed"), "changed")
+        removed = tick.get("removed")
+        if not isinstance(removed, list) or not all(type(pid) is int for pid in removed):
+            raise ValueError("Tick 'removed' must be a list of pids")
+
+
+class HostState:
+    """
+    Everything the collector knows about one host.
+    """
+
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info  # The agent's hello message (cpu_count, platform, ...)
+        self.connection = None  # Id of the connection currently feeding this host
+        self.connected_at = time.time()
+        self.last_seen = None
+        self.metrics = None  # Latest system snapshot
+        self.table = None  # pid -> row; None until the first key tick
+        self.synced = False  # Deltas apply only after this connection's first key tick
+        self.ticks = 0
+        self.bytes_received = 0
+        self.dirty = False  # Changed since the last scoring pass
+
+        # Results of the last scoring pass, aligned with scored_rows
+        self.scored_rows = []
+        self.scores = np.zeros(0)
+        self.system_score = None
+        cpu_count = info.get("cpu_count")
+        if type(cpu_count) is not int or cpu_count < 1:
+            cpu_count = None  # Fall back to the collector's own count
+        self.online = OnlineDetector(cpu_count=cpu_count) if ONLINE_PER_HOST else None
+        self.online_lock = threading.Lock()
+
+    def summary(self):
+        metrics = self.metrics or {}
+        scored = self.scores
+        return {
+            "host": self.name,
+            "connected": self.connection is not None,
+            "last_seen": self.last_seen,
+            "ticks": self.ticks,
+            "bytes_received": self.bytes_received,
+            "process_count": len(self.table) if self.table is not None else 0,
+            "cpu_usage": metrics.get("cpu_usage"),
+            "memory_usage": metrics.get("memory_usage"),
+            "disk_usage": metrics.get("disk_usage"),
+            "status": self.status(),
+            "anomaly_score": self.system_score,
+            "process_anomalies": int((scored < 0).sum()),
+            "platform": self.info.get("platform"),
+            "cpu_count": self.info.get("cpu_count"),
+        }
+
+    def status(self):
+        if self.system_score is None:
+            return "Unknown"
+        return "Anomaly" if self.system_score < 0 else "Normal"
+
+
+class ClusterView:
+    """
+    Merged view of every connected host: the latest metrics and process table
+    per host (updated from each tick's delta) and a name index over all of
+    them, so "where does X run" does not scan every table.
+    """
+
+    def __init__(self):
+        self.hosts = {}  # name -> HostState
+        self.by_name = {}  # process name -> set of (host, pid)
+        self._lock = threading.Lock()
+        self._connections = 0
+
+    def connect(self, name, info):
+        """
+        Register a connection for host `name` and return its id.
+        A newer connection for the same host replaces the older one.
+        """
+        with self._lock:
+            self._connections += 1
+            host = self.hosts.get(name)
+            if host is None:
+                host = self.hosts[name] = HostState(name, info)
+            host.info = info
+            host.connection = self._connections
+            host.connected_at = time.time()
+            host.synced = False
+            return self._connections
+
+    def disconnect(self, name, connection):
+        with self._lock:
+            host = self.hosts.get(name)
+            if host is not None and host.connection == connection:
+                host.connection = None
+
+    def _index(self, host, rows, add):
+        for row in rows:
+            key = (host, row['pid'])
+            if add:
+                self.by_name.setdefault(row['name'], set()).add(key)
+                continue
+            holders = self.by_name.get(row['name'])
+            if holders is not None:
+                holders.discard(key)
+                if not holders:
+                    del self.by_name[row['name']]
+
+    def apply(self, name, connection, ticks, wire_bytes=0):
+        """
+        Apply a batch of ticks from one host, in order.
+        Deltas that arrive before the host's first key tick are skipped.
+        Returns False if the connection was replaced by a newer one.
+        Raises ValueError, applying nothing, if any tick is malformed.
+        """
+        if not isinstance(ticks, list):
+            raise ValueError("Batch 'ticks' must be a list")
+        for tick in ticks:
+            check_tick(tick)
+        with self._lock:
+            host = self.hosts.get(name)
+            if host is None or host.connection != connection:
+                return False
+            self._check_pids(host, ticks)
+            host.bytes_received += wire_bytes
+            learn = [self._apply_tick(host, tick) for tick in ticks]
+
+        # The per-host online detector learns outside the view lock
+        if host.online is not None:
+            with host.online_lock:
+                for snapshot, processes, changes in learn:
+                    if processes is not None:
+                        host.online.record(snapshot, processes, changes)
+        return True
+
+    @staticmethod
+    def _check_pids(host, ticks):
+        """
+        Raise ValueError if a delta in `ticks` changes a pid the host's table
+        (as the earlier ticks leave it) does not have. Runs before any tick is
+        applied, so a bad batch changes nothing.
+        """
+        pids = set(host.table) if host.synced else None
+        for tick in ticks:
+            if tick.get("key"):
+                pids = set(tick["added"]["pid"])
+            elif "added" in tick and pids is not None:
+                pids.difference_update(tick["removed"])
+                if not pids.issuperset(tick["changed"]["pid"]):
+                    raise ValueError("Tick changes a pid the host has not reported")
+                pids.update(tick["added"]["pid"])
+
+    def _apply_tick(self, host, tick):
+        """
+        Apply one tick; returns (snapshot, processes, changes) for the online detector.
+        """
+        processes, changes = None, None
+        if tick.get("key"):
+            host.synced = True
+            rows = unpack_rows(tick["added"])
+            old = list(host.table.values()) if host.table is not None else []
+            self._index(host.name, old, add=False)
+            self._index(host.name, rows, add=True)
+            changes = diff_rows(host.table or {}, rows)
+            host.table = {row['pid']: row for row in rows}
+        elif "added" in tick and host.synced:
+            table = host.table
+            removed = []
+            for pid in tick["removed"]:
+                row = table.pop(pid, None)
+                if row is not None:
+                    removed.append(row)
+            added, changed = unpack_rows(tick["added"]), unpack_rows(tick["changed"])
+            for row in added:
+                old = table.get(row['pid'])
+                if old is not None:
+                    removed.append(old)
+                table[row['pid']] = row
+            for row in changed:
+                old = table.get(row['pid'])
+                if old is not None and old['name'] != row['name']:
+                    self._index(host.name, [old], add=False)
+                    self._index(host.name, [row], add=True)
+                table[row['pid']] = row
+            self._index(host.name, removed, add=False)
+            self._index(host.name, added, add=True)
+            changes = {"added": added, "removed": tick["removed"], "changed": changed}
+        if host.table is not None:
+            processes = list(host.table.values()) if host.online is not None else None
+
+        host.metrics = tick["metrics"]
+        host.last_seen = time.time()
+        host.ticks += 1
+        host.dirty = True
+        return tick["metrics"], processes if changes is not None else None, changes
+
+    def expire(self, max_age=HOST_EXPIRY):
+        """
+        Drop disconnected hosts not heard from for `max_age` seconds.
+        """
+        now = time.time()
+        with self._lock:
+            for name, host in list(self.hosts.items()):
+                if host.connection is None and (host.last_seen or host.connected_at) < now - max_age:
+                    if host.table:
+                        self._index(name, host.table.values(), add=False)
+                    del self.hosts[name]
+
+    def score(self, bundle):
+        """
+        Score every host that changed since the last pass with one batched
+        model call for all their processes and one for their system metrics.
+        Returns the number of process rows scored.
+        """
+        with self._lock:
+            batch = []
+            for host in self.hosts.values():
+                if host.dirty and host.metrics is not None:
+                    host.dirty = False
+                    batch.append((host, host.metrics, list(host.table.values()) if host.table else []))
+        if not batch:
+            return 0
+
+        system = np.array([[m["cpu_usage"], m["memory_usage"]] for _, m, _ in batch], dtype=float)
+        system_scores = bundle.detector.decision_function(scale_features(bundle, system))
+
+        sizes = [len(rows) for _, _, rows in batch]
+        features = np.empty((sum(sizes), 2))
+        features[:, 0] = [p['cpu_percent'] for _, _, rows in batch for p in rows]
+        features[:, 1] = [p['memory_percent'] for _, _, rows in batch for p in rows]
+        scores = (bundle.detector.decision_function(scale_features(bundle, features))
+                  if len(features) else np.zeros(0))
+
+        with self._lock:
+            offset = 0
+            for (host, _, rows), size, system_score in zip(batch, sizes, system_scores):
+                host.scored_rows = rows
+                host.scores = scores[offset:offset + size]
+                host.system_score = round(float(system_score), 6)
+                offset += size
+        return len(features)
+
+    def host_summaries(self):
+        with self._lock:
+            return [host.summary() for host in sorted(self.hosts.values(), key=lambda h: h.name)]
+
+    def host(self, name, limit=20):
+        """
+        One host's summary, latest metrics and most anomalous processes.
+        Raises KeyError for unknown hosts.
+        """
+        with self._lock:
+            host = self.hosts[name]
+            result = host.summary()
+            result["metrics"] = host.metrics
+            result["online"] = host.online.status() if host.online is not None else None
+            result["processes"] = _top(self._rows(host), "score", limit)
+            return result
+
+    def _rows(self, host, name=None, pids=None, engine="forest", anomalies=False):
+        if engine == "online":
+            if host.online is None:
+                raise ValueError("Per-host online detection is off (set CLUSTER_ONLINE=1)")
+            rows = list(host.table.values()) if host.table else []
+            scores = host.online.score_processes(rows)[0] if rows else np.zeros(0)
+        else:
+            rows, scores = host.scored_rows, host.scores
+        selected = []
+        for row, score in zip(rows, scores):
+            if name is not None and row['name'] != name:
+                continue
+            if pids is not None and row['pid'] not in pids:
+                continue
+            if anomalies and score >= 0:
+                continue
+            selected.append({**row, "host": host.name, "anomaly_score": round(float(score), 6)})
+        return selected
+
+    def processes(self, host=None, name=None, sort="score", limit=50, anomalies=False, engine="forest"):
+        """
+        Processes across all hosts (or one), ranked by `sort`: "score" (most
+        anomalous first, from the last scoring pass), "cpu" or "memory".
+        An exact `name` is answered from the name index.
+        """
+        if sort not in CLUSTER_SORT_KEYS:
+            raise ValueError(f"Unknown sort '{sort}'. Choose from: {', '.join(CLUSTER_SORT_KEYS)}")
+        with self._lock:
+            if host is not None and host not in self.hosts:
+                raise KeyError(host)
+            hosts = [self.hosts[host]] if host is not None else list(self.hosts.values())
+            wanted = None
+            if name is not None:
+                wanted = {}
+                for host_name, pid in self.by_name.get(name, ()):
+                    wanted.setdefault(host_name, set()).add(pid)
+                hosts = [h for h in hosts if h.name in wanted]
+
+            rows = []
+            for state in hosts:
+                rows.extend(self._rows(state, name, wanted[state.name] if wanted else None, engine, anomalies))
+        return _top(rows, sort, limit)
+
+
+# Sort keys for cluster process queries -> (row field, largest first)
+CLUSTER_SORT_KEYS = {
+    "score": ("anomaly_score", False),
+    "cpu": ("cpu_percent", True),
+    "memory": ("memory_percent", True),
+}
+
+
+def _top(rows, sort, limit):
+    """
+    The first `limit` rows by `sort`, selected without sorting every row.
+    """
+    field, largest = CLUSTER_SORT_KEYS[sort]
+    key = lambda row: row[field] or 0  # noqa: E731
+    if limit is None or limit < 0:
+        return sorted(rows, key=key, reverse=largest)
+    return (heapq.nlargest if largest else heapq.nsmallest)(limit, rows, key=key)
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    """
+    One agent connection: handshake, then apply batches until it closes.
+    """
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.agents.add(self.connection)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.agents.discard(self.connection)
+        super().finish()
+
+    def handle(self):
+        server = self.server
+        try:
+            self.connection.settimeout(HELLO_TIMEOUT)
+            hello, _ = recv_message(self.rfile, MAX_HELLO)
+        except Exception as e:
+            print(f"Bad handshake from {self.client_address[0]}: {e}")
+            return
+        if not hello or hello.get("type") != "hello" or not hello.get("host"):
+            return
+        token = str(hello.get("token") or "").encode()
+        if CLUSTER_TOKEN is not None and not hmac.compare_digest(token, CLUSTER_TOKEN.encode()):
+            send_message(self.connection, {"type": "error", "error": "Invalid token"})
+            return
+        if hello.get("version") != PROTOCOL_VERSION:
+            send_message(self.connection, {"type": "error", "error": f"Protocol {PROTOCOL_VERSION} required"})
+            return
+
+        name = str(hello["host"])
+        info = {k: v for k, v in hello.items() if k not in ("type", "token")}
+        connection = server.view.connect(name, info)
+        send_message(self.connection, {"type": "welcome", "version": PROTOCOL_VERSION})
+        try:
+            self.connection.settimeout(READ_TIMEOUT)
+            while True:
+                message, wire_bytes = recv_message(self.rfile)
+                if message is None:
+                    break
+                if message.get("type") != "batch":
+                    continue
+                if not server.view.apply(name, connection, message.get("ticks", []), wire_bytes):
+                    break  # Replaced by a newer connection from the same host
+        except (OSError, ConnectionError) as e:
+            print(f"Agent {name} disconnected: {e}")
+        except ValueError as e:
+            print(f"Dropping agent {name}: {e}")
+        except Exception as e:
+            print(f"Error from agent {name}: {e}")
+        finally:
+            server.view.disconnect(name, connection)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, view):
+        super().__init__(address, handler)
+        self.view = view
+        self.agents = set()  # Open agent sockets, closed on shutdown
+        self.lock = threading.Lock()
+
+    def close_agents(self):
+        with self.lock:
+            for sock in self.agents:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class ClusterCollector:
+    """
+    TCP server accepting agents plus a thread that scores all hosts in
+    batches every SCORE_INTERVAL seconds with the app's model.
+    """
+
+    def __init__(self, listen=DEFAULT_LISTEN, model_store=None, score_interval=SCORE_INTERVAL):
+        host, _, port = listen.rpartition(":")
+        self.address = (host or "0.0.0.0", int(port))
+        self.model_store = model_store
+        self.score_interval = score_interval
+        self.view = ClusterView()
+        self.last_pass = None  # {"rows", "seconds", "at"} for the latest scoring pass
+        self._server = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._server = _Server(self.address, _AgentHandler, self.view)
+        self.address = self._server.server_address
+        threading.Thread(target=self._server.serve_forever, name="cluster-server", daemon=True).start()
+        threading.Thread(target=self._score_loop, name="cluster-scorer", daemon=True).start()
+        print(f"Cluster collector listening on {self.address[0]}:{self.address[1]}")
+
+    def _score_loop(self):
+        while not self._stop.wait(self.score_interval):
+            try:
+                self.view.expire()
+                bundle = self.model_store.get() if self.model_store is not None else None
+                if bundle is None:
+                    continue
+                started = time.perf_counter()
+                rows = self.view.score(bundle)
+                if rows:
+                    self.last_pass = {"rows": rows, "seconds": round(time.perf_counter() - started, 4),
+                                      "at": time.time()}
+            except Exception as e:
+                print(f"Error scoring cluster: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server.close_agents()
+
+    def status(self):
+        hosts = self.view.host_summaries()
+        return {
+            "listen": f"{self.address[0]}:{self.address[1]}",
+            "hosts": len(hosts),
+            "connected": sum(h["connected"] for h in hosts),
+            "anomalous_hosts": sum(h["status"] == "Anomaly" for h in hosts),
+            "processes": sum(h["process_count"] for h in hosts),
+            "online_per_host": ONLINE_PER_HOST,
+            "last_scoring_pass": self.last_pass,
+        }
@@ -0,0 +1,201 @@
+# Import required libraries
+import os
+import sys
+import time
+
+import psutil
+
+from instrumentation import timed_stage
+
+# Attributes collected for every process (same fields the process page shows)
+PROCESS_ATTRS = ['pid', 'ppid', 'name', 'cpu_percent', 'memory_percent', 'status']
+
+# Collector backend: "auto" (procfs on Linux, psutil elsewhere), "procfs" or "psutil"
+DEFAULT_BACKEND = os.environ.get("COLLECTOR_BACKEND", "auto")
+
+# /proc/[pid]/stat state letters, mapped to the names psutil reports
+PROC_STATUSES = {
+    "R": "running",
+    "S": "sleeping",
+    "D": "disk-sleep",
+    "T": "stopped",
+    "t": "tracing-stop",
+    "Z": "zombie",
+    "X": "dead",
+    "x": "dead",
+    "K": "wake-kill",
+    "W": "waking",
+    "I": "idle",
+    "P": "parked",
+}
+
+
+class PsutilCollector:
+    """
+    Portable backend: keeps one psutil.Process handle per live pid between ticks.
+    Keeping the same handle lets psutil compute real CPU deltas (a fresh handle
+    always reports 0.0 on its first cpu_percent call) and avoids rebuilding every
+    process object on each refresh.
+    Handles are checked against the process's create time on every tick, so a
+    recycled pid gets a fresh handle instead of the old process's counters.
+    """
+
+    name = "psutil"
+
+    def __init__(self):
+        self._handles = {}  # pid -> psutil.Process
+        self._create_times = {}  # pid -> create_time
+
+    def _add(self, pid):
+        proc = psutil.Process(pid)
+        try:
+            create_time = proc.create_time()
+            proc.cpu_percent(interval=None)  # Prime the CPU counter for the next tick
+        except psutil.ZombieProcess:
+            # Zombies stay listed (the process tree flags them) even where
+            # their counters can no longer be read
+            create_time = 0.0
+        self._handles[pid] = proc
+        self._create_times[pid] = create_time
+
+    def _evict(self, pid):
+        self._handles.pop(pid, None)
+        self._create_times.pop(pid, None)
+
+    @timed_stage("collect_processes")
+    def collect(self):
+        """
+        Add new pids, evict exited ones and read every live process.
+        """
+        current = set(psutil.pids())
+
+        # Evict processes that exited since the last tick
+        for pid in self._handles.keys() - current:
+            self._evict(pid)
+
+        # Replace handles whose pid now belongs to a different process
+        # (is_running() compares the create time with a fresh read)
+        for pid, proc in list(self._handles.items()):
+            if not proc.is_running():
+                self._evict(pid)
+
+        # Add processes that started since the last tick (or reuse a pid)
+        for pid in current - self._handles.keys():
+            try:
+                self._add(pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+        rows = []
+        for pid, proc in list(self._handles.items()):
+            try:
+                info = proc.as_dict(attrs=PROCESS_ATTRS)
+            except psutil.NoSuchProcess:
+                # Exited between the pid scan and the read
+                self._evict(pid)
+                continue
+            except Exception as e:
+                print(f"Error processing process {pid}: {e}")
+                continue
+
+            # as_dict reports None for fields we are not allowed to read
+            info['cpu_percent'] = info['cpu_percent'] or 0.0
+            info['memory_percent'] = info['memory_percent'] or 0.0
+            info['ppid'] = info['ppid'] or 0
+            info['create_time'] = self._create_times[pid]
+            rows.append(info)
+        return rows
+
+
+class ProcfsCollector:
+    """
+    Linux backend that batch-reads /proc/[pid]/stat and /proc/[pid]/statm.
+    Two raw reads per process and no per-process Python objects beyond the row;
+    CPU% is computed from utime+stime jiffies between ticks, the same way psutil
+    does it (not normalized by CPU count, 0.0 the first time a process is seen).
+    Names come from the kernel's `comm`, so they are cut at 15 characters.
+    """
+
+    name = "procfs"
+
+    def __init__(self, proc_path="/proc"):
+        self.proc_path = proc_path
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.total_memory = psutil.virtual_memory().total
+        self.boot_time = psutil.boot_time()
+        self._last = {}  # pid -> (starttime, cpu jiffies, monotonic time)
+
+    def _read(self, path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.read(fd, 4096)
+        finally:
+            os.close(fd)
+
+    @timed_stage("collect_processes")
+    def collect(self):
+        """
+        Read every process under /proc and return one row per process.
+        """
+        now = time.monotonic()
+        last = self._last
+        seen = {}
+        rows = []
+        memory_scale = self.page_size * 100.0 / self.total_memory
+        clock_ticks = self.clock_ticks
+
+        for entry in os.listdir(self.proc_path):
+            if not entry.isdigit():
+                continue
+            base = f"{self.proc_path}/{entry}/"
+            try:
+                stat = self._read(base + "stat")
+                statm = self._read(base + "statm")
+            except OSError:
+                # Exited or not readable
+                continue
+
+            # The name sits in parentheses and may itself contain spaces or ')'
+            rpar = stat.rfind(b")")
+            name = stat[stat.find(b"(") + 1:rpar].decode(errors="replace")
+            fields = stat[rpar + 2:].split()
+            jiffies = int(fields[11]) + int(fields[12])  # utime + stime
+            starttime = int(fields[19])
+
+            pid = int(entry)
+            previous = last.get(pid)
+            if previous is not None and previous[0] == starttime and now > previous[2]:
+                cpu_percent = round((jiffies - previous[1]) / clock_ticks / (now - previous[2]) * 100, 1)
+            else:
+                cpu_percent = 0.0
+            seen[pid] = (starttime, jiffies, now)
+
+            rows.append({
+                'pid': pid,
+                'ppid': int(fields[1]),
+                'name': name,
+                'cpu_percent': cpu_percent,
+                'memory_percent': int(statm.split(None, 2)[1]) * memory_scale,
+                'status': PROC_STATUSES.get(fields[0].decode(), fields[0].decode()),
+                'create_time': self.boot_time + starttime / clock_ticks,
+            })
+
+        # Dropping unseen pids evicts processes that exited
+        self._last = seen
+        return rows
+
+
+def make_collector(backend=None):
+    """
+    Build the process collector named by `backend` (or COLLECTOR_BACKEND).
+    "auto" picks the /proc reader on Linux and psutil everywhere else.
+    """
+    backend = (backend or DEFAULT_BACKEND).lower()
+    if backend == "auto":
+        backend = "procfs" if sys.platform.startswith("linux") and os.path.isdir("/proc/self") else "psutil"
+    if backend == "procfs":
+        return ProcfsCollector()
+    if backend == "psutil":
+        return PsutilCollector()
+    raise ValueError(f"Unknown collector backend '{backend}'. Choose from: auto, procfs, psutil")
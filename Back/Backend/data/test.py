@@ -1,10 +1,32 @@
+"""
+Generate a synthetic process dataset with frequent, adjacent anomalies.
+
+Rows are generated in independent chunks (in parallel with --jobs) and
+streamed to disk, so memory stays bounded by the chunk size. The same
+--seed gives the same dataset whatever the number of jobs.
+
+Usage (from Back/Backend):
+    python data/test.py --rows 10000000 --hosts 8 --jobs 4 --output data/load.parquet
+    python data/test.py --process-mix "chrome.exe=5,game.exe=1" --anomaly-ratio 0.2
+"""
 import pandas as pd
 import numpy as np
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import os  # Import the os module
+import sys
+import time
+
+# dataset_io lives in Back/Backend, one level up from this script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset_io import DatasetWriter  # noqa: E402
 
 # Step 1: Define Parameters
-num_rows = 1000  # Number of rows in the dataset
-anomaly_ratio = 0.9  # 90% anomalies, 10% normal data
+DEFAULT_ROWS = 1000  # Number of rows in the dataset
+DEFAULT_ANOMALY_RATIO = 0.9  # 90% anomalies, 10% normal data
+DEFAULT_CHUNK_ROWS = 1_000_000  # Rows generated (and held in memory) per chunk
+START_TIME = pd.Timestamp("2023-01-01")
 process_names = [
     "chrome.exe", "antivirus.exe", "explorer.exe", "game.exe", "backup.exe",
     "firefox.exe", "notepad.exe", "vlc.exe", "spotify.exe", "discord.exe",
@@ -12,76 +34,176 @@ process_names = [
     "unknown_process.exe"
 ]
 states = ["Running", "Sleeping", "Zombie", "Orphan", "Stopped", "Idle"]
+state_weights = [0.7, 0.2, 0.02, 0.02, 0.03, 0.03]  # Mostly "Running"
+
+
+def parse_process_mix(text):
+    """
+    Parse "name=weight,name=weight" (weight defaults to 1) into (names, probabilities).
+    """
+    names, weights = [], []
+    for item in text.split(","):
+        name, _, weight = item.strip().partition("=")
+        if not name:
+            continue
+        names.append(name)
+        weights.append(float(weight) if weight else 1.0)
+    if not names or min(weights) < 0 or sum(weights) <= 0:
+        raise ValueError(f"Invalid process mix '{text}'")
+    weights = np.asarray(weights) / sum(weights)
+    return names, weights
+
 
 # Step 2: Generate Normal Data
-def generate_normal_data(num_rows):
-    timestamps = pd.date_range(start="2023-01-01", periods=num_rows, freq="s")  # One row per second
-    process_name = np.random.choice(process_names, size=num_rows)
-    cpu_usage = np.random.uniform(0, 50, size=num_rows)  # Normal CPU usage (0–50%)
-    memory_usage = np.random.uniform(0, 50, size=num_rows)  # Normal memory usage (0–50%)
-    disk_usage = np.random.uniform(0, 50, size=num_rows)  # Normal disk usage (0–50%)
-    process_state = np.random.choice(states, p=[0.7, 0.2, 0.02, 0.02, 0.03, 0.03], size=num_rows)  # Mostly "Running"
-    label = np.ones(num_rows)  # Normal data labeled as 1
+def generate_normal_data(rng, start_row, num_rows, hosts=1, names=process_names, weights=None):
+    """
+    Normal rows `start_row` .. `start_row + num_rows`. Every host reports one
+    row per second, interleaved, so the timestamp depends only on the row number.
+    """
+    row = start_row + np.arange(num_rows)
+    timestamps = START_TIME + pd.to_timedelta(row // hosts, unit="s")
     return pd.DataFrame({
         "timestamp": timestamps,
-        "process_name": process_name,
-        "cpu_usage": cpu_usage,
-        "memory_usage": memory_usage,
-        "disk_usage": disk_usage,
-        "process_state": process_state,
-        "label": label
+        "host": pd.Categorical.from_codes(row % hosts, categories=[f"host-{i:03d}" for i in range(hosts)]),
+        "process_name": pd.Categorical.from_codes(
+            rng.choice(len(names), p=weights, size=num_rows), categories=names
+        ),
+        "cpu_usage": rng.uniform(0, 50, size=num_rows),  # Normal CPU usage (0–50%)
+        "memory_usage": rng.uniform(0, 50, size=num_rows),  # Normal memory usage (0–50%)
+        "disk_usage": rng.uniform(0, 50, size=num_rows),  # Normal disk usage (0–50%)
+        "process_state": pd.Categorical.from_codes(
+            rng.choice(len(states), p=state_weights, size=num_rows), categories=states
+        ),
+        "label": np.ones(num_rows, dtype=np.int8)  # Normal data labeled as 1
     })
 
+
 # Step 3: Inject Frequent and Adjacent Anomalies
-def inject_frequent_adjacent_anomalies(df, anomaly_ratio):
+def inject_frequent_adjacent_anomalies(df, anomaly_ratio, rng):
+    """
+    Mark a share of the rows as anomalies, grouped into blocks of adjacent rows.
+    Each block is split in quarters (high CPU, high memory, zombie, orphan);
+    about a tenth of its rows get an unknown process name and a tenth are
+    Stopped or Idle. Everything is computed with array operations.
+    """
     num_anomalies = int(len(df) * anomaly_ratio)  # Calculate the number of anomalies
-    anomaly_indices = np.random.choice(df.index, size=num_anomalies, replace=False)
-
-    # Ensure anomalies are consecutive or adjacent
-    anomaly_blocks = []
-    block_size = max(1, len(anomaly_indices) // np.random.randint(1, len(anomaly_indices) // 50 + 1))
-    for i in range(0, len(anomaly_indices), block_size):
-        block = sorted(anomaly_indices[i:i + block_size])  # Create a block of consecutive indices
-        anomaly_blocks.append(block)
+    if num_anomalies == 0:
+        return df
 
-    # Apply anomalies to each block
-    for block in anomaly_blocks:
-        df.loc[block, "label"] = -1  # Mark as anomaly
+    # Sorted anomaly rows, cut into consecutive blocks
+    rows = np.sort(rng.choice(len(df), size=num_anomalies, replace=False))
+    block_size = max(1, num_anomalies // rng.integers(1, num_anomalies // 50 + 2))
+    block = np.arange(num_anomalies) // block_size
+    position = np.arange(num_anomalies) % block_size
+    block_length = np.bincount(block)[block]
+    quarter = position * 4 // block_length
 
-        # High CPU usage anomalies
-        cpu_slice = block[:len(block) // 4]
-        df.loc[cpu_slice, "cpu_usage"] = np.random.uniform(90, 150, size=len(cpu_slice))
+    label = df["label"].to_numpy()
+    cpu = df["cpu_usage"].to_numpy()
+    memory = df["memory_usage"].to_numpy()
+    name_codes = df["process_name"].cat.codes.to_numpy().copy()
+    state_codes = df["process_state"].cat.codes.to_numpy().copy()
 
-        # High memory usage anomalies
-        memory_slice = block[len(block) // 4:len(block) // 2]
-        df.loc[memory_slice, "memory_usage"] = np.random.uniform(90, 150, size=len(memory_slice))
+    label[rows] = -1  # Mark as anomaly
 
-        # Zombie processes
-        zombie_slice = block[len(block) // 2:3 * len(block) // 4]
-        df.loc[zombie_slice, "process_state"] = "Zombie"
+    # High CPU / high memory usage anomalies
+    cpu_rows = rows[quarter == 0]
+    cpu[cpu_rows] = rng.uniform(90, 150, size=len(cpu_rows))
+    memory_rows = rows[quarter == 1]
+    memory[memory_rows] = rng.uniform(90, 150, size=len(memory_rows))
 
-        # Orphan processes
-        orphan_slice = block[3 * len(block) // 4:]
-        df.loc[orphan_slice, "process_state"] = "Orphan"
+    # Zombie and orphan processes
+    state_codes[rows[quarter == 2]] = states.index("Zombie")
+    state_codes[rows[quarter == 3]] = states.index("Orphan")
 
-        # Unknown processes
-        unknown_indices = np.random.choice(block, size=min(len(block) // 10, len(block)), replace=False)
-        df.loc[unknown_indices, "process_name"] = "unknown_process.exe"
+    # Unknown processes
+    names = list(df["process_name"].cat.categories)
+    if "unknown_process.exe" not in names:
+        names.append("unknown_process.exe")
+    name_codes[rows[rng.random(num_anomalies) < 0.1]] = names.index("unknown_process.exe")
 
-        # Stopped or Idle processes
-        stopped_indices = np.random.choice(block, size=min(len(block) // 10, len(block)), replace=False)
-        df.loc[stopped_indices, "process_state"] = np.random.choice(["Stopped", "Idle"])
+    # Stopped or Idle processes: one of the two per block
+    block_state = rng.choice([states.index("Stopped"), states.index("Idle")], size=block[-1] + 1)
+    stopped = rng.random(num_anomalies) < 0.1
+    state_codes[rows[stopped]] = block_state[block[stopped]]
 
+    df["label"] = label
+    df["cpu_usage"] = cpu
+    df["memory_usage"] = memory
+    df["process_name"] = pd.Categorical.from_codes(name_codes, categories=names)
+    df["process_state"] = pd.Categorical.from_codes(state_codes, categories=states)
     return df
 
-# Step 4: Generate the Dataset
-normal_data = generate_normal_data(num_rows)
-dataset = inject_frequent_adjacent_anomalies(normal_data, anomaly_ratio)
 
-# Step 5: Save the Dataset to CSV
-# Ensure the 'data' directory exists
-os.makedirs("data", exist_ok=True)
+def generate_chunk(task):
+    """
+    Build one chunk: (seed, start_row, num_rows, options). Runs in a worker process.
+    """
+    seed, start_row, num_rows, options = task
+    rng = np.random.default_rng(seed)
+    df = generate_normal_data(rng, start_row, num_rows, options["hosts"], options["names"], options["weights"])
+    return inject_frequent_adjacent_anomalies(df, options["anomaly_ratio"], rng)
+
+
+def generate(output, rows=DEFAULT_ROWS, hosts=1, process_mix=None, anomaly_ratio=DEFAULT_ANOMALY_RATIO,
+             seed=None, chunk_rows=DEFAULT_CHUNK_ROWS, jobs=1):
+    """
+    Generate `rows` rows in chunks over `jobs` processes and stream them to `output`.
+    At most two chunks per job are in flight, so memory does not grow with `rows`.
+    """
+    names, weights = parse_process_mix(process_mix) if process_mix else (process_names, None)
+    options = {"hosts": hosts, "names": names, "weights": weights, "anomaly_ratio": anomaly_ratio}
+    # One independent random stream per chunk, derived from the seed
+    starts = range(0, rows, chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = ((s, start, min(chunk_rows, rows - start), options) for s, start in zip(seeds, starts))
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with DatasetWriter(output) as writer:
+        if jobs <= 1:
+            for task in tasks:
+                writer.write(generate_chunk(task))
+            return
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(generate_chunk, task))
+                if len(pending) >= 2 * jobs:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+
+
+def parse_args():
+    # Command-line options: the output format follows the file extension
+    parser = argparse.ArgumentParser(description="Generate a synthetic process dataset.")
+    parser.add_argument("--output", default="data/os_processes_data.csv",
+                        help="output file (.csv, .parquet or .feather)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="rows to generate")
+    parser.add_argument("--hosts", type=int, default=1, help="hosts reporting in the dataset")
+    parser.add_argument("--process-mix", help='process names and weights, e.g. "chrome.exe=5,game.exe=1"')
+    parser.add_argument("--anomaly-ratio", type=float, default=DEFAULT_ANOMALY_RATIO,
+                        help="share of rows that are anomalies (0-1)")
+    parser.add_argument("--seed", type=int, help="random seed for a reproducible dataset")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows generated per chunk")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes generating chunks")
+    args = parser.parse_args()
+    if not 0 <= args.anomaly_ratio <= 1:
+        parser.error("--anomaly-ratio must be between 0 and 1")
+    if args.rows < 0 or args.hosts < 1 or args.chunk_rows < 1:
+        parser.error("--rows, --hosts and --chunk-rows must be positive")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
 
-# Save the dataset to CSV
-dataset.to_csv("data/os_processes_data.csv", index=False)
-print("Dataset with frequent and adjacent anomalies saved to 'data/os_processes_data.csv'.")
\ No newline at end of file
+    # Step 4-5: Generate the dataset and save it chunk by chunk
+    # (typed columns and categorical names/states for Parquet/Feather)
+    start = time.perf_counter()
+    generate(args.output, args.rows, args.hosts, args.process_mix, args.anomaly_ratio,
+             args.seed, args.chunk_rows, args.jobs)
+    elapsed = time.perf_counter() - start
+    print(f"Dataset with {args.rows} rows and frequent, adjacent anomalies saved to '{args.output}' "
+          f"in {elapsed:.1f}s.")
@@ -0,0 +1,208 @@
+"""
+Dataset storage for the generator and the trainer.
+
+Datasets can be CSV (text, kept as the import path) or columnar Parquet /
+Feather files with typed columns: float32 metrics, categorical process names
+and states. Columnar files let the trainer read only the columns it uses.
+Parquet and Feather need the optional pyarrow package.
+
+Convert an existing CSV (from Back/Backend):
+    python dataset_io.py data/os_processes_data.csv data/os_processes_data.parquet
+"""
+# Import required libraries
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Column types for the process dataset; columns not listed keep pandas' inference
+COLUMN_TYPES = {
+    "host": "category",
+    "process_name": "category",
+    "cpu_usage": np.float32,
+    "memory_usage": np.float32,
+    "disk_usage": np.float32,
+    "process_state": "category",
+    "label": np.int8,
+}
+
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+
+
+def detect_format(path):
+    """
+    Dataset format from the file extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported dataset type '{extension}'. Use one of: {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet and Feather datasets need pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def apply_types(df):
+    """
+    Cast the known columns to their compact types.
+    """
+    for col, dtype in COLUMN_TYPES.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df
+
+
+def column_names(path):
+    """
+    Column names of a dataset, read from its header or schema only.
+    """
+    fmt = detect_format(path)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = _pyarrow()
+    if fmt == "parquet":
+        return pa.parquet.read_schema(path).names
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_columns(path, columns=None, chunksize=100_000):
+    """
+    Yield DataFrames of at most `chunksize` rows holding only `columns`.
+    Columnar formats skip the other columns on disk entirely.
+    """
+    fmt = detect_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+        return
+
+    pa = _pyarrow()
+    if fmt == "parquet":
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    # Feather (Arrow IPC): memory-mapped, so unselected columns are never read
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).to_pandas()
+
+
+def read_dataset(path, columns=None):
+    """
+    Load a whole dataset (optionally only some columns) into one DataFrame.
+    """
+    fmt = detect_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    _pyarrow()
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+class DatasetWriter:
+    """
+    Append DataFrame chunks to a dataset file in any supported format.
+    Use as a context manager; columnar files are finalized on close.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or detect_format(path)
+        self._writer = None
+        self._schema = None
+        self._categories = {}  # column -> categories seen so far, in first-seen order
+        self._rows = 0
+        if self.format != "csv":
+            self._pa = _pyarrow()
+
+    def write(self, df):
+        df = apply_types(df)
+        if self.format == "csv":
+            df.to_csv(self.path, mode="w" if self._rows == 0 else "a", header=self._rows == 0, index=False)
+        else:
+            table = self._pa.Table.from_pandas(self._extend_categories(df), preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.format == "parquet":
+                    self._writer = self._pa.parquet.ParquetWriter(self.path, self._schema)
+                else:
+                    # Growing categories are written as dictionary deltas
+                    options = self._pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                    self._writer = self._pa.ipc.new_file(self.path, self._schema, options=options)
+            else:
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+        self._rows += len(df)
+
+    def _extend_categories(self, df):
+        # Keep category codes stable across chunks: new values are appended to
+        # the categories already written instead of re-coding earlier ones
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                known = self._categories.setdefault(col, [])
+                seen = set(known)
+                known.extend(c for c in df[col].cat.categories if c not in seen)
+                df[col] = df[col].cat.set_categories(known)
+        return df
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_dataset(df, path):
+    """
+    Write a DataFrame to `path` in the format given by its extension.
+    """
+    with DatasetWriter(path) as writer:
+        writer.write(df)
+
+
+def convert(source, destination, chunksize=1_000_000):
+    """
+    Convert a dataset between formats (e.g. import a CSV into Parquet) chunk by chunk.
+    """
+    rows = 0
+    with DatasetWriter(destination) as writer:
+        for chunk in read_columns(source, chunksize=chunksize):
+            writer.write(chunk)
+            rows += len(chunk)
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    converted = convert(sys.argv[1], sys.argv[2])
+    print(f"Converted {converted} rows from {sys.argv[1]} to {sys.argv[2]}.")
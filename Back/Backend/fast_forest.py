@@ -0,0 +1,233 @@
+# Import required libraries
+import numpy as np
+
+# Rows scored per traversal pass; keeps the (rows x trees) working arrays cache-sized
+CHUNK_ROWS = 1024
+
+# Largest leaf lookup table (cells over all trees) built for fast scoring;
+# forests needing more fall back to walking the trees
+LOOKUP_MAX_CELLS = 1 << 22
+
+
+def average_path_length(n_samples):
+    """
+    Average path length of an unsuccessful BST search over `n_samples` points,
+    the IsolationForest normalization term c(n) (same formula as sklearn).
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    result[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+
+class FlatIsolationForest:
+    """
+    A trained sklearn IsolationForest flattened into contiguous NumPy arrays.
+    All trees share one node table (feature, threshold, children, leaf path
+    length), so a batch is scored by walking every row through every tree at
+    once with vectorized indexing instead of per-estimator Python dispatch.
+    Children are interleaved as [left, right] pairs so one gather picks the next
+    node, and leaves point to themselves so the walk runs a fixed number of steps.
+
+    When the forest is small enough (few features, as here) each tree is also
+    compiled into a lookup table: a tree's thresholds cut every feature axis
+    into intervals, and every cell of that grid ends in one leaf. Scoring then
+    needs one binary search per feature over the forest's thresholds plus a few
+    gathers per tree, instead of one gather chain per tree level.
+    decision_function / score_samples / predict match the sklearn model.
+    """
+
+    def __init__(self, feature, threshold, children, leaf_depth, roots, max_depth,
+                 offset, n_features, max_samples):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children  # children[2 * node] = left, children[2 * node + 1] = right
+        self.leaf_depth = leaf_depth
+        self.roots = roots
+        self.max_depth = max_depth
+        self.offset_ = offset
+        self.n_features_in_ = n_features
+        self.max_samples_ = max_samples
+        self._denominator = len(roots) * float(average_path_length([max_samples])[0])
+        self.lookup = self._build_lookup()
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted sklearn IsolationForest.
+        """
+        features, thresholds, lefts, rights, depths, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+
+        for estimator, estimator_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes)
+
+            # Map each split to the forest-wide feature index; leaves read column 0
+            feature = np.where(is_leaf, 0, np.asarray(estimator_features)[np.maximum(tree.feature, 0)])
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            # Node depths: children are always stored after their parent
+            depth = np.zeros(n_nodes, dtype=np.int64)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[tree.children_left[node]] = depth[node] + 1
+                    depth[tree.children_right[node]] = depth[node] + 1
+
+            # Path length credited at a leaf: its depth plus c(samples left in it)
+            leaf_depth = np.where(
+                is_leaf, depth + average_path_length(tree.n_node_samples), 0.0
+            )
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            depths.append(leaf_depth)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, int(depth.max()))
+
+        children = np.empty(2 * offset, dtype=np.int32)
+        children[0::2] = np.concatenate(lefts)
+        children[1::2] = np.concatenate(rights)
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=children,
+            leaf_depth=np.concatenate(depths).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            offset=float(model.offset_),
+            n_features=int(model.n_features_in_),
+            max_samples=int(model.max_samples_),
+        )
+
+    def _leaf_lengths(self, X, roots):
+        """
+        Walk every row of X through the trees starting at `roots`.
+        Returns the leaf path length reached in each tree, shape (rows, trees).
+        """
+        flat_X = X.ravel()
+        row_base = (np.arange(X.shape[0], dtype=np.int32) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(roots, (X.shape[0], len(roots))).copy()
+        # Reused work buffers: np.take with out= avoids reallocating every step
+        index = np.empty_like(nodes)
+        values = np.empty(nodes.shape, dtype=np.float64)
+        thresholds = np.empty(nodes.shape, dtype=np.float64)
+        for _ in range(self.max_depth):
+            np.take(self.feature, nodes, out=index)
+            index += row_base
+            np.take(flat_X, index, out=values)
+            np.take(self.threshold, nodes, out=thresholds)
+            nodes *= 2
+            nodes += values > thresholds
+            np.take(self.children, nodes, out=nodes)
+        return np.take(self.leaf_depth, nodes)
+
+    def _build_lookup(self):
+        n_nodes = len(self.feature)
+        is_split = self.children[0::2] != np.arange(n_nodes)
+        ends = np.r_[self.roots[1:], n_nodes]
+
+        # Per tree and feature: the sorted thresholds that tree splits on
+        tree_thresholds = []
+        cells = 0
+        for start, end in zip(self.roots, ends):
+            split = is_split[start:end]
+            feature = self.feature[start:end]
+            local = [np.unique(self.threshold[start:end][split & (feature == f)])
+                     for f in range(self.n_features_in_)]
+            tree_thresholds.append(local)
+            cells += int(np.prod([len(t) + 1 for t in local]))
+        if cells > LOOKUP_MAX_CELLS:
+            return None
+
+        # Forest-wide thresholds per feature: one binary search places a value
+        # in a global interval, which maps to an interval of every tree
+        global_thresholds = [np.unique(self.threshold[is_split & (self.feature == f)])
+                             for f in range(self.n_features_in_)]
+        interval_maps = [np.empty((len(self.roots), len(g) + 1), dtype=np.int32) for g in global_thresholds]
+        table = np.empty(cells, dtype=np.float64)
+        table_offset = np.empty(len(self.roots), dtype=np.int32)
+
+        offset = 0
+        for t, local in enumerate(tree_thresholds):
+            sizes = [len(thresholds) + 1 for thresholds in local]
+            strides = np.cumprod([1] + sizes[:-1])
+            for f, thresholds in enumerate(local):
+                # Tree thresholds below a value in global interval g are those <= G[g-1]
+                below = np.searchsorted(thresholds, global_thresholds[f], side='right')
+                interval_maps[f][t] = np.r_[0, below] * strides[f]
+
+            # One representative point per cell: interval i of a feature holds
+            # values in (thresholds[i-1], thresholds[i]], so thresholds[i] is inside
+            axes = [np.r_[thresholds, np.inf] for thresholds in local]
+            grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+            # meshgrid's 'ij' order makes the first feature vary slowest; flip to match strides
+            grid = grid.transpose(*reversed(range(len(axes))), len(axes)).reshape(-1, len(axes))
+            table[offset:offset + len(grid)] = self._leaf_lengths(grid, self.roots[t:t + 1])[:, 0]
+            table_offset[t] = offset
+            offset += len(grid)
+
+        return {
+            "thresholds": global_thresholds,
+            "maps": interval_maps,
+            "table": table,
+            "offset": table_offset,
+        }
+
+    def _path_lengths(self, X):
+        if self.lookup is None:
+            return self._leaf_lengths(X, self.roots).sum(axis=1)
+
+        cell = np.broadcast_to(self.lookup["offset"][:, None], (len(self.roots), X.shape[0])).copy()
+        for f, thresholds in enumerate(self.lookup["thresholds"]):
+            interval = np.searchsorted(thresholds, X[:, f], side='left')
+            cell += np.take(self.lookup["maps"][f], interval, axis=1)
+        return np.take(self.lookup["table"], cell).sum(axis=0)
+
+    def score_samples(self, X):
+        """
+        Opposite of the anomaly score, as sklearn's score_samples.
+        """
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32).astype(np.float64).reshape(-1, self.n_features_in_)
+        depths = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            depths[start:start + CHUNK_ROWS] = self._path_lengths(X[start:start + CHUNK_ROWS])
+        if self._denominator == 0:
+            return -np.ones_like(depths)
+        return -(2.0 ** (-depths / self._denominator))
+
+    def decision_function(self, X):
+        """
+        Anomaly score shifted by the fitted offset; negative means anomaly.
+        """
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        """
+        -1 for anomalies, 1 for normal rows.
+        """
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+def check_parity(model, forest, X):
+    """
+    Compare a flattened forest with the sklearn model on X.
+    Returns the largest absolute decision_function difference and whether
+    every predict() label matches.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    expected = model.decision_function(X)
+    actual = forest.decision_function(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    labels_match = bool(np.array_equal(model.predict(X), forest.predict(X)))
+    return max_diff, labels_match
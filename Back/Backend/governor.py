@@ -0,0 +1,228 @@
+# Import required libraries
+import os
+import time
+from collections import deque
+
+import instrumentation
+
+# CPU budget for sampling, as a fraction of one core (0 turns the governor off)
+DEFAULT_BUDGET = float(os.environ.get("SAMPLING_BUDGET", "0.01"))
+
+# Slowest process-table refresh, in seconds
+MAX_PROCESS_INTERVAL = float(os.environ.get("SAMPLING_MAX_PROCESS_INTERVAL", "30"))
+
+# Share of the budget system-metric ticks may use before the base interval stretches
+SYSTEM_SHARE = 0.5
+
+# Seconds of tick costs kept to measure actual usage against the budget
+COST_WINDOW = 60.0
+
+# Smoothing for the per-tick cost and anomaly-score averages
+EWMA_ALPHA = 0.2
+
+# The system is quiet when under this share of the process table starts or
+# exits between refreshes and system CPU stays under QUIET_CPU percent
+QUIET_CHURN = 0.02
+QUIET_CPU = 20.0
+
+# Process refreshes back off (and recover) by this factor per refresh
+BACKOFF = 1.5
+
+# Fast sampling holds for ALERT_HOLD seconds after an anomaly verdict (score
+# under 0) or a sustained fall: the score's average dropping on ALERT_TICKS
+# ticks in a row and by at least ALERT_DROP in total. A single low score on
+# a noisy host is neither.
+ALERT_TICKS = 5
+ALERT_DROP = 0.2
+ALERT_HOLD = 30.0
+
+
+class SamplingGovernor:
+    """
+    Decides how often the sampler reads system metrics and, separately, the
+    process table, keeping the analyzer's sampling cost under a CPU budget.
+
+    Every tick's cost is measured with time.thread_time() on the sampler
+    thread (collection, classification and every hook), split into the
+    cost of a system-only tick and the extra cost of a process refresh.
+    The refresh interval then follows the activity:
+    - quiet system (little process churn, low CPU): back off towards MAX_PROCESS_INTERVAL
+    - anomaly verdict or steadily falling score: refresh every tick for
+      ALERT_HOLD seconds, starting on the next tick
+    - otherwise: drift back to every tick
+    but never faster than the budget allows:
+        system cost / interval + process cost / process interval <= budget
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, interval=1.0, max_process_interval=MAX_PROCESS_INTERVAL,
+                 score=None):
+        self.budget = budget
+        self.base_interval = interval
+        self.interval = interval  # Seconds between ticks
+        self.max_process_interval = max(max_process_interval, interval)
+        self.process_interval = interval  # Seconds between process-table refreshes
+        self.score = score  # Optional callable returning the latest anomaly score (lower is worse)
+
+        self.system_cost = None  # EWMA thread-CPU seconds of a tick without a refresh
+        self.process_cost = None  # EWMA extra seconds a refresh adds to a tick
+        self.last_cost = 0.0
+        self.ticks = 0
+        self.process_ticks = 0
+        self.reason = "starting"
+        self._desired = interval  # Activity-driven refresh interval, before the budget
+        self._next_refresh = 0.0  # Monotonic time the next refresh is due
+        self._alert_until = 0.0
+        self._score_avg = None
+        self._falling = 0  # Ticks in a row the score average has fallen
+        self._fall_start = None  # Score average when the current fall began
+        self._last_refresh = None  # Monotonic time of the latest refresh
+        self._costs = deque()  # (monotonic time, cost) within COST_WINDOW
+        self._window_cost = 0.0
+        self._started = time.monotonic()
+
+    def refresh_due(self):
+        """
+        Whether this tick should refresh the process table.
+        """
+        return time.monotonic() >= self._next_refresh
+
+    def observe(self, snapshot, cost, refreshed, processes=None, changes=None):
+        """
+        Account one tick (`cost` thread-CPU seconds) and plan the next ones.
+        """
+        now = time.monotonic()
+        self.ticks += 1
+        self.last_cost = cost
+        if self.ticks == 1:
+            # The first tick pays one-off setup costs (the lazy model load, the
+            # first process scan); keep it out of the measured usage
+            self._started = now
+        else:
+            self._costs.append((now, cost))
+            self._window_cost += cost
+        while self._costs and self._costs[0][0] < now - COST_WINDOW:
+            self._window_cost -= self._costs.popleft()[1]
+
+        if refreshed:
+            self.process_ticks += 1
+            extra = max(cost - (self.system_cost or 0.0), 0.0)
+            if self.process_ticks == 1:
+                pass  # The first refresh is the setup tick above; don't let it set the pace
+            elif self.process_cost is None:
+                self.process_cost = extra
+            else:
+                self.process_cost += EWMA_ALPHA * (extra - self.process_cost)
+        else:
+            self.system_cost = cost if self.system_cost is None else \
+                self.system_cost + EWMA_ALPHA * (cost - self.system_cost)
+
+        alerted = self._update_activity(snapshot, now, refreshed, processes, changes)
+        self._plan()
+        if refreshed:
+            self._last_refresh = now
+            self._next_refresh = now + self.process_interval - self.interval / 2  # Due on the nearest tick
+        elif alerted and self._last_refresh is not None:
+            # A new alert does not wait out a backed-off refresh: the next one
+            # comes as soon as the budget allows, usually on the next tick
+            self._next_refresh = min(self._next_refresh,
+                                     self._last_refresh + self.process_interval - self.interval / 2)
+        self._export(cost, refreshed)
+
+    def _anomalous(self, snapshot):
+        """
+        Whether this tick starts (or extends) an alert.
+        """
+        if self.score is None:
+            return snapshot.get("status") == "Anomaly"
+        score = self.score()  # None while the scorer has no verdict yet
+        if score is None:
+            return False
+        average = score if self._score_avg is None else self._score_avg + EWMA_ALPHA * (score - self._score_avg)
+        if self._score_avg is not None and average < self._score_avg:
+            self._falling += 1
+        else:
+            self._falling = 0
+            self._fall_start = average
+        self._score_avg = average
+        return score < 0 or (self._falling >= ALERT_TICKS and self._fall_start - average >= ALERT_DROP)
+
+    def _update_activity(self, snapshot, now, refreshed, processes, changes):
+        """
+        Update the activity-driven refresh interval. Returns True when an alert starts.
+        """
+        alerted = False
+        if self._anomalous(snapshot):
+            alerted = now >= self._alert_until
+            self._alert_until = now + ALERT_HOLD
+
+        if now < self._alert_until:
+            self._desired = self.base_interval
+        elif refreshed and processes:
+            churn = len(changes["added"]) + len(changes["removed"]) if changes else 0
+            if churn / len(processes) < QUIET_CHURN and snapshot.get("cpu_usage", 0) < QUIET_CPU:
+                self._desired = min(self._desired * BACKOFF, self.max_process_interval)
+            else:
+                self._desired = max(self._desired / BACKOFF, self.base_interval)
+        return alerted
+
+    def _plan(self):
+        """
+        Pick the tick and refresh intervals: the activity-driven ones, slowed
+        down where the measured costs would exceed the budget.
+        """
+        if self.budget <= 0:
+            self.reason = "fixed"
+            return
+        system_cost = self.system_cost or 0.0
+        # System ticks alone may use at most SYSTEM_SHARE of the budget
+        self.interval = max(self.base_interval, system_cost / (self.budget * SYSTEM_SHARE))
+
+        affordable = self.interval  # Unlimited until a refresh has been measured
+        if self.process_cost is not None:
+            left = self.budget - system_cost / self.interval
+            affordable = self.process_cost / left if left > 0 else self.max_process_interval
+        interval = max(self._desired, affordable, self.interval)
+        self.process_interval = min(interval, max(self.max_process_interval, self.interval))
+
+        if time.monotonic() < self._alert_until:
+            self.reason = "anomaly" if affordable <= self._desired else "anomaly (budget-limited)"
+        elif affordable > self._desired:
+            self.reason = "budget"
+        elif self._desired > self.base_interval:
+            self.reason = "quiet"
+        else:
+            self.reason = "normal"
+
+    def cpu_fraction(self):
+        """
+        Thread-CPU seconds spent sampling per wall second, over the last COST_WINDOW.
+        """
+        if not self._costs:
+            return 0.0
+        span = min(COST_WINDOW, time.monotonic() - self._started)
+        return self._window_cost / span if span > 0 else 0.0
+
+    def _export(self, cost, refreshed):
+        if not instrumentation.ENABLED:
+            return
+        instrumentation.TICK_CPU_SECONDS.observe(cost, ("process" if refreshed else "system",))
+        instrumentation.SAMPLING_INTERVAL.set(self.interval, ("system",))
+        instrumentation.SAMPLING_INTERVAL.set(self.process_interval, ("process",))
+        instrumentation.SAMPLING_CPU_FRACTION.set(round(self.cpu_fraction(), 6))
+
+    def status(self):
+        used = self.cpu_fraction()
+        return {
+            "enabled": self.budget > 0,
+            "budget": self.budget,
+            "cpu_fraction": round(used, 6),
+            "within_budget": used <= self.budget if self.budget > 0 else None,
+            "interval": round(self.interval, 3),
+            "process_interval": round(self.process_interval, 3),
+            "reason": self.reason,
+            "system_tick_ms": round(self.system_cost * 1000, 3) if self.system_cost is not None else None,
+            "process_refresh_ms": round(self.process_cost * 1000, 3) if self.process_cost is not None else None,
+            "last_tick_ms": round(self.last_cost * 1000, 3),
+            "ticks": self.ticks,
+            "process_ticks": self.process_ticks,
+        }
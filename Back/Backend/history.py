@@ -0,0 +1,317 @@
+# Import required libraries
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Seconds between process-table samples kept in history
+PROCESS_INTERVAL = float(os.environ.get("HISTORY_PROCESS_INTERVAL", "10"))
+
+# Capacities in rows (override with HISTORY_SYSTEM_CAPACITY / HISTORY_PROCESS_CAPACITY).
+# A process row takes 26 bytes, so the default process budget is about 52 MB:
+# ten hours of 500 processes, or about two hours of 3000, at one sample every
+# PROCESS_INTERVAL seconds.
+DEFAULT_SYSTEM_CAPACITY = int(os.environ.get("HISTORY_SYSTEM_CAPACITY", "86400"))  # One day at 1s
+DEFAULT_PROCESS_CAPACITY = int(os.environ.get("HISTORY_PROCESS_CAPACITY", "2000000"))
+
+# Optional directory for memory-mapped persistence (override with HISTORY_PATH)
+DEFAULT_PATH = os.environ.get("HISTORY_PATH") or None
+
+SYSTEM_COLUMNS = {
+    "timestamp": np.float64,
+    "cpu_usage": np.float32,
+    "memory_usage": np.float32,
+    "disk_usage": np.float32,
+}
+
+PROCESS_COLUMNS = {
+    "timestamp": np.float64,
+    "pid": np.int32,
+    "name_id": np.int32,
+    "cpu_percent": np.float32,
+    "memory_percent": np.float32,
+    "status_id": np.int16,
+}
+
+# Metrics that /api/history can query
+SYSTEM_METRICS = ("cpu_usage", "memory_usage", "disk_usage")
+PROCESS_METRICS = ("process.cpu_percent", "process.memory_percent")
+
+
+class ColumnRing:
+    """
+    Fixed-capacity ring buffer stored as one NumPy array per column.
+    When `path` is given every column is a memory-mapped .npy file in that
+    directory, so history survives restarts and reopening costs nothing.
+    An existing history is reopened at its stored capacity even if `capacity`
+    differs; delete the directory to resize it.
+    """
+
+    def __init__(self, columns, capacity, path=None):
+        self.capacity = capacity
+        self.columns = {}
+
+        if path is None:
+            for name, dtype in columns.items():
+                self.columns[name] = np.zeros(capacity, dtype=dtype)
+            self._meta = np.zeros(2, dtype=np.int64)  # [head, count]
+            return
+
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.npy")
+        stored = self._stored_capacity(path, columns) if os.path.exists(meta_path) else None
+        if stored is not None:
+            if stored != capacity:
+                print(f"Keeping the {stored}-row history in {path} ({capacity} rows requested)")
+            self.capacity = capacity = stored
+        mode = "r+" if stored is not None else "w+"
+        for name, dtype in columns.items():
+            self.columns[name] = np.lib.format.open_memmap(
+                os.path.join(path, f"{name}.npy"), mode=mode, dtype=dtype, shape=(capacity,)
+            )
+        self._meta = np.lib.format.open_memmap(meta_path, mode=mode, dtype=np.int64, shape=(2,))
+
+    @staticmethod
+    def _stored_capacity(path, columns):
+        """
+        Capacity of the history stored in `path`, or None if it is missing a
+        column or does not match `columns` (it is then recreated).
+        """
+        shapes = set()
+        for name, dtype in columns.items():
+            file_path = os.path.join(path, f"{name}.npy")
+            if not os.path.exists(file_path):
+                return None
+            existing = np.load(file_path, mmap_mode="r")
+            if existing.dtype != np.dtype(dtype) or existing.ndim != 1:
+                return None
+            shapes.add(existing.shape[0])
+        return shapes.pop() if len(shapes) == 1 else None
+
+    def __len__(self):
+        return int(self._meta[1])
+
+    def extend(self, values):
+        """
+        Append rows given as {column: array}; all arrays must have the same length.
+        """
+        n = len(next(iter(values.values())))
+        if n == 0:
+            return
+        head = int(self._meta[0])
+
+        if n >= self.capacity:
+            # Only the newest `capacity` rows fit
+            for name, column in self.columns.items():
+                column[:] = np.asarray(values[name])[-self.capacity:]
+            self._meta[0] = 0
+            self._meta[1] = self.capacity
+            return
+
+        first = min(n, self.capacity - head)
+        for name, column in self.columns.items():
+            data = np.asarray(values[name])
+            column[head:head + first] = data[:first]
+            if first < n:
+                column[:n - first] = data[first:]
+        self._meta[0] = (head + n) % self.capacity
+        self._meta[1] = min(self.capacity, int(self._meta[1]) + n)
+
+    def _first(self):
+        """
+        Physical index of the oldest row.
+        """
+        return int(self._meta[0]) if int(self._meta[1]) == self.capacity else 0
+
+    def find(self, name, start, end):
+        """
+        Chronological positions [lo, hi) of the rows whose sorted column `name`
+        lies in [start, end). Each side of the wrap is searched separately;
+        nothing is copied.
+        """
+        column = self.columns[name]
+        first, count = self._first(), len(self)
+        segments = [column[first:first + count]] if first == 0 else [column[first:], column[:first]]
+        lo = hi = 0
+        for segment in segments:
+            a, b = np.searchsorted(segment, [start, end], side="left")
+            lo += int(a)
+            hi += int(b)
+        return lo, hi
+
+    def window(self, name, lo, hi):
+        """
+        Rows [lo, hi) of a column in chronological order: a view unless the
+        window crosses the end of the ring, then a copy of just that window.
+        """
+        column = self.columns[name]
+        begin = (self._first() + lo) % self.capacity
+        if begin + (hi - lo) <= self.capacity:
+            return column[begin:begin + hi - lo]
+        return np.concatenate((column[begin:], column[:begin + hi - lo - self.capacity]))
+
+    def ordered(self, name):
+        """
+        Return a whole column in chronological order.
+        """
+        return self.window(name, 0, len(self))
+
+    def flush(self):
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+        if isinstance(self._meta, np.memmap):
+            self._meta.flush()
+
+
+class Interner:
+    """
+    Map strings (process names, statuses) to small integer ids.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.values = []
+        self.ids = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                for value in json.load(f):
+                    self.intern(value)
+
+    def intern(self, value):
+        value = str(value)
+        interned = self.ids.get(value)
+        if interned is None:
+            interned = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return interned
+
+    def save(self):
+        if self.path is not None:
+            with open(self.path, "w") as f:
+                json.dump(self.values, f)
+
+
+def downsample(timestamps, values, start, step):
+    """
+    Bucket sorted samples into `step`-second buckets starting at `start`.
+    Returns a list of {t, min, max, mean, count} dicts, one per non-empty bucket.
+    """
+    if len(values) == 0:
+        return []
+    buckets = ((timestamps - start) // step).astype(np.int64)
+    # Samples are sorted by time, so each bucket is one contiguous run
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    values = values.astype(np.float64)
+
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    means = np.add.reduceat(values, starts) / counts
+    times = start + buckets[starts] * step
+
+    return [
+        {"t": float(t), "min": round(float(lo), 3), "max": round(float(hi), 3),
+         "mean": round(float(mean), 3), "count": int(count)}
+        for t, lo, hi, mean, count in zip(times, mins, maxs, means, counts)
+    ]
+
+
+class MetricsHistory:
+    """
+    Columnar in-memory history of system metrics and per-process samples.
+    Process names and statuses are interned as integer ids. The process table
+    is kept at most every `process_interval` seconds.
+    """
+
+    def __init__(self, system_capacity=DEFAULT_SYSTEM_CAPACITY,
+                 process_capacity=DEFAULT_PROCESS_CAPACITY, path=DEFAULT_PATH,
+                 process_interval=PROCESS_INTERVAL):
+        self.path = path
+        self.process_interval = process_interval
+        self._last_process_time = None
+        system_path = os.path.join(path, "system") if path else None
+        process_path = os.path.join(path, "processes") if path else None
+        self.system = ColumnRing(SYSTEM_COLUMNS, system_capacity, system_path)
+        self.process = ColumnRing(PROCESS_COLUMNS, process_capacity, process_path)
+        self.names = Interner(os.path.join(path, "names.json") if path else None)
+        self.statuses = Interner(os.path.join(path, "statuses.json") if path else None)
+        self._lock = threading.Lock()
+
+    def record(self, snapshot, processes=None, changes=None):
+        """
+        Append one sampler tick. Usable directly as a sampler hook.
+        """
+        timestamp = snapshot["timestamp"]
+        with self._lock:
+            self.system.extend({
+                "timestamp": [timestamp],
+                "cpu_usage": [snapshot["cpu_usage"]],
+                "memory_usage": [snapshot["memory_usage"]],
+                "disk_usage": [snapshot["disk_usage"]],
+            })
+            if not processes:
+                return
+            if self._last_process_time is not None and timestamp - self._last_process_time < self.process_interval:
+                return
+            self._last_process_time = timestamp
+
+            known_names, known_statuses = len(self.names.values), len(self.statuses.values)
+            self.process.extend({
+                "timestamp": np.full(len(processes), timestamp),
+                "pid": np.fromiter((p['pid'] for p in processes), np.int32, len(processes)),
+                "name_id": np.fromiter((self.names.intern(p['name']) for p in processes), np.int32, len(processes)),
+                "cpu_percent": np.fromiter((p['cpu_percent'] for p in processes), np.float32, len(processes)),
+                "memory_percent": np.fromiter((p['memory_percent'] for p in processes), np.float32, len(processes)),
+                "status_id": np.fromiter((self.statuses.intern(p['status']) for p in processes), np.int16, len(processes)),
+            })
+            if len(self.names.values) != known_names:
+                self.names.save()
+            if len(self.statuses.values) != known_statuses:
+                self.statuses.save()
+
+    def query(self, metric, start=None, end=None, step=None, pid=None, name=None):
+        """
+        Return `metric` between `start` and `end` (epoch seconds) downsampled into
+        `step`-second buckets with min/max/mean. Process metrics can be narrowed
+        to one pid or one process name; otherwise all processes share each bucket.
+        """
+        if metric not in SYSTEM_METRICS and metric not in PROCESS_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Choose from: {', '.join(SYSTEM_METRICS + PROCESS_METRICS)}")
+
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        if end <= start:
+            raise ValueError("'from' must be earlier than 'to'")
+        # Default to about 500 buckets across the requested range
+        step = step if step and step > 0 else max(1.0, (end - start) / 500)
+
+        with self._lock:
+            if metric in SYSTEM_METRICS:
+                ring, column = self.system, metric
+            else:
+                ring, column = self.process, metric.split(".", 1)[1]
+
+            lo, hi = ring.find("timestamp", start, end)
+            timestamps = ring.window("timestamp", lo, hi)
+            values = ring.window(column, lo, hi)
+
+            if ring is self.process:
+                mask = np.ones(len(values), dtype=bool)
+                if pid is not None:
+                    mask &= ring.window("pid", lo, hi) == pid
+                if name is not None:
+                    name_id = self.names.ids.get(name, -1)
+                    mask &= ring.window("name_id", lo, hi) == name_id
+                timestamps, values = timestamps[mask], values[mask]
+
+            points = downsample(timestamps, values, start, step)
+
+        return {"metric": metric, "from": start, "to": end, "step": step, "points": points}
+
+    def flush(self):
+        with self._lock:
+            self.system.flush()
+            self.process.flush()
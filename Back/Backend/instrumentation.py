@@ -0,0 +1,228 @@
+# Import required libraries
+import bisect
+import functools
+import os
+import threading
+import time
+
+import psutil
+
+# Self-instrumentation switch (METRICS_ENABLED=0 turns it off). When off, the
+# decorators below return the original functions and /metrics is not served,
+# so nothing is timed or counted.
+ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Routes timed by instrument_routes() unless given explicitly
+DEFAULT_ROUTES = ("/api/anomalies", "/api/system-metrics", "/processes", "/api/process-anomalies", "/api/processes")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Histogram:
+    """
+    Prometheus histogram with fixed buckets, one series per label value tuple.
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        names = self.labelnames + ("le",)
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {values[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Prometheus gauge (or counter, with kind="counter") holding one value per label tuple.
+    """
+
+    def __init__(self, name, help_text, labelnames=(), kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._values = {}
+
+    def set(self, value, labels=()):
+        self._values[labels] = value
+
+    def inc(self, amount=1, labels=()):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The analyzer's own metrics, rendered in the Prometheus text format.
+    Callbacks added with add_collector() refresh gauges at scrape time.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, callback):
+        self._collectors.append(callback)
+
+    def render(self):
+        for callback in self._collectors:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "analyzer_request_duration_seconds", "Request latency by route.", ("route", "status")
+))
+STAGE_SECONDS = registry.register(Histogram(
+    "analyzer_stage_duration_seconds",
+    "Time spent in hot-path stages (collection, scaler, predict, render).", ("stage",)
+))
+PROCESSES_PER_TICK = registry.register(Gauge(
+    "analyzer_processes_enumerated", "Processes enumerated on the last sampler tick."
+))
+TICKS = registry.register(Gauge("analyzer_ticks_total", "Sampler ticks completed.", kind="counter"))
+CPU_SECONDS = registry.register(Gauge(
+    "process_cpu_seconds_total", "CPU time used by the analyzer process.", ("mode",), kind="counter"
+))
+RSS_BYTES = registry.register(Gauge("process_resident_memory_bytes", "Resident memory of the analyzer process."))
+THREADS = registry.register(Gauge("process_threads", "Threads in the analyzer process."))
+TICK_CPU_SECONDS = registry.register(Histogram(
+    "analyzer_tick_cpu_seconds", "Sampler thread CPU time per tick, with and without a process refresh.", ("kind",)
+))
+SAMPLING_INTERVAL = registry.register(Gauge(
+    "analyzer_sampling_interval_seconds", "Seconds between system ticks and between process refreshes.", ("kind",)
+))
+SAMPLING_CPU_FRACTION = registry.register(Gauge(
+    "analyzer_sampling_cpu_fraction", "Share of one core spent sampling over the last minute."
+))
+
+_self = psutil.Process()
+
+
+def _collect_self():
+    times = _self.cpu_times()
+    CPU_SECONDS.set(times.user, ("user",))
+    CPU_SECONDS.set(times.system, ("system",))
+    RSS_BYTES.set(_self.memory_info().rss)
+    THREADS.set(_self.num_threads())
+
+
+registry.add_collector(_collect_self)
+
+
+def timed_stage(stage):
+    """
+    Decorator recording a function's duration under `stage`.
+    Returns the function unchanged when instrumentation is disabled.
+    """
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+        labels = (stage,)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, labels)
+        return wrapper
+    return decorator
+
+
+def instrument_routes(app, routes=DEFAULT_ROUTES):
+    """
+    Wrap the view functions behind `routes` with latency timers.
+    Does nothing when instrumentation is disabled.
+    """
+    if not ENABLED:
+        return
+    for rule in app.url_map.iter_rules():
+        if rule.rule not in routes:
+            continue
+        view = app.view_functions[rule.endpoint]
+        app.view_functions[rule.endpoint] = _timed_view(view, rule.rule)
+
+
+def _timed_view(view, route):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        status = 500
+        try:
+            result = view(*args, **kwargs)
+            if isinstance(result, tuple):
+                status = result[1]
+            else:
+                status = getattr(result, "status_code", 200)
+            return result
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, (route, status))
+    return wrapper
+
+
+def record_tick(snapshot, processes=None, changes=None):
+    """
+    Sampler hook: count ticks and processes enumerated per tick.
+    """
+    TICKS.inc()
+    if processes is not None:
+        PROCESSES_PER_TICK.set(len(processes))
+
+
+def metrics_view():
+    """
+    The /metrics endpoint (Prometheus text exposition format).
+    """
+    from flask import Response
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -3,17 +3,49 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.ensemble import IsolationForest
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, precision_recall_fscore_support
+import sklearn
 import joblib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataset_io import column_names, read_columns, read_dataset
+from fast_forest import FlatIsolationForest
+import itertools
 import os
+import registry
+import sys
+import time
+
+# Features the served model is trained on (app.py scores [cpu, memory])
+FEATURE_COLUMNS = ['CPU_Usage', 'Memory_Usage']
+
+# Rows read per dataset chunk and rows kept for training when streaming
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_SAMPLE_SIZE = 200_000
+
+# Candidates trained by --sweep: every combination of these values
+SWEEP_GRID = {
+    'contamination': [0.05, 0.1, 0.15],
+    'n_estimators': [50, 100, 200],
+    'max_samples': [64, 256, 1024],
+    'features': [FEATURE_COLUMNS, ['CPU_Usage'], ['Memory_Usage']],
+}
+
+# Candidates whose anomaly F1 is within this of the best are ranked by latency
+F1_TOLERANCE = 0.01
+
+# Batch latencies within this fraction of the fastest count as equal (timing
+# noise); among those the higher F1 wins
+LATENCY_NOISE = 0.2
 
 # Step 1: Load the Dataset
-def load_data(file_path):
+def load_data(file_path, columns=None):
     """
-    Load dataset from a CSV file.
+    Load dataset from a CSV, Parquet or Feather file (by extension).
+    Columnar files read only `columns` when given.
     """
     try:
-        df = pd.read_csv(file_path)
+        df = read_dataset(file_path, columns=columns)
         print("Dataset loaded successfully.")
         return df
     except Exception as e:
@@ -53,20 +85,139 @@ def preprocess_data(df):
 
     # Create a synthetic label column for anomalies
     print("Creating synthetic label column...")
-    df['label'] = df.apply(
-        lambda row: -1 if (
-            row['CPU_Usage'] > 0.9 or
-            row['Memory_Usage'] > 0.9 or
-            'process_state_Zombie' in row or
-            'process_state_Orphan' in row
-        ) else 1,
-        axis=1
-    )
+    df['label'] = label_rows(df)
 
     print("Data preprocessing completed.")
     return df, scaler
 
 
+def label_rows(df):
+    """
+    Synthetic anomaly labels built with column operations instead of a per-row apply:
+    -1 when scaled CPU or memory is above 0.9 or the row is flagged Zombie/Orphan, else 1.
+    """
+    anomalous = np.zeros(len(df), dtype=bool)
+    for col in ['CPU_Usage', 'Memory_Usage']:
+        if col in df.columns:
+            anomalous |= (df[col] > 0.9).to_numpy()
+    for col in ['process_state_Zombie', 'process_state_Orphan']:
+        if col in df.columns:
+            anomalous |= (df[col] == 1).to_numpy()
+    return np.where(anomalous, -1, 1)
+
+
+def resolve_columns(file_path, wanted):
+    """
+    Map the wanted feature names to the file's header, ignoring case
+    (the generator writes cpu_usage, the trainer uses CPU_Usage).
+    """
+    header = column_names(file_path)
+    lookup = {col.lower(): col for col in header}
+    missing = [col for col in wanted if col.lower() not in lookup]
+    if missing:
+        raise ValueError(f"Columns {missing} not found in {file_path}")
+    return {lookup[col.lower()]: col for col in wanted}
+
+
+def read_feature_chunks(file_path, features, chunksize):
+    """
+    Stream only the feature columns of a dataset, coerced to numeric, in chunks.
+    Parquet/Feather files skip the other columns on disk; CSV still parses each line.
+    """
+    columns = resolve_columns(file_path, features)
+    for chunk in read_columns(file_path, list(columns), chunksize):
+        chunk = chunk.rename(columns=columns)[features]
+        # Column-wise, coerce errors to NaN; float64 keeps the running sums exact
+        yield chunk.apply(pd.to_numeric, errors='coerce').astype(np.float64)
+
+
+def scan_statistics(file_path, features=FEATURE_COLUMNS, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    One pass over the dataset collecting the column means (for missing values)
+    and the min/max scaler statistics, without loading the whole file.
+    """
+    sums = pd.Series(0.0, index=features)
+    counts = pd.Series(0, index=features)
+    scaler = MinMaxScaler()
+    rows = 0
+    for chunk in read_feature_chunks(file_path, features, chunksize):
+        sums += chunk.sum()
+        counts += chunk.count()
+        # partial_fit ignores NaN, and the means used to fill gaps lie inside
+        # [min, max], so the result equals fitting on the filled data
+        scaler.partial_fit(chunk)
+        rows += len(chunk)
+    means = sums / counts.where(counts > 0)
+    return means.fillna(0.0), scaler, rows
+
+
+def preprocess_stream(file_path, features=FEATURE_COLUMNS, chunksize=DEFAULT_CHUNKSIZE,
+                      sample_size=DEFAULT_SAMPLE_SIZE, seed=42):
+    """
+    Chunked version of preprocess_data for datasets too large to load at once.
+    Pass 1 computes the fill means and scaler statistics; pass 2 fills, scales
+    and labels each chunk and keeps a uniform random sample of at most
+    `sample_size` rows for training, so memory stays bounded by the chunk and
+    sample sizes. Returns (sample DataFrame with a label column, fitted scaler, stats).
+    """
+    print("Preprocessing data in chunks...")
+    start = time.perf_counter()
+    means, scaler, rows = scan_statistics(file_path, features, chunksize)
+
+    rng = np.random.default_rng(seed)
+    sample_X = np.empty((0, len(features)), dtype=np.float64)
+    sample_y = np.empty(0, dtype=np.int8)
+    sample_keys = np.empty(0, dtype=np.float64)
+    anomalies = 0
+
+    for chunk in read_feature_chunks(file_path, features, chunksize):
+        chunk = chunk.fillna(means)
+        scaled = pd.DataFrame(scaler.transform(chunk), columns=features)
+        labels = label_rows(scaled).astype(np.int8)
+        anomalies += int((labels == -1).sum())
+
+        # Bottom-k sampling: every row gets a random key and the k smallest keys
+        # seen so far form a uniform sample without replacement
+        keys = rng.random(len(scaled))
+        sample_X = np.vstack([sample_X, scaled.to_numpy()])
+        sample_y = np.concatenate([sample_y, labels])
+        sample_keys = np.concatenate([sample_keys, keys])
+        if len(sample_keys) > sample_size:
+            keep = np.argpartition(sample_keys, sample_size)[:sample_size]
+            sample_X, sample_y, sample_keys = sample_X[keep], sample_y[keep], sample_keys[keep]
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "rows": rows,
+        "anomalies": anomalies,
+        "sample_rows": len(sample_y),
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(2 * rows / elapsed) if elapsed else 0,  # Two passes
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"Preprocessed {rows} rows in {stats['seconds']}s "
+          f"({stats['rows_per_second']} rows/s over two passes, peak RSS {stats['peak_rss_mb']} MB).")
+
+    df = pd.DataFrame(sample_X, columns=features)
+    df['label'] = sample_y
+    return df, scaler, stats
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB.
+    """
+    if sys.platform == 'win32':
+        # No resource module on Windows; psutil reports the peak working set
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
 # Step 3: Split the Data into Training and Testing Sets
 def split_data(df):
     """
@@ -120,6 +271,141 @@ def save_model(model, scaler, model_path, scaler_path):
     print(f"Model saved to {model_path} and scaler saved to {scaler_path}.")
 
 
+# Step 6b: Sweep hyperparameters and register the winners
+def sweep_candidates(grid=SWEEP_GRID):
+    """
+    Every combination of the grid values, as a list of parameter dicts.
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def build_model(params):
+    """
+    An unfitted IsolationForest for one sweep candidate.
+    """
+    return IsolationForest(
+        n_estimators=params['n_estimators'],
+        max_samples=params['max_samples'],
+        contamination=params['contamination'],
+        random_state=42,
+    )
+
+
+def score_model(model, X_test, y_test, repeats=50):
+    """
+    evaluate_model's metrics as numbers (anomaly class -1 is the positive class)
+    plus serving latency, timed on the flattened forest the API scores with.
+    """
+    y_pred = model.predict(X_test)
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        y_test, y_pred, pos_label=-1, average='binary', zero_division=0
+    )
+    metrics = {
+        'precision': round(float(precision), 4),
+        'recall': round(float(recall), 4),
+        'f1': round(float(f1), 4),
+        'accuracy': round(float(accuracy_score(y_test, y_pred)), 4),
+    }
+
+    forest = FlatIsolationForest.from_sklearn(model)
+    X = np.ascontiguousarray(X_test, dtype=np.float64)
+    timings = {}
+    for name, batch in (('single_row_ms', X[:1]), ('batch_1000_ms', X[:1000])):
+        forest.decision_function(batch)  # Warm-up
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            forest.decision_function(batch)
+            samples.append(time.perf_counter() - start)
+        timings[name] = round(float(np.median(samples)) * 1000, 4)
+    return metrics, timings
+
+
+# Training data shared with sweep workers once, instead of pickled per task
+_sweep_data = {}
+
+
+def _init_sweep_worker(X_train, X_test, y_test):
+    import warnings
+    warnings.filterwarnings('ignore')  # max_samples above the sample size is clipped, quietly
+    _sweep_data.update(X_train=X_train, X_test=X_test, y_test=y_test)
+
+
+def _fit_candidate(params):
+    # Runs in a worker process; returns only numbers, the winners are refitted by the caller
+    features = params['features']
+    start = time.perf_counter()
+    model = build_model(params).fit(_sweep_data['X_train'][features])
+    fit_seconds = time.perf_counter() - start
+    metrics, latency = score_model(model, _sweep_data['X_test'][features], _sweep_data['y_test'])
+    return {'params': params, 'metrics': metrics, 'latency': latency, 'fit_seconds': round(fit_seconds, 3)}
+
+
+def rank_candidates(results, f1_tolerance=F1_TOLERANCE, latency_noise=LATENCY_NOISE):
+    """
+    Order sweep results. Candidates within `f1_tolerance` of the best anomaly F1
+    come first: those whose 1000-row batch latency is within `latency_noise` of
+    the fastest of them by F1, then the slower ones by latency. The rest follow
+    by F1. Single-row latency is too close to timing noise to rank on.
+    """
+    best_f1 = max(r['metrics']['f1'] for r in results)
+    near = [r for r in results if r['metrics']['f1'] >= best_f1 - f1_tolerance]
+    fastest = min(r['latency']['batch_1000_ms'] for r in near)
+
+    def key(r):
+        if r['metrics']['f1'] < best_f1 - f1_tolerance:
+            return (2, -r['metrics']['f1'])
+        if r['latency']['batch_1000_ms'] <= fastest * (1 + latency_noise):
+            return (0, -r['metrics']['f1'])
+        return (1, r['latency']['batch_1000_ms'])
+
+    return sorted(results, key=key)
+
+
+def sweep(X_train, X_test, y_test, grid=SWEEP_GRID, jobs=None):
+    """
+    Fit and score every grid candidate in parallel over a process pool.
+    Returns the results ranked by rank_candidates.
+    """
+    candidates = sweep_candidates(grid)
+    print(f"Sweeping {len(candidates)} candidates over {jobs or os.cpu_count()} processes...")
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_sweep_worker,
+                             initargs=(X_train, X_test, y_test)) as pool:
+        results = list(pool.map(_fit_candidate, candidates))
+    return rank_candidates(results)
+
+
+def register_winners(ranked, X_train, scaler, top=1, registry_dir=registry.DEFAULT_REGISTRY,
+                     promote=True, extra=None):
+    """
+    Refit the `top` ranked candidates and store each as a registry version with
+    its manifest. The first one becomes the current model when `promote` is set.
+    Returns the registered version names.
+    """
+    versions = []
+    for rank, result in enumerate(ranked[:top], start=1):
+        params = result['params']
+        model = build_model(params).fit(X_train[params['features']])
+        manifest = dict(
+            extra or {},
+            params={k: v for k, v in params.items() if k != 'features'},
+            features=params['features'],
+            scaler_features=list(scaler.feature_names_in_),
+            metrics=result['metrics'],
+            latency=result['latency'],
+            fit_seconds=result['fit_seconds'],
+            sweep_rank=rank,
+            sweep_candidates=len(ranked),
+            sklearn_version=sklearn.__version__,
+        )
+        version = registry.register(model, scaler, manifest, registry_dir, promote=promote and rank == 1)
+        print(f"Registered {version}: {params} f1={result['metrics']['f1']} "
+              f"latency={result['latency']['batch_1000_ms']}ms per 1000 rows")
+        versions.append(version)
+    return versions
+
+
 # Step 7: Inject Synthetic Anomalies
 def inject_anomalies(df):
     """
@@ -148,26 +434,57 @@ def inject_anomalies(df):
     return df
 
 
+def parse_args():
+    """
+    Command-line options for the training script.
+    """
+    parser = argparse.ArgumentParser(description="Train the process anomaly detection model.")
+    parser.add_argument("--data", default="data/os_processes_data.csv",
+                        help="dataset file (.csv, .parquet or .feather)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows read per chunk")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE,
+                        help="rows kept for training and evaluation")
+    parser.add_argument("--sweep", action="store_true",
+                        help="train the SWEEP_GRID candidates and register the winners instead of one model")
+    parser.add_argument("--jobs", type=int, default=None, help="sweep worker processes (default: all CPUs)")
+    parser.add_argument("--top", type=int, default=1, help="sweep winners to register")
+    parser.add_argument("--registry", default=registry.DEFAULT_REGISTRY, help="model registry directory")
+    parser.add_argument("--no-promote", action="store_true",
+                        help="register sweep winners without making the best one current")
+    return parser.parse_args()
+
+
 # Main Function
 if __name__ == "__main__":
+    args = parse_args()
+
     # Define file paths
-    dataset_path = "data/os_processes_data.csv"  # Path to your dataset
+    dataset_path = args.data  # Path to your dataset
     model_path = "models/anomaly_detection_model.pkl"
     scaler_path = "models/scaler.pkl"
 
-    # Step 1: Load the dataset
-    df = load_data(dataset_path)
-    if df is None:
+    # Step 1-2: Stream, clean and scale the dataset in chunks
+    try:
+        df, scaler, stats = preprocess_stream(dataset_path, chunksize=args.chunksize,
+                                              sample_size=args.sample_size)
+    except Exception as e:
+        print(f"Error loading dataset: {e}")
         exit()
 
-    # Step 2: Preprocess the data
-    df, scaler = preprocess_data(df)
-
     # Step 3: Inject synthetic anomalies
     df = inject_anomalies(df)
 
-    # Step 4: Split the data
-    X_train, X_test, y_train, y_test = split_data(df)
+    # Step 4: Split the data (train on the features the API scores)
+    X_train, X_test, y_train, y_test = split_data(df[FEATURE_COLUMNS + ['label']])
+
+    if args.sweep:
+        ranked = sweep(X_train, X_test, y_test, jobs=args.jobs)
+        for result in ranked[:5]:
+            print(f"  {result['params']} {result['metrics']} {result['latency']}")
+        register_winners(ranked, X_train, scaler, top=args.top, registry_dir=args.registry,
+                         promote=not args.no_promote,
+                         extra={'dataset': os.path.abspath(dataset_path), 'training_rows': len(X_train)})
+        exit()
 
     # Step 5: Train the model
     model = train_model(X_train)
@@ -176,4 +493,4 @@ if __name__ == "__main__":
     evaluate_model(model, X_test, y_test)
 
     # Step 7: Save the model and scaler
-    save_model(model, scaler, model_path, scaler_path)
\ No newline at end of file
+    save_model(model, scaler, model_path, scaler_path)
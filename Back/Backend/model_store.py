@@ -0,0 +1,199 @@
+# Import required libraries
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import registry
+from instrumentation import timed_stage
+
+# Legacy model files, used when the registry has no current version
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+LEGACY_MODEL = os.path.join(MODELS_DIR, "anomaly_detection_model.pkl")
+LEGACY_SCALER = os.path.join(MODELS_DIR, "scaler.pkl")
+
+# Seconds between registry checks for a newly promoted version (0 disables the watcher)
+DEFAULT_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "5.0"))
+
+# Seconds to wait before retrying after a failed load
+RETRY_INTERVAL = 30.0
+
+# Suffix of the cached flattened forest stored next to a model file
+FLAT_SUFFIX = ".flat.joblib"
+
+# Everything needed to score one batch; replaced as a whole on reload
+ModelBundle = namedtuple("ModelBundle", ["model", "scaler", "detector", "columns", "version", "loaded_at"])
+
+
+def _flat_forest(model_path, load_model):
+    """
+    The flattened forest for a model, memory-mapped from its on-disk cache.
+    The cache is built on first use; afterwards the sklearn model is never
+    unpickled and every worker process shares the same read-only pages.
+    """
+    import joblib
+    from fast_forest import FlatIsolationForest
+
+    flat_path = model_path + FLAT_SUFFIX
+    if os.path.exists(flat_path) and os.path.getmtime(flat_path) >= os.path.getmtime(model_path):
+        return joblib.load(flat_path, mmap_mode="r")
+
+    forest = FlatIsolationForest.from_sklearn(load_model())
+    try:
+        # Write beside the model and rename, so concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(flat_path), suffix=".tmp")
+        os.close(fd)
+        joblib.dump(forest, tmp_path)
+        os.replace(tmp_path, flat_path)
+        return joblib.load(flat_path, mmap_mode="r")
+    except OSError as e:
+        print(f"Could not cache flattened model at {flat_path}: {e}")
+        return forest
+
+
+class ModelStore:
+    """
+    Holds the model, scaler and detector the API scores with.
+    Nothing is loaded at import: the first get() loads the registry's current
+    version (or the legacy models/*.pkl files), memory-mapped where possible.
+    reload() builds a complete new bundle before swapping one reference, so
+    requests in flight finish on the old model and none are dropped.
+    """
+
+    def __init__(self, registry_dir=registry.DEFAULT_REGISTRY, fast=None, on_swap=None):
+        self.registry_dir = registry_dir
+        # Score with the flattened array-based forest unless FAST_FOREST=0
+        self.fast = os.environ.get("FAST_FOREST", "1") != "0" if fast is None else fast
+        self.on_swap = on_swap  # Optional callable(bundle) run after each swap
+        self._bundle = None
+        self._lock = threading.Lock()  # Serializes loads, never held while scoring
+        self._next_attempt = 0.0
+        self._seen_current = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self.error = None
+
+    def get(self):
+        """
+        The current ModelBundle, loading it on first use. None if no model can be loaded.
+        """
+        bundle = self._bundle
+        if bundle is not None:
+            return bundle
+        if time.monotonic() < self._next_attempt:
+            return None
+        with self._lock:
+            if self._bundle is None and time.monotonic() >= self._next_attempt:
+                try:
+                    self._swap(*self._load())
+                except Exception as e:
+                    self.error = str(e)
+                    self._next_attempt = time.monotonic() + RETRY_INTERVAL
+                    print(f"Error loading model or scaler: {e}")
+            return self._bundle
+
+    def reload(self, version=None):
+        """
+        Load `version` (the registry's current one by default) and swap it in.
+        Raises if loading fails; the previous model then stays in service.
+        """
+        with self._lock:
+            self._swap(*self._load(version))
+            return self._bundle.version
+
+    def _swap(self, bundle, current):
+        self._bundle = bundle  # Single reference assignment: readers see old or new, never a mix
+        # The registry's current version as of this load; only recorded once the
+        # load succeeded, so the watcher retries a failed reload
+        self._seen_current = current
+        self.error = None
+        print(f"Model {bundle.version} loaded.")
+        if self.on_swap is not None:
+            self.on_swap(bundle)
+
+    def _load(self, version=None):
+        """
+        Load `version` (default: the registry's current one).
+        Returns the bundle and the current version seen when loading started.
+        """
+        import joblib
+
+        current = registry.current_version(self.registry_dir)
+        version = version or current
+        if version is not None:
+            directory = os.path.join(self.registry_dir, version)
+            model_path = os.path.join(directory, registry.MODEL_FILE)
+            scaler_path = os.path.join(directory, registry.SCALER_FILE)
+            manifest = registry.read_manifest(version, self.registry_dir)
+        else:
+            model_path, scaler_path, manifest = LEGACY_MODEL, LEGACY_SCALER, {}
+            version = "legacy"
+
+        scaler = joblib.load(scaler_path, mmap_mode="r")
+
+        # Models trained on a feature subset score only those scaled columns
+        columns = None
+        if manifest.get("features") and manifest.get("scaler_features"):
+            columns = [manifest["scaler_features"].index(f) for f in manifest["features"]]
+            if columns == list(range(len(manifest["scaler_features"]))):
+                columns = None
+
+        model = None
+        if self.fast:
+            detector = _flat_forest(model_path, lambda: joblib.load(model_path, mmap_mode="r"))
+        else:
+            model = joblib.load(model_path, mmap_mode="r")
+            detector = model
+        return ModelBundle(model, scaler, detector, columns, version, time.time()), current
+
+    def watch(self, interval=DEFAULT_WATCH_INTERVAL):
+        """
+        Start a thread that reloads the model whenever the registry's current
+        version changes (promote or rollback). Loading happens on this thread,
+        off the request path.
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                current = registry.current_version(self.registry_dir)
+                if current is not None and current != self._seen_current:
+                    self.reload(current)
+            except Exception as e:
+                # Keep serving the loaded model; try again on the next check
+                print(f"Error reloading model: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        """
+        Loaded version and load state, for the API.
+        """
+        bundle = self._bundle
+        return {
+            "loaded": bundle is not None,
+            "version": bundle.version if bundle else None,
+            "loaded_at": bundle.loaded_at if bundle else None,
+            "registry_current": registry.current_version(self.registry_dir),
+            "detector": type(bundle.detector).__name__ if bundle else None,
+            "error": self.error,
+        }
+
+
+@timed_stage("scaler_transform")
+def scale_features(bundle, features):
+    """
+    Scale raw [cpu, memory] rows and keep the columns the bundle's model uses.
+    """
+    scaled = bundle.scaler.transform(np.asarray(features, dtype=float))
+    if bundle.columns is not None:
+        scaled = scaled[:, bundle.columns]
+    return scaled
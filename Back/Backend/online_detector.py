@@ -0,0 +1,354 @@
+# Import required libraries
+import os
+
+import numpy as np
+
+# z-score beyond which a metric counts as anomalous
+Z_THRESHOLD = float(os.environ.get("ONLINE_Z_THRESHOLD", "4.0"))
+
+# Smallest standard deviation used in z-scores, in percentage points, so an
+# idle metric with zero variance does not alarm on a tiny change
+MIN_STD = 1.0
+
+# Weight of the newest sample in the exponentially weighted statistics
+EWMA_ALPHA = 0.05
+
+# Samples needed before verdicts are issued
+WARMUP = 30
+
+# Half-space tree scores below this share of their running average are anomalous
+HST_RATIO = 0.2
+
+# Most processes tracked per host; the least recently seen are evicted first
+MAX_PROCESSES = 8192
+
+# Process rows per half-space tree window
+PROCESS_WINDOW = 16384
+
+SYSTEM_METRICS = ("cpu_usage", "memory_usage", "disk_usage")
+PROCESS_METRICS = ("cpu_percent", "memory_percent")
+
+
+class RunningStats:
+    """
+    O(1)-per-update statistics for many independent series at once (one per
+    column of `values`): Welford's running mean and variance over all samples
+    (the long-run baseline), plus an exponentially weighted mean and variance
+    that follow the baseline as it drifts. Rows are series slots, reused after
+    reset().
+    """
+
+    def __init__(self, slots, width, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self.count = np.zeros(slots, dtype=np.int64)
+        self.mean = np.zeros((slots, width))
+        self.m2 = np.zeros((slots, width))
+        self.ewma = np.zeros((slots, width))
+        self.ewvar = np.zeros((slots, width))
+
+    def update(self, slots, values):
+        """
+        Add one sample per slot; `slots` must not repeat within a call.
+        """
+        count = self.count[slots] + 1
+        delta = values - self.mean[slots]
+        mean = self.mean[slots] + delta / count[:, None]
+        self.m2[slots] += delta * (values - mean)
+        self.mean[slots] = mean
+        self.count[slots] = count
+
+        first = count == 1
+        ew_delta = values - self.ewma[slots]
+        ewma = np.where(first[:, None], values, self.ewma[slots] + self.alpha * ew_delta)
+        ewvar = np.where(first[:, None], 0.0,
+                         (1 - self.alpha) * (self.ewvar[slots] + self.alpha * ew_delta ** 2))
+        self.ewma[slots] = ewma
+        self.ewvar[slots] = ewvar
+
+    def zscores(self, slots, values):
+        """
+        How many standard deviations each value is from its series' baseline:
+        the smaller of its distance to the recent (EWMA) baseline and to the
+        long-run (Welford) one. A value counts as unusual only against both,
+        so neither a level the host has often been at nor a shift the EWMA
+        has already adapted to keeps alarming.
+        """
+        recent = (values - self.ewma[slots]) / np.maximum(np.sqrt(self.ewvar[slots]), MIN_STD)
+        long_run = (values - self.mean[slots]) / np.maximum(np.sqrt(self.variance(slots)), MIN_STD)
+        return np.where(np.abs(long_run) < np.abs(recent), long_run, recent)
+
+    def variance(self, slots):
+        count = self.count[slots][:, None]
+        return np.where(count > 1, self.m2[slots] / np.maximum(count - 1, 1), 0.0)
+
+    def reset(self, slots):
+        self.count[slots] = 0
+        for array in (self.mean, self.m2, self.ewma, self.ewvar):
+            array[slots] = 0.0
+
+
+class HalfSpaceTrees:
+    """
+    Streaming anomaly scorer (Tan, Ting & Liu, 2011). Random trees split a
+    fixed workspace in half at every level; each node counts the samples that
+    reached it in the previous window (reference mass) and in the current one.
+    When a window fills, its counts become the reference. Points landing in
+    sparsely populated regions get low scores. Memory is fixed by the number
+    of trees and their depth; all trees are walked at once with NumPy indexing.
+    Inputs are expected in [0, 1].
+    """
+
+    def __init__(self, n_features, n_trees=25, depth=8, window=256, size_limit=None, seed=0):
+        rng = np.random.default_rng(seed)
+        self.depth = depth
+        self.window = window
+        self.size_limit = 0.1 * window if size_limit is None else size_limit
+        internal = 2 ** depth - 1
+        self.split_dim = rng.integers(n_features, size=(n_trees, internal))
+        self.split_value = np.empty((n_trees, internal))
+
+        # Workspace per tree: a random box around [0, 1]^d, halved at each node
+        s = rng.random((n_trees, n_features))
+        half = 2 * np.maximum(s, 1 - s)
+        low, high = s - half, s + half
+        for t in range(n_trees):
+            bounds = {0: (low[t].copy(), high[t].copy())}
+            for node in range(internal):
+                lo, hi = bounds.pop(node)
+                dim = self.split_dim[t, node]
+                mid = (lo[dim] + hi[dim]) / 2
+                self.split_value[t, node] = mid
+                left_hi, right_lo = hi.copy(), lo.copy()
+                left_hi[dim], right_lo[dim] = mid, mid
+                bounds[2 * node + 1] = (lo, left_hi)
+                bounds[2 * node + 2] = (right_lo, hi)
+
+        n_nodes = 2 ** (depth + 1) - 1
+        self.reference = np.zeros((n_trees, n_nodes))
+        self.latest = np.zeros((n_trees, n_nodes))
+        self.seen = 0  # Samples in the current window
+        self.windows = 0  # Completed windows
+        self._trees = np.arange(n_trees)
+        self._tree_offset = (self._trees * n_nodes).astype(np.int32)
+        self._internal_base = (self._trees * internal).astype(np.int32)
+        self._split_dim_flat = self.split_dim.ravel()
+        self._split_value_flat = self.split_value.ravel()
+        self._level_weight = 2.0 ** np.arange(depth + 1)
+
+    def _paths(self, X):
+        # Node visited at every level of every tree: shape (depth + 1, rows, trees).
+        # Nodes are indexed in the flattened (tree, node) tables so each level is one np.take
+        flat_X = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        paths = np.zeros((self.depth + 1, len(X), len(self._trees)), dtype=np.int32)
+        for level in range(self.depth):
+            node = paths[level]
+            index = node + self._internal_base
+            values = np.take(flat_X, np.take(self._split_dim_flat, index) + row_base)
+            np.multiply(node, 2, out=paths[level + 1])
+            paths[level + 1] += 1
+            paths[level + 1] += values > np.take(self._split_value_flat, index)
+        return paths
+
+    def _mass_scores(self, paths):
+        mass = np.take(self.reference, paths + self._tree_offset)
+        # A path ends at the first node whose reference mass is at most size_limit, or at the leaf
+        small = mass <= self.size_limit
+        level = np.where(small.any(axis=0), small.argmax(axis=0), self.depth)
+        terminal = np.take_along_axis(mass, level[None], axis=0)[0]
+        return (terminal * self._level_weight[level]).sum(axis=1)
+
+    def _count(self, paths):
+        # Count visits with one bincount over (tree, node) positions in the flat table
+        flat = (paths + self._tree_offset).ravel()
+        self.latest += np.bincount(flat, minlength=self.latest.size).reshape(self.latest.shape)
+
+    def score(self, X):
+        """
+        Mass scores for rows of X (higher is more normal).
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        return self._mass_scores(self._paths(X))
+
+    def update(self, X, paths=None):
+        """
+        Count rows of X in the current window, rolling windows as they fill.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        paths = self._paths(X) if paths is None else paths
+        while paths.shape[1]:
+            take = paths[:, :self.window - self.seen]
+            paths = paths[:, take.shape[1]:]
+            self._count(take)
+            self.seen += take.shape[1]
+            if self.seen >= self.window:
+                self.reference, self.latest = self.latest, self.reference
+                self.latest[:] = 0
+                self.seen = 0
+                self.windows += 1
+
+    def score_update(self, X):
+        """
+        Score rows of X against the reference window, then count them; walks the trees once.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        paths = self._paths(X)
+        scores = self._mass_scores(paths) if self.ready else None
+        self.update(X, paths)
+        return scores
+
+    @property
+    def ready(self):
+        return self.windows > 0
+
+
+class OnlineDetector:
+    """
+    Online anomaly detection for one host, fed one sampler tick at a time.
+    System metrics and every process get their own running statistics;
+    a half-space tree forest learns the joint distribution of system metrics
+    and another the host's process mix. Each tick is scored against the
+    baseline learned so far and then added to it, so the host's own normal
+    behavior is learned continuously with no training pass. Memory is bounded
+    by MAX_PROCESSES and the tree sizes.
+    Scores follow decision_function: negative means anomaly.
+    """
+
+    def __init__(self, max_processes=MAX_PROCESSES, z_threshold=Z_THRESHOLD, seed=0, cpu_count=None):
+        self.z_threshold = z_threshold
+        # Process CPU % can exceed 100, up to 100 per CPU of the host being scored
+        self.cpu_scale = 100.0 * (cpu_count or os.cpu_count() or 1)
+
+        self.system_stats = RunningStats(1, len(SYSTEM_METRICS))
+        self.system_hst = HalfSpaceTrees(len(SYSTEM_METRICS), seed=seed)
+        self.system_hst_level = RunningStats(1, 1)
+
+        self.process_stats = RunningStats(max_processes, len(PROCESS_METRICS))
+        # One tick holds a row per process, so the process window spans several ticks;
+        # fewer trees keep the per-tick cost low with thousands of rows
+        self.process_hst = HalfSpaceTrees(len(PROCESS_METRICS), n_trees=10, window=PROCESS_WINDOW, seed=seed + 1)
+        self.process_hst_level = RunningStats(1, 1)
+        self._slots = {}  # pid -> (create_time, slot)
+        self._slot_pid = np.zeros(max_processes, dtype=np.int64)
+        self._free = list(range(max_processes - 1, -1, -1))
+        self._last_seen = np.full(max_processes, np.iinfo(np.int64).max, dtype=np.int64)
+
+        self.ticks = 0
+        self.system_result = None
+        self.process_scores = {}  # pid -> score from the latest tick
+
+    def _margins(self, stats, hst, hst_level, slots, values, scaled):
+        """
+        Score rows against the baselines (z-score margin and tree-mass margin), then learn them.
+        """
+        z = stats.zscores(slots, values)
+        z_margin = 1.0 - np.abs(z).max(axis=1) / self.z_threshold
+        z_margin[stats.count[slots] < WARMUP] = 1.0
+
+        mass = hst.score_update(scaled)
+        if mass is not None:
+            typical = max(hst_level.ewma[0, 0], 1e-9)
+            hst_margin = mass / typical - HST_RATIO
+            hst_level.update(np.array([0]), np.array([[mass.mean()]]))
+        else:
+            hst_margin = np.ones(len(values))
+        stats.update(slots, values)
+        return z, np.minimum(z_margin, hst_margin)
+
+    def record(self, snapshot, processes=None, changes=None):
+        """
+        Sampler hook: score the tick, then learn from it.
+        """
+        self.ticks += 1
+        values = np.array([[snapshot[m] for m in SYSTEM_METRICS]], dtype=np.float64)
+        z, score = self._margins(self.system_stats, self.system_hst, self.system_hst_level,
+                                 np.array([0]), values, np.clip(values / 100.0, 0, 1))
+        self.system_result = {
+            "score": round(float(score[0]), 6),
+            "status": "Anomaly" if score[0] < 0 else "Normal",
+            "zscores": {m: round(float(v), 3) for m, v in zip(SYSTEM_METRICS, z[0])},
+            "warming_up": self.ticks < WARMUP,
+        }
+
+        if changes:
+            for pid in changes["removed"]:
+                self._release(pid)
+        if processes:
+            self.process_scores = self._score_processes(processes)
+
+    def _score_processes(self, processes):
+        slots = self._assign_slots(processes)
+        if (slots < 0).any():
+            # More processes than slots: the ones left over are not scored this tick
+            processes = [p for p, slot in zip(processes, slots) if slot >= 0]
+            slots = slots[slots >= 0]
+        values = np.array([[p[m] for m in PROCESS_METRICS] for p in processes], dtype=np.float64)
+        scaled = np.clip(values / [self.cpu_scale, 100.0], 0, 1)
+        _, scores = self._margins(self.process_stats, self.process_hst, self.process_hst_level,
+                                  slots, values, scaled)
+        return {p['pid']: float(s) for p, s in zip(processes, scores)}
+
+    def _assign_slots(self, processes):
+        """
+        One slot per process for this tick, -1 for processes that do not fit.
+        Tracked processes are marked as seen first, so a new process can only
+        evict one that is missing from this tick, and no slot is given out twice.
+        """
+        slots = np.full(len(processes), -1, dtype=np.int64)
+        new = []
+        for i, process in enumerate(processes):
+            entry = self._slots.get(process['pid'])
+            if entry is not None and entry[0] == process.get('create_time'):
+                slots[i] = entry[1]
+            else:
+                new.append(i)
+        self._last_seen[slots[slots >= 0]] = self.ticks
+        for i in new:
+            slot = self._slot(processes[i])
+            if slot is None:
+                break  # Every slot already holds a process from this tick
+            slots[i] = slot
+        return slots
+
+    def _slot(self, process):
+        """
+        Give a new process a slot, evicting the least recently seen process
+        if none is free. None if every slot was used on this tick.
+        """
+        pid, create_time = process['pid'], process.get('create_time')
+        if pid in self._slots:
+            self._release(pid)  # Recycled pid: a new process
+        if not self._free:
+            victim = int(np.argmin(self._last_seen))
+            if self._last_seen[victim] >= self.ticks:
+                return None
+            self._release(int(self._slot_pid[victim]))
+        slot = self._free.pop()
+        self._slots[pid] = (create_time, slot)
+        self._slot_pid[slot] = pid
+        self._last_seen[slot] = self.ticks
+        self.process_stats.reset([slot])
+        return slot
+
+    def _release(self, pid):
+        entry = self._slots.pop(pid, None)
+        if entry is not None:
+            slot = entry[1]
+            self._last_seen[slot] = np.iinfo(np.int64).max  # Free slots are never evicted
+            self._free.append(slot)
+
+    def score_processes(self, processes):
+        """
+        Latest online scores for `processes` (0.0 for ones not scored yet).
+        Returns (scores, predictions) like app.score_processes.
+        """
+        latest = self.process_scores
+        scores = np.array([latest.get(p['pid'], 0.0) for p in processes], dtype=np.float64)
+        return scores, np.where(scores < 0, -1, 1)
+
+    def status(self):
+        return {
+            "ticks": self.ticks,
+            "tracked_processes": len(self._slots),
+            "system": self.system_result,
+        }
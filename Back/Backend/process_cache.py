@@ -0,0 +1,197 @@
+# Import required libraries
+import threading
+import time
+from collections import deque
+
+from collectors import make_collector
+from process_tree import ProcessTree
+
+# Number of removed pids remembered for delta queries
+TOMBSTONE_LIMIT = 10000
+
+# Seconds before a read refreshes the table itself (raised when a governor paces refreshes)
+DEFAULT_MAX_AGE = 5.0
+
+
+def diff_rows(previous, rows):
+    """
+    Compare this tick's rows against the previous tick's rows (keyed by pid).
+    Returns a dict with the added rows, the removed pids and the changed rows.
+    """
+    added, changed = [], []
+    for row in rows:
+        old = previous.get(row['pid'])
+        if old is None or old['create_time'] != row['create_time']:
+            added.append(row)
+        elif old != row:
+            changed.append(row)
+
+    current = {row['pid'] for row in rows}
+    removed = [pid for pid in previous if pid not in current]
+    # A recycled pid is both removed (old process) and added (new process)
+    removed.extend(row['pid'] for row in added if row['pid'] in previous)
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+class ProcessCache:
+    """
+    Process table updated incrementally on each tick by a collector backend
+    (see collectors.py). The cache diffs each tick against the previous one and
+    versions the changes for delta queries.
+    Rows are identified by (pid, create_time) so a recycled pid is treated as a
+    new process rather than inheriting the old one's counters.
+    The same changes keep `tree` (a ProcessTree) up to date.
+    Reads may refresh a stale table between sampler ticks; tick() hands the
+    sampler everything that changed since its previous tick, not just since
+    the latest refresh, so its hooks never miss a change.
+    """
+
+    def __init__(self, collector=None):
+        self.collector = collector or make_collector()
+        self._rows = []
+        self._by_pid = {}
+        self.last_changes = {"added": [], "removed": [], "changed": []}
+        self._ticked = self._by_pid  # Rows by pid as of the sampler's previous tick
+        self._previous = self._by_pid  # Rows by pid before the latest refresh
+        self.tree = ProcessTree()
+        self._lock = threading.Lock()
+        self.last_refresh = None
+        self.max_age = DEFAULT_MAX_AGE
+
+        # Versioning for delta queries: bumped on every tick that changes a row
+        self.epoch = int(time.time() * 1000)  # Identifies this cache across restarts
+        self.version = 0
+        self._added_version = {}  # pid -> version the row appeared in
+        self._row_version = {}  # pid -> version the row last changed in
+        self._tombstones = deque()  # (version, pid) for removed rows, oldest first
+        self._floor = 0  # Deltas from versions below this are incomplete
+
+    def refresh(self):
+        """
+        Collect one tick from the backend.
+        Returns the list of process rows for this tick; the difference from the
+        previous tick is kept in `last_changes`.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def tick(self):
+        """
+        Refresh for the sampler. Returns this tick's rows and the changes since
+        the sampler's previous tick, including any refreshes reads made in
+        between.
+        """
+        with self._lock:
+            rows = self._refresh()
+            if self._previous is self._ticked:
+                changes = self.last_changes
+            else:
+                changes = diff_rows(self._ticked, rows)
+            self._ticked = self._by_pid
+            return rows, changes
+
+    def _refresh(self):
+        rows = self.collector.collect()
+        for row in rows:
+            # Round memory so idle processes do not show up as changed every tick
+            row['memory_percent'] = round(row['memory_percent'], 2)
+
+        self.last_changes = diff_rows(self._by_pid, rows)
+        self._stamp(self.last_changes)
+        self.tree.apply(self.last_changes)
+        self._previous = self._by_pid
+        self._rows = rows
+        self._by_pid = {row['pid']: row for row in rows}
+        self.last_refresh = time.time()
+        return rows
+
+    def follow(self, rows, changes, epoch, version, base):
+        """
+        Take a table another process's cache published (see shared_snapshot.py)
+        along with its changes, epoch and version, so delta queries here match
+        the publisher's. `base` is the version the changes apply to; if this
+        cache is not there (missed frames, or a new epoch), it diffs against
+        the published rows once to catch up. Returns the changes applied.
+        """
+        with self._lock:
+            if epoch != self.epoch:
+                # Versions from an older epoch mean nothing now; clients reload in full
+                self.epoch = epoch
+                self._added_version.clear()
+                self._row_version.clear()
+                self._tombstones.clear()
+                self.version = self._floor = version
+                changes = diff_rows(self._by_pid, rows)
+            elif base != self.version:
+                changes = diff_rows(self._by_pid, rows)
+            self._stamp(changes, version)
+            self.tree.apply(changes)
+            self.last_changes = changes
+            self._rows = rows
+            self._by_pid = {row['pid']: row for row in rows}
+            self.last_refresh = time.time()
+            return changes
+
+    def _stamp(self, changes, version=None):
+        if not (changes["added"] or changes["removed"] or changes["changed"]):
+            return
+        self.version = self.version + 1 if version is None else version
+
+        for pid in changes["removed"]:
+            self._added_version.pop(pid, None)
+            self._row_version.pop(pid, None)
+            self._tombstones.append((self.version, pid))
+        while len(self._tombstones) > TOMBSTONE_LIMIT:
+            self._floor = self._tombstones.popleft()[0]
+
+        for row in changes["added"]:
+            self._added_version[row['pid']] = self.version
+            self._row_version[row['pid']] = self.version
+        for row in changes["changed"]:
+            self._row_version[row['pid']] = self.version
+
+    def changes_since(self, since):
+        """
+        Return the rows added, removed and changed after version `since`.
+        Falls back to the full table (with "full": True) when `since` is
+        missing, from the future, or older than the remembered removals.
+        """
+        self.processes()
+        with self._lock:
+            result = {"epoch": self.epoch, "version": self.version}
+            if since is None or since > self.version or since < self._floor:
+                result.update(full=True, processes=list(self._rows))
+                return result
+
+            added, changed = [], []
+            for row in self._rows:
+                pid = row['pid']
+                if self._row_version.get(pid, 0) <= since:
+                    continue
+                if self._added_version.get(pid, 0) > since:
+                    added.append(row)
+                else:
+                    changed.append(row)
+            # Removals are listed oldest first, so clients apply them before additions
+            removed = [pid for version, pid in self._tombstones if version > since]
+
+            result.update(full=False, added=added, removed=removed, changed=changed)
+            return result
+
+    def processes(self, max_age=None):
+        """
+        Return the rows from the latest tick, refreshing first if they are older
+        than `max_age` seconds (default: self.max_age) or if nothing has been
+        collected yet.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        if self.last_refresh is None or time.time() - self.last_refresh > max_age:
+            return self.refresh()
+        return self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+
+# Shared cache used by the process page and the background sampler
+process_cache = ProcessCache()
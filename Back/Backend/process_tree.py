@@ -0,0 +1,256 @@
+# Import required libraries
+import os
+import threading
+import time
+from collections import deque
+
+# Ticks of fork history kept for runaway-tree detection
+FORK_WINDOW = int(os.environ.get("FORK_WINDOW", "10"))
+
+# A tree is runaway when its descendants were born at least FORK_BURST times
+# within the window and at least FORK_TREE_SIZE of them are still alive
+FORK_BURST = int(os.environ.get("FORK_BURST", "100"))
+FORK_TREE_SIZE = int(os.environ.get("FORK_TREE_SIZE", "100"))
+
+# An ancestor is reported instead of a flagged descendant only when the
+# descendant accounts for less than this share of the ancestor's births
+FORK_SHARE = 0.9
+
+# The idle task, init and kthreadd parent everything; never flag them as runaway
+SYSTEM_PIDS = {0, 1, 2}
+
+# Guard against cycles from torn reads (a recycled pid seen mid-reparent)
+MAX_DEPTH = 512
+
+
+class ProcessTree:
+    """
+    pid -> parent/children index kept up to date from the process cache's
+    per-tick changes (see process_cache.diff_rows) instead of being rebuilt.
+
+    Every change costs one walk up the ancestor chain, so a tick costs
+    O(changed processes x tree depth) regardless of how many processes exist.
+    Along the way the index tracks:
+    - zombies: processes in the "zombie" state and the parent that should reap them
+    - orphans: processes reparented (to init or a subreaper) after their parent exited
+    - runaway trees: subtrees that keep forking and keep growing
+    """
+
+    def __init__(self, window=FORK_WINDOW, burst=FORK_BURST, tree_size=FORK_TREE_SIZE):
+        self.window = window
+        self.burst = burst
+        self.tree_size = tree_size
+        self.ticks = 0
+        self._lock = threading.RLock()  # apply() runs on the sampler thread
+
+        self._rows = {}  # pid -> latest row
+        self._parent = {}  # pid -> ppid, for attached processes
+        self._children = {}  # ppid -> set of child pids
+        self._size = {}  # pid -> number of live descendants
+
+        self.zombies = set()
+        self.orphans = {}  # pid -> {"previous_ppid", "adopted_by", "since"}
+        self.runaway = {}  # runaway tree root -> {"births", "descendants"}
+
+        # Births below each ancestor: one dict per tick plus running totals
+        self._births = deque()
+        self._birth_totals = {}
+
+    def _ancestors(self, pid):
+        """
+        Yield the attached ancestors of `pid`, nearest first.
+        """
+        node = self._parent.get(pid)
+        for _ in range(MAX_DEPTH):
+            if node is None or node not in self._parent:
+                return
+            yield node
+            node = self._parent[node]
+
+    def _attach(self, pid, ppid, births=None):
+        self._children.setdefault(ppid, set()).add(pid)
+        # Children seen before their parent already hang off this pid
+        size = sum(1 + self._size.get(child, 0) for child in self._children.get(pid, ()))
+        self._size[pid] = size
+        self._parent[pid] = ppid
+        if ppid not in self._parent:
+            return  # Root (or parent not seen yet: it picks this subtree up on attach)
+        for node in self._ancestors(pid):
+            self._size[node] += 1 + size
+            if births is not None:
+                births[node] = births.get(node, 0) + 1
+
+    def _detach(self, pid):
+        ppid = self._parent.pop(pid, None)
+        size = self._size.pop(pid, 0)
+        siblings = self._children.get(ppid)
+        if siblings is not None:
+            siblings.discard(pid)
+            if not siblings:
+                del self._children[ppid]
+        node = ppid
+        for _ in range(MAX_DEPTH):
+            if node not in self._parent:
+                break
+            self._size[node] -= 1 + size
+            node = self._parent[node]
+
+    def _flag(self, row):
+        if row['status'] == 'zombie':
+            self.zombies.add(row['pid'])
+        else:
+            self.zombies.discard(row['pid'])
+
+    def apply(self, changes):
+        """
+        Apply one tick of changes ({"added", "removed", "changed"}).
+        Removals go first so a recycled pid is dropped before it is re-added.
+        """
+        with self._lock:
+            self._apply(changes)
+
+    def _apply(self, changes):
+        births = {} if self.ticks else None  # The first tick is the whole table, not births
+        now = time.time()
+
+        for pid in changes["removed"]:
+            if pid not in self._rows:
+                continue
+            self._detach(pid)
+            del self._rows[pid]
+            self.zombies.discard(pid)
+            self.orphans.pop(pid, None)
+            self.runaway.pop(pid, None)
+
+        added = changes["added"]
+        for row in added:
+            self._rows[row['pid']] = row
+        for row in added:
+            self._attach(row['pid'], row.get('ppid', 0), births)
+            self._flag(row)
+
+        for row in changes["changed"]:
+            pid = row['pid']
+            previous = self._rows.get(pid)
+            self._rows[pid] = row
+            self._flag(row)
+            ppid = row.get('ppid', 0)
+            if previous is None or previous.get('ppid', 0) == ppid:
+                continue
+            # Reparented: the kernel only does that when the parent exits
+            # (the old parent may still be listed for a tick, or as a zombie)
+            self._detach(pid)
+            self._attach(pid, ppid)
+            self.orphans[pid] = {"previous_ppid": previous.get('ppid', 0), "adopted_by": ppid, "since": now}
+
+        self.ticks += 1
+        if births is not None:
+            self._advance(births)
+
+    def _advance(self, births):
+        """
+        Slide the fork window by one tick and re-check the trees that forked in it.
+        """
+        totals = self._birth_totals
+        self._births.append(births)
+        for pid, count in births.items():
+            totals[pid] = totals.get(pid, 0) + count
+        if len(self._births) > self.window:
+            for pid, count in self._births.popleft().items():
+                left = totals[pid] - count
+                if left > 0:
+                    totals[pid] = left
+                else:
+                    del totals[pid]
+
+        flagged = {
+            pid: count for pid, count in totals.items()
+            if count >= self.burst and pid not in SYSTEM_PIDS
+            and self._size.get(pid, 0) >= self.tree_size
+        }
+        # A shell above a forking process is flagged too: report the deepest
+        # process that still accounts for (nearly) all of the births
+        covered = set()
+        for pid, count in flagged.items():
+            for node in self._ancestors(pid):
+                if node in flagged and count >= flagged[node] * FORK_SHARE:
+                    covered.add(node)
+        self.runaway = {
+            pid: {"births": count, "descendants": self._size[pid]}
+            for pid, count in flagged.items() if pid not in covered
+        }
+
+    def children(self, pid):
+        return sorted(child for child in self._children.get(pid, ()) if child in self._rows)
+
+    def parent_chain(self, pid):
+        """
+        Ancestors of `pid`, nearest first.
+        """
+        return list(self._ancestors(pid))
+
+    def descendants(self, pid):
+        return self._size.get(pid, 0)
+
+    def flags(self):
+        """
+        Flagged pids by kind, for clients that mark rows.
+        """
+        with self._lock:
+            return {
+                "zombie": sorted(self.zombies),
+                "orphan": sorted(self.orphans),
+                "runaway": sorted(self.runaway),
+            }
+
+    def _brief(self, pid):
+        row = self._rows.get(pid)
+        return {"pid": pid, "name": row['name'] if row else None}
+
+    def summary(self):
+        """
+        Zombies grouped by the parent that should reap them, orphans with their
+        previous and adopting parent, and the root of each runaway tree.
+        """
+        with self._lock:
+            reapers = {}
+            for pid in self.zombies:
+                reapers.setdefault(self._rows[pid].get('ppid', 0), []).append(pid)
+
+            return {
+                "processes": len(self._rows),
+                "zombies": {
+                    "count": len(self.zombies),
+                    "parents": sorted(
+                        ({**self._brief(ppid), "zombies": sorted(pids)} for ppid, pids in reapers.items()),
+                        key=lambda p: -len(p["zombies"])
+                    ),
+                },
+                "orphans": [
+                    {**self._brief(pid), **info} for pid, info in sorted(self.orphans.items())
+                ],
+                "runaway": [
+                    {**self._brief(pid), **info}
+                    for pid, info in sorted(self.runaway.items(), key=lambda item: -item[1]["births"])
+                ],
+            }
+
+    def describe(self, pid):
+        """
+        One process with its parent chain, direct children and flags.
+        Raises KeyError for unknown pids.
+        """
+        with self._lock:
+            row = self._rows[pid]
+            return {
+                **row,
+                "parents": [self._brief(node) for node in self.parent_chain(pid)],
+                "children": [self._brief(child) for child in self.children(pid)],
+                "descendants": self.descendants(pid),
+                "zombie": pid in self.zombies,
+                "orphan": self.orphans.get(pid),
+                "runaway": self.runaway.get(pid),
+            }
+
+    def __len__(self):
+        return len(self._rows)
@@ -1,11 +1,482 @@
 # Import required libraries
-from flask import Flask, render_template_string
-import psutil
+from flask import Flask, current_app, jsonify, request
+import heapq
 import traceback
+from urllib.parse import urlencode
+from process_cache import process_cache
+from instrumentation import timed_stage
+
+# Sort keys accepted by ?sort= -> (row field, largest first)
+SORT_KEYS = {
+    'cpu': ('cpu_percent', True),
+    'memory': ('memory_percent', True),
+    'pid': ('pid', False),
+    'name': ('name', False),
+}
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+# Process-tree flags accepted by ?flag= (see process_tree.py)
+FLAG_KINDS = ('zombie', 'orphan', 'runaway')
 
 # Initialize Flask application
 app = Flask(__name__)
 
+# HTML template with embedded CSS for styling
+PROCESSES_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <noscript><meta http-equiv="refresh" content="5"></noscript>  <!-- Fallback without JavaScript -->
+    <title>System Processes</title>
+    <style>
+        /* Dark theme styling */
+        body {
+            background-color: #0a0a0a;
+            color: #ffffff;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 0;
+        }
+
+        /* Header styling */
+        header {
+            background-color: #1a1a1a;
+            padding: 20px;
+            text-align: center;
+            color: #ff3333;
+            font-size: 30px;
+            font-weight: bold;
+            border-bottom: 2px solid #ff0000;
+            box-shadow: 0 0 15px #ff0000;
+        }
+
+        /* Container styling */
+        .container {
+            padding: 20px;
+        }
+
+        /* Table styling */
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 10px;
+            background-color: #111;
+            border: 2px solid #ff0000;
+            box-shadow: 0 0 10px #ff0000;
+        }
+
+        /* Table cell styling */
+        th, td {
+            padding: 10px;
+            text-align: left;
+            border-bottom: 1px solid #333;
+            color: #ffffff;
+        }
+
+        /* Table header styling */
+        th {
+            background-color: #1f1f1f;
+            color: #ff6666;
+            border-bottom: 2px solid #ff0000;
+        }
+
+        /* Table row hover effect */
+        tr:hover {
+            background-color: #1b1b1b;
+        }
+
+        /* Progress bar container styling */
+        .bar-container {
+            background-color: #222;
+            border-radius: 6px;
+            overflow: hidden;
+            height: 16px;
+            border: 1px solid #ff0000;
+            box-shadow: 0 0 5px #ff0000;
+        }
+
+        /* CPU usage bar styling */
+        .cpu-bar {
+            background: linear-gradient(to right, #ff0000, #ffcc00);
+            height: 100%;
+            box-shadow: 0 0 8px #ff0000;
+        }
+
+        /* Memory usage bar styling */
+        .mem-bar {
+            background: linear-gradient(to right, #00ff99, #00ccff);
+            height: 100%;
+            box-shadow: 0 0 8px #00ffcc;
+        }
+
+        /* Filter and paging controls */
+        .controls {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 10px;
+            align-items: center;
+            justify-content: center;
+            margin-top: 10px;
+            font-size: 13px;
+        }
+        .controls input, .controls select, .controls button {
+            background-color: #111;
+            color: #ffffff;
+            border: 1px solid #ff0000;
+            border-radius: 4px;
+            padding: 4px 8px;
+        }
+        .controls a {
+            color: #ff6666;
+        }
+
+        /* Process-tree flag badges */
+        .flag {
+            display: inline-block;
+            margin-right: 4px;
+            padding: 1px 6px;
+            border-radius: 4px;
+            font-size: 11px;
+            text-transform: uppercase;
+        }
+        .flag-zombie {
+            background-color: #552200;
+            border: 1px solid #ff8800;
+        }
+        .flag-orphan {
+            background-color: #333300;
+            border: 1px solid #ffff66;
+        }
+        .flag-runaway {
+            background-color: #550000;
+            border: 1px solid #ff0000;
+        }
+
+        /* Refresh note styling */
+        .refresh-note {
+            text-align: center;
+            margin-top: 10px;
+            font-size: 13px;
+            color: #888;
+        }
+    </style>
+</head>
+<body>
+    <header>SYSTEM PROCESSES</header>
+    <div class="container">
+        <div class="refresh-note" id="refresh-note">Auto-refreshes every 5 seconds</div>
+        <div class="refresh-note" id="tree-note">
+            Zombies: {{ flags.zombie|length }} &middot; Orphans: {{ flags.orphan|length }} &middot; Runaway trees: {{ flags.runaway|length }}
+        </div>
+        <form class="controls" method="get">
+            <input type="text" name="name" placeholder="Name contains" value="{{ view.name }}">
+            <input type="text" name="status" placeholder="Status" value="{{ view.status }}">
+            <select name="flag">
+                <option value="">All processes</option>
+                {% for kind in flag_kinds %}
+                <option value="{{ kind }}" {% if kind == view.flag %}selected{% endif %}>Only {{ kind }}</option>
+                {% endfor %}
+            </select>
+            <select name="sort">
+                {% for key in sort_keys %}
+                <option value="{{ key }}" {% if key == view.sort %}selected{% endif %}>Sort by {{ key }}</option>
+                {% endfor %}
+            </select>
+            <input type="number" name="limit" min="0" placeholder="Top K" value="{{ view.limit if view.limit is not none else '' }}">
+            <input type="number" name="per_page" min="1" max="{{ max_per_page }}" value="{{ view.per_page }}">
+            <button type="submit">Apply</button>
+        </form>
+        <div class="controls">
+            {% if view.page > 1 %}<a href="{{ page_query(args, page=view.page - 1) }}">&larr; Prev</a>{% endif %}
+            <span id="page-note">Page {{ view.page }} of {{ pages }} ({{ matched }} processes)</span>
+            {% if view.page < pages %}<a href="{{ page_query(args, page=view.page + 1) }}">Next &rarr;</a>{% endif %}
+        </div>
+        <table>
+            <thead>
+            <tr>
+                <th>PID</th>
+                <th>PPID</th>
+                <th>Name</th>
+                <th>CPU Usage</th>
+                <th>Memory Usage</th>
+                <th>Status</th>
+                <th>Flags</th>
+            </tr>
+            </thead>
+            <tbody id="process-rows">
+            {% for proc in processes %}
+            <tr data-pid="{{ proc.pid }}">
+                <td>{{ proc.pid }}</td>
+                <td>{{ proc.ppid }}</td>
+                <td>{{ proc.name }}</td>
+                <td>
+                    <div class="bar-container">
+                        <div class="cpu-bar" style="width: {{ proc.cpu_percent }}%;"></div>
+                    </div>
+                    {{ proc.cpu_percent }}%
+                </td>
+                <td>
+                    <div class="bar-container">
+                        <div class="mem-bar" style="width: {{ proc.memory_percent }}%;"></div>
+                    </div>
+                    {{ "%.2f"|format(proc.memory_percent) }}%
+                </td>
+                <td>{{ proc.status }}</td>
+                <td>
+                    {% for kind in flag_kinds %}{% if proc.pid in flags[kind] %}<span class="flag flag-{{ kind }}">{{ kind }}</span>{% endif %}{% endfor %}
+                </td>
+            </tr>
+            {% endfor %}
+            </tbody>
+        </table>
+    </div>
+    <script>
+        // Apply pushed process-table changes instead of reloading the page.
+        // The full table is kept in memory; only the current view is rendered.
+        (function () {
+            const view = {{ view|tojson }};
+            const sortKeys = {{ sort_keys_js|tojson }};
+            const tbody = document.getElementById("process-rows");
+            const note = document.getElementById("refresh-note");
+            const pageNote = document.getElementById("page-note");
+            const treeNote = document.getElementById("tree-note");
+            const procs = new Map();
+            let flags = {};
+            const fallback = () => setTimeout(() => window.location.reload(), 5000);
+
+            if (!window.EventSource) {
+                fallback();
+                return;
+            }
+
+            function bar(cls, value) {
+                const container = document.createElement("div");
+                container.className = "bar-container";
+                const fill = document.createElement("div");
+                fill.className = cls;
+                fill.style.width = value + "%";
+                container.appendChild(fill);
+                return container;
+            }
+
+            function flagBadges(pid) {
+                return Object.keys(flags).filter(kind => flags[kind].has(pid)).map(kind => {
+                    const badge = document.createElement("span");
+                    badge.className = "flag flag-" + kind;
+                    badge.textContent = kind;
+                    return badge;
+                });
+            }
+
+            function setFlags(tree) {
+                if (!tree) {
+                    return;
+                }
+                flags = Object.fromEntries(Object.entries(tree).map(([kind, pids]) => [kind, new Set(pids)]));
+                treeNote.textContent = `Zombies: ${tree.zombie.length} \u00b7 Orphans: ${tree.orphan.length} \u00b7 ` +
+                    `Runaway trees: ${tree.runaway.length}`;
+            }
+
+            function renderRow(proc) {
+                const row = document.createElement("tr");
+                row.dataset.pid = proc.pid;
+                const cells = [
+                    [String(proc.pid)],
+                    [String(proc.ppid)],
+                    [String(proc.name)],
+                    [bar("cpu-bar", proc.cpu_percent), proc.cpu_percent + "%"],
+                    [bar("mem-bar", proc.memory_percent), proc.memory_percent.toFixed(2) + "%"],
+                    [String(proc.status)],
+                    flagBadges(proc.pid)
+                ];
+                cells.forEach(parts => {
+                    const td = document.createElement("td");
+                    td.append(...parts);
+                    row.appendChild(td);
+                });
+                return row;
+            }
+
+            function render() {
+                const [field, largest] = sortKeys[view.sort];
+                const needle = view.name.toLowerCase();
+                let rows = Array.from(procs.values()).filter(p =>
+                    (!needle || String(p.name).toLowerCase().includes(needle)) &&
+                    (!view.status || p.status === view.status) &&
+                    (!view.flag || (flags[view.flag] && flags[view.flag].has(p.pid)))
+                );
+                rows.sort((a, b) => {
+                    const x = field === "name" ? String(a.name).toLowerCase() : a[field];
+                    const y = field === "name" ? String(b.name).toLowerCase() : b[field];
+                    const order = x < y ? -1 : x > y ? 1 : 0;
+                    return largest ? -order : order;
+                });
+                if (view.limit !== null) {
+                    rows = rows.slice(0, view.limit);
+                }
+                const pages = Math.max(1, Math.ceil(rows.length / view.per_page));
+                const start = (view.page - 1) * view.per_page;
+                tbody.replaceChildren(...rows.slice(start, start + view.per_page).map(renderRow));
+                pageNote.textContent = `Page ${view.page} of ${pages} (${rows.length} processes)`;
+            }
+
+            const source = new EventSource("/api/stream?processes=1");
+            source.addEventListener("snapshot", event => {
+                const data = JSON.parse(event.data);
+                if (!data.processes) {
+                    return;
+                }
+                procs.clear();
+                data.processes.forEach(proc => procs.set(proc.pid, proc));
+                setFlags(data.tree);
+                render();
+            });
+            source.addEventListener("tick", event => {
+                const data = JSON.parse(event.data);
+                const changes = data.processes;
+                if (!changes) {
+                    return;
+                }
+                setFlags(data.tree);
+                changes.removed.forEach(pid => procs.delete(pid));
+                changes.added.forEach(proc => procs.set(proc.pid, proc));
+                changes.changed.forEach(proc => procs.set(proc.pid, proc));
+                render();
+            });
+            source.onopen = () => {
+                note.textContent = "Live updates";
+            };
+            source.onerror = () => {
+                // No stream endpoint (e.g. standalone mode): reload like before
+                if (source.readyState === EventSource.CLOSED) {
+                    fallback();
+                }
+            };
+        })();
+    </script>
+</body>
+</html>
+"""
+
+# Error page shown when the process list cannot be rendered
+ERROR_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Error</title>
+    <style>
+        body {
+            background-color: #0a0a0a;
+            color: #ffffff;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 20px;
+            display: flex;
+            flex-direction: column;
+            align-items: center;
+            justify-content: center;
+            min-height: 100vh;
+        }
+        .error-container {
+            text-align: center;
+            padding: 20px;
+            background: rgba(255, 0, 0, 0.1);
+            border: 2px solid #ff0000;
+            border-radius: 10px;
+            box-shadow: 0 0 15px rgba(255, 0, 0, 0.3);
+        }
+        .back-button {
+            display: inline-block;
+            margin-top: 20px;
+            text-decoration: none;
+            color: #ffffff;
+            background: linear-gradient(90deg, #ff0000, #8b0000);
+            padding: 10px 20px;
+            border-radius: 5px;
+            box-shadow: 0 0 15px rgba(255, 0, 0, 0.8);
+            transition: all 0.3s ease;
+        }
+        .back-button:hover {
+            transform: scale(1.05);
+            box-shadow: 0 0 20px rgba(255, 0, 0, 1);
+        }
+    </style>
+</head>
+<body>
+    <div class="error-container">
+        <h1>Temporarily Unavailable</h1>
+        <p>The process list is currently unavailable. Please try again in a few moments.</p>
+        <a href="/" class="back-button">← Back to Dashboard</a>
+    </div>
+</body>
+</html>
+"""
+
+# Templates compiled once per Jinja environment instead of on every request
+_compiled_templates = {}
+
+
+@timed_stage("template_render")
+def render_cached(source, **context):
+    """
+    Render a template string compiled once and reused on later calls.
+    Behaves like render_template_string (context processors still apply).
+    """
+    env = current_app.jinja_env
+    template = _compiled_templates.get((id(env), source))
+    if template is None:
+        template = _compiled_templates[(id(env), source)] = env.from_string(source)
+    current_app.update_template_context(context)
+    return template.render(context)
+
+
+def select_processes(processes, sort='cpu', limit=None, name=None, status=None, page=1, per_page=DEFAULT_PER_PAGE,
+                     pids=None):
+    """
+    Filter, rank and page the process list without sorting all of it.
+    `pids`, when given, keeps only those processes (e.g. the flagged ones).
+    Only the rows up to the end of the requested page are selected (heap-based
+    partial selection), so the cost is O(n log k) instead of a full sort.
+    Returns (rows for the page, number of rows matching the filters).
+    """
+    field, largest = SORT_KEYS.get(sort, SORT_KEYS['cpu'])
+    if name:
+        needle = name.lower()
+        processes = [p for p in processes if needle in str(p['name']).lower()]
+    if status:
+        processes = [p for p in processes if p['status'] == status]
+    if pids is not None:
+        processes = [p for p in processes if p['pid'] in pids]
+
+    matched = len(processes)
+    if limit is not None:
+        matched = min(matched, limit)
+
+    end = min(page * per_page, matched)
+    start = (page - 1) * per_page
+    if start >= end:
+        return [], matched
+
+    if field == 'name':
+        key = lambda p: str(p['name']).lower()  # noqa: E731
+    else:
+        key = lambda p: p[field] or 0  # noqa: E731
+    select = heapq.nlargest if largest else heapq.nsmallest
+    return select(end, processes, key=key)[start:end], matched
+
+
+def page_query(args, **overrides):
+    """
+    Build a query string from the current arguments with some values replaced.
+    """
+    params = {k: v for k, v in args.items() if v not in (None, '')}
+    params.update(overrides)
+    return '?' + urlencode(params)
+
+
 @app.route('/')
 def live_processes():
     """
@@ -16,226 +487,114 @@ def live_processes():
     - CPU Usage with visual bar
     - Memory Usage with visual bar
     - Process Status
+    - Process-tree flags (zombie, orphan, runaway)
+
+    Query parameters: sort (cpu, memory, pid, name), limit (top-K),
+    name (substring filter), status, flag, page and per_page.
+    Only the requested page is rendered.
     """
     try:
-        # List to store process information
-        processes = []
-        
-        # Collect information for each running process
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-            try:
-                processes.append(proc.info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                # Skip processes that can't be accessed, no longer exist, or are zombies
-                continue
-            except Exception as e:
-                # Log other errors but continue processing
-                print(f"Error processing process: {e}")
-                continue
-
-        # Sort processes by CPU usage (highest first)
-        # Add error handling for sorting
-        try:
-            processes = sorted(processes, key=lambda p: p.get('cpu_percent', 0), reverse=True)
-        except Exception as e:
-            # If sorting fails, return unsorted list
-            print(f"Error sorting processes: {e}")
-
-        # HTML template with embedded CSS for styling
-        html = """
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta http-equiv="refresh" content="5">  <!-- Auto-refresh every 5 seconds -->
-            <title>System Processes</title>
-            <style>
-                /* Dark theme styling */
-                body {
-                    background-color: #0a0a0a;
-                    color: #ffffff;
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                }
+        # Read the latest tick from the shared process cache.
+        # Handles persist between ticks, so CPU usage is a real delta.
+        processes = process_cache.processes()
 
-                /* Header styling */
-                header {
-                    background-color: #1a1a1a;
-                    padding: 20px;
-                    text-align: center;
-                    color: #ff3333;
-                    font-size: 30px;
-                    font-weight: bold;
-                    border-bottom: 2px solid #ff0000;
-                    box-shadow: 0 0 15px #ff0000;
-                }
-
-                /* Container styling */
-                .container {
-                    padding: 20px;
-                }
+        # Parse view options from the query string
+        sort = request.args.get('sort', default='cpu')
+        if sort not in SORT_KEYS:
+            sort = 'cpu'
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 0:
+            limit = None
+        per_page = min(max(request.args.get('per_page', default=DEFAULT_PER_PAGE, type=int), 1), MAX_PER_PAGE)
+        page = max(request.args.get('page', default=1, type=int), 1)
+        name_filter = request.args.get('name', default='').strip()
+        status_filter = request.args.get('status', default='').strip()
+        flag_filter = request.args.get('flag', default='').strip()
+        if flag_filter not in FLAG_KINDS:
+            flag_filter = ''
+        flags = {kind: set(pids) for kind, pids in process_cache.tree.flags().items()}
 
-                /* Table styling */
-                table {
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin-top: 10px;
-                    background-color: #111;
-                    border: 2px solid #ff0000;
-                    box-shadow: 0 0 10px #ff0000;
-                }
-
-                /* Table cell styling */
-                th, td {
-                    padding: 10px;
-                    text-align: left;
-                    border-bottom: 1px solid #333;
-                    color: #ffffff;
-                }
+        try:
+            processes, matched = select_processes(
+                processes, sort=sort, limit=limit, name=name_filter, status=status_filter,
+                page=page, per_page=per_page, pids=flags[flag_filter] if flag_filter else None
+            )
+        except Exception as e:
+            # If selection fails, show the first page unsorted
+            print(f"Error selecting processes: {e}")
+            matched = len(processes)
+            processes = processes[:per_page]
+        pages = max(1, -(-matched // per_page))
 
-                /* Table header styling */
-                th {
-                    background-color: #1f1f1f;
-                    color: #ff6666;
-                    border-bottom: 2px solid #ff0000;
-                }
+        view = {
+            "sort": sort,
+            "limit": limit,
+            "name": name_filter,
+            "status": status_filter,
+            "flag": flag_filter,
+            "page": page,
+            "per_page": per_page,
+        }
+        args = {k: v for k, v in view.items() if k != 'page'}
 
-                /* Table row hover effect */
-                tr:hover {
-                    background-color: #1b1b1b;
-                }
+        return render_cached(
+            PROCESSES_HTML, processes=processes, matched=matched, pages=pages, view=view, args=args,
+            page_query=page_query, sort_keys=list(SORT_KEYS), sort_keys_js=SORT_KEYS,
+            max_per_page=MAX_PER_PAGE, flags=flags, flag_kinds=FLAG_KINDS
+        )
 
-                /* Progress bar container styling */
-                .bar-container {
-                    background-color: #222;
-                    border-radius: 6px;
-                    overflow: hidden;
-                    height: 16px;
-                    border: 1px solid #ff0000;
-                    box-shadow: 0 0 5px #ff0000;
-                }
+    except Exception as e:
+        # If something goes wrong, show an error page with a back button
+        print(f"Error in live_processes: {e}")
+        print(traceback.format_exc())  # This will print the full error traceback
+        return render_cached(ERROR_HTML)
 
-                /* CPU usage bar styling */
-                .cpu-bar {
-                    background: linear-gradient(to right, #ff0000, #ffcc00);
-                    height: 100%;
-                    box-shadow: 0 0 8px #ff0000;
-                }
+@app.route('/api/processes')
+def process_list_api():
+    """
+    JSON process list stamped with a version.
+    Pass ?since=<version> (and optionally ?epoch=<epoch>) to receive only the
+    rows added, removed and changed since that version. The ETag is the
+    current version, so an unchanged table answers 304 Not Modified.
+    """
+    try:
+        since = request.args.get('since', type=int)
+        epoch = request.args.get('epoch', type=int)
+        if epoch is not None and epoch != process_cache.epoch:
+            since = None  # The cache restarted: version numbers no longer match
 
-                /* Memory usage bar styling */
-                .mem-bar {
-                    background: linear-gradient(to right, #00ff99, #00ccff);
-                    height: 100%;
-                    box-shadow: 0 0 8px #00ffcc;
-                }
+        data = process_cache.changes_since(since)
+        etag = f"{data['epoch']}-{data['version']}"
+        if etag in request.if_none_match:
+            return "", 304, {"ETag": f'"{etag}"'}
 
-                /* Refresh note styling */
-                .refresh-note {
-                    text-align: center;
-                    margin-top: 10px;
-                    font-size: 13px;
-                    color: #888;
-                }
-            </style>
-        </head>
-        <body>
-            <header>SYSTEM PROCESSES</header>
-            <div class="container">
-                <div class="refresh-note">Auto-refreshes every 5 seconds</div>
-                <table>
-                    <tr>
-                        <th>PID</th>
-                        <th>Name</th>
-                        <th>CPU Usage</th>
-                        <th>Memory Usage</th>
-                        <th>Status</th>
-                    </tr>
-                    {% for proc in processes %}
-                    <tr>
-                        <td>{{ proc.pid }}</td>
-                        <td>{{ proc.name }}</td>
-                        <td>
-                            <div class="bar-container">
-                                <div class="cpu-bar" style="width: {{ proc.cpu_percent }}%;"></div>
-                            </div>
-                            {{ proc.cpu_percent }}%
-                        </td>
-                        <td>
-                            <div class="bar-container">
-                                <div class="mem-bar" style="width: {{ proc.memory_percent }}%;"></div>
-                            </div>
-                            {{ "%.2f"|format(proc.memory_percent) }}%
-                        </td>
-                        <td>{{ proc.status }}</td>
-                    </tr>
-                    {% endfor %}
-                </table>
-            </div>
-        </body>
-        </html>
-        """
-
-        return render_template_string(html, processes=processes)
+        response = jsonify(data)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        print(f"Error in process_list_api: {e}")
+        return jsonify({"error": str(e)}), 500
 
+@app.route('/api/process-tree')
+def process_tree_api():
+    """
+    Zombies (grouped by the parent that should reap them), orphans and runaway
+    fork trees from the incrementally maintained process tree.
+    Pass ?pid=<pid> for one process's parent chain, children and flags instead.
+    """
+    try:
+        process_cache.processes()  # Refresh the tree if no sampler is running
+        pid = request.args.get('pid', type=int)
+        if pid is not None:
+            try:
+                return jsonify(process_cache.tree.describe(pid))
+            except KeyError:
+                return jsonify({"error": f"No process with pid {pid}"}), 404
+        return jsonify(process_cache.tree.summary())
     except Exception as e:
-        # If something goes wrong, show an error page with a back button
-        error_html = """
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <title>Error</title>
-            <style>
-                body {
-                    background-color: #0a0a0a;
-                    color: #ffffff;
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    margin: 0;
-                    padding: 20px;
-                    display: flex;
-                    flex-direction: column;
-                    align-items: center;
-                    justify-content: center;
-                    min-height: 100vh;
-                }
-                .error-container {
-                    text-align: center;
-                    padding: 20px;
-                    background: rgba(255, 0, 0, 0.1);
-                    border: 2px solid #ff0000;
-                    border-radius: 10px;
-                    box-shadow: 0 0 15px rgba(255, 0, 0, 0.3);
-                }
-                .back-button {
-                    display: inline-block;
-                    margin-top: 20px;
-                    text-decoration: none;
-                    color: #ffffff;
-                    background: linear-gradient(90deg, #ff0000, #8b0000);
-                    padding: 10px 20px;
-                    border-radius: 5px;
-                    box-shadow: 0 0 15px rgba(255, 0, 0, 0.8);
-                    transition: all 0.3s ease;
-                }
-                .back-button:hover {
-                    transform: scale(1.05);
-                    box-shadow: 0 0 20px rgba(255, 0, 0, 1);
-                }
-            </style>
-        </head>
-        <body>
-            <div class="error-container">
-                <h1>Temporarily Unavailable</h1>
-                <p>The process list is currently unavailable. Please try again in a few moments.</p>
-                <a href="/" class="back-button">← Back to Dashboard</a>
-            </div>
-        </body>
-        </html>
-        """
-        print(f"Error in live_processes: {e}")
-        print(traceback.format_exc())  # This will print the full error traceback
-        return render_template_string(error_html)
+        print(f"Error in process_tree_api: {e}")
+        return jsonify({"error": str(e)}), 500
 
 # Run the Flask application if script is executed directly
 if __name__ == '__main__':
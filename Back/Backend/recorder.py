@@ -0,0 +1,211 @@
+"""
+Append-only, compressed binary log of sampler ticks for offline replay.
+
+Enable recording with RECORD_PATH=/path/to/ticks.log; every tick's system
+snapshot and process-table changes are appended to the file. replay.py
+streams a log back through a model or detector as fast as the CPU allows.
+
+File layout: MAGIC, then one frame per tick. A frame is a header (payload
+length, CRC-32 of the payload) followed by the zlib-compressed pickle of
+{"metrics", "key", "added", "changed", "removed"}. Process rows are stored
+column-wise (one list per field). A key frame holds the whole
+process table; other frames only the rows added, changed and removed since
+the previous tick. Every recording session starts with a key frame and
+writes another every RECORD_KEYFRAME ticks, so a replay can start anywhere.
+A frame cut short by a crash is dropped when the log is reopened.
+
+Logs are unpickled on replay: only replay logs you recorded yourself.
+
+Usage (from Back/Backend):
+    python recorder.py info ticks.log
+"""
+# Import required libraries
+import argparse
+import os
+import pickle
+import struct
+import zlib
+
+# Log file written by the app when set (recording is off otherwise)
+DEFAULT_PATH = os.environ.get("RECORD_PATH") or None
+
+# Ticks between key frames (full process tables)
+DEFAULT_KEYFRAME = int(os.environ.get("RECORD_KEYFRAME", "600"))
+
+# zlib level for frame payloads (1 fastest, 9 smallest)
+DEFAULT_LEVEL = int(os.environ.get("RECORD_LEVEL", "6"))
+
+MAGIC = b"PSREC\x00\x01\n"
+FRAME_HEADER = struct.Struct("=II")  # Payload length, CRC-32 of the payload
+
+# Process row fields stored in the log
+ROW_FIELDS = ("pid", "ppid", "name", "cpu_percent", "memory_percent", "status", "create_time")
+
+
+def pack_rows(rows):
+    """
+    Store process rows column-wise (one list per field): no per-row keys, and
+    similar values sit next to each other, so frames compress much better.
+    Plain lists pickle smaller than NumPy arrays for the few rows of a delta.
+    """
+    return {field: [row.get(field) for row in rows] for field in ROW_FIELDS}
+
+
+def unpack_rows(columns):
+    """
+    Rebuild the row dicts written by pack_rows().
+    """
+    fields = list(columns)
+    return [dict(zip(fields, row)) for row in zip(*(columns[f] for f in fields))]
+
+
+def scan(path):
+    """
+    Walk the frame headers of a log without decoding payloads.
+    Returns (frame count, offset just past the last complete frame).
+    """
+    frames = 0
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a recording (bad magic)")
+        end = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            length = FRAME_HEADER.unpack(header)[0]
+            if end + FRAME_HEADER.size + length > size:
+                break  # Payload cut short
+            f.seek(length, os.SEEK_CUR)
+            end = f.tell()
+            frames += 1
+    return frames, end
+
+
+class Recorder:
+    """
+    Sampler hook appending every tick to a log file.
+    The file is only ever appended to; reopening an existing log first cuts
+    off a frame left incomplete by a crash, then continues after it.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, keyframe=DEFAULT_KEYFRAME, level=DEFAULT_LEVEL):
+        self.path = path
+        self.keyframe = keyframe
+        self.level = level
+        self.frames = 0
+        self.bytes_written = 0
+        self.raw_bytes = 0  # Pickled size before compression
+        self._since_key = None  # Ticks since the last key frame; None until the first
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            _, end = scan(path)
+            if end < os.path.getsize(path):
+                print(f"Dropping an incomplete frame at the end of {path}")
+                os.truncate(path, end)
+            self._file = open(path, "ab", buffering=0)
+        else:
+            self._file = open(path, "wb", buffering=0)
+            self._file.write(MAGIC)
+
+    def record(self, snapshot, processes=None, changes=None):
+        """
+        Sampler hook: append one frame for this tick.
+        """
+        frame = {"metrics": snapshot, "key": False}
+        if processes is not None:
+            if self._since_key is None or self._since_key + 1 >= self.keyframe:
+                frame["key"] = True
+                frame["added"] = pack_rows(processes)
+                self._since_key = 0
+            else:
+                frame["added"] = pack_rows(changes["added"])
+                frame["changed"] = pack_rows(changes["changed"])
+                frame["removed"] = list(changes["removed"])
+                self._since_key += 1
+        self.write(frame)
+
+    def write(self, frame):
+        raw = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+        payload = zlib.compress(raw, self.level)
+        # One write per frame, so a crash can only leave the last frame incomplete
+        self._file.write(FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.frames += 1
+        self.raw_bytes += len(raw)
+        self.bytes_written += FRAME_HEADER.size + len(payload)
+
+    def status(self):
+        return {
+            "path": self.path,
+            "frames": self.frames,
+            "bytes_written": self.bytes_written,
+            "compression_ratio": round(self.raw_bytes / self.bytes_written, 2) if self.bytes_written else None,
+        }
+
+    def close(self):
+        self._file.close()
+
+
+def read_frames(path):
+    """
+    Yield the decoded frames of a log in order.
+    Stops at an incomplete last frame; raises ValueError on a corrupt frame.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a recording (bad magic)")
+        index = 0
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            length, crc = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # Still being written, or cut short by a crash
+            if zlib.crc32(payload) != crc:
+                raise ValueError(f"Corrupt frame {index} in {path}")
+            yield pickle.loads(zlib.decompress(payload))
+            index += 1
+
+
+def info(path):
+    """
+    Frame count, time span and size of a log.
+    """
+    frames = keys = 0
+    first = last = None
+    for frame in read_frames(path):
+        frames += 1
+        keys += frame["key"]
+        timestamp = frame["metrics"].get("timestamp")
+        first = timestamp if first is None else first
+        last = timestamp
+    size = os.path.getsize(path)
+    return {
+        "path": path,
+        "frames": frames,
+        "key_frames": keys,
+        "start": first,
+        "end": last,
+        "seconds": round(last - first, 3) if frames else 0,
+        "bytes": size,
+        "bytes_per_frame": round(size / frames, 1) if frames else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a recorded tick log.")
+    parser.add_argument("command", choices=["info"])
+    parser.add_argument("path", help="log file")
+    args = parser.parse_args()
+    if args.command == "info":
+        for key, value in info(args.path).items():
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
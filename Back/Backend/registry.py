@@ -0,0 +1,143 @@
+"""
+Versioned model registry.
+
+Each version is a directory holding the model, the scaler and a manifest
+(parameters, features, metrics, latency). An index file names the current
+version, so switching or rolling back is a pointer change, not a retrain.
+
+    models/registry/
+        index.json          {"current": "v0002", "versions": [...]}
+        v0001/model.pkl, scaler.pkl, manifest.json
+        v0002/...
+
+Usage (from Back/Backend):
+    python registry.py list
+    python registry.py promote v0001
+"""
+# Import required libraries
+import json
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+
+# Registry location (override with MODEL_REGISTRY)
+DEFAULT_REGISTRY = os.environ.get(
+    "MODEL_REGISTRY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "registry")
+)
+
+INDEX_FILE = "index.json"
+MANIFEST_FILE = "manifest.json"
+MODEL_FILE = "model.pkl"
+SCALER_FILE = "scaler.pkl"
+
+
+def _write_json_atomic(path, data):
+    # Write to a temporary file and rename over the target so readers never see a partial file
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_index(registry_dir=DEFAULT_REGISTRY):
+    """
+    Return the registry index ({"current": ..., "versions": [...]}).
+    """
+    path = os.path.join(registry_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"current": None, "versions": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _next_version(registry_dir):
+    existing = [name for name in os.listdir(registry_dir) if name.startswith("v") and name[1:].isdigit()]
+    number = max((int(name[1:]) for name in existing), default=0) + 1
+    return f"v{number:04d}"
+
+
+def register(model, scaler, manifest, registry_dir=DEFAULT_REGISTRY, promote=True):
+    """
+    Store a model and scaler as a new version with its manifest.
+    The version directory is built under a temporary name and renamed into
+    place, so a half-written version is never visible. Returns the version.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=registry_dir, prefix=".staging-")
+    joblib.dump(model, os.path.join(staging, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+
+    version = _next_version(registry_dir)
+    manifest = dict(manifest, version=version, created_at=time.time())
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, os.path.join(registry_dir, version))
+
+    index = read_index(registry_dir)
+    index["versions"].append({
+        "version": version,
+        "created_at": manifest["created_at"],
+        "params": manifest.get("params"),
+        "features": manifest.get("features"),
+        "metrics": manifest.get("metrics"),
+    })
+    if promote or index["current"] is None:
+        index["current"] = version
+    _write_json_atomic(os.path.join(registry_dir, INDEX_FILE), index)
+    return version
+
+
+def set_current(version, registry_dir=DEFAULT_REGISTRY):
+    """
+    Point the registry at an existing version (promote or roll back).
+    """
+    if not os.path.isdir(os.path.join(registry_dir, version)):
+        raise ValueError(f"Unknown model version '{version}'")
+    index = read_index(registry_dir)
+    index["current"] = version
+    _write_json_atomic(os.path.join(registry_dir, INDEX_FILE), index)
+
+
+def current_version(registry_dir=DEFAULT_REGISTRY):
+    """
+    Name of the current version, or None if the registry is empty.
+    """
+    return read_index(registry_dir)["current"]
+
+
+def read_manifest(version, registry_dir=DEFAULT_REGISTRY):
+    with open(os.path.join(registry_dir, version, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def load_version(version=None, registry_dir=DEFAULT_REGISTRY, mmap_mode=None):
+    """
+    Load (model, scaler, manifest) for a version (the current one by default).
+    """
+    version = version or current_version(registry_dir)
+    if version is None:
+        raise FileNotFoundError(f"No model registered in {registry_dir}")
+    directory = os.path.join(registry_dir, version)
+    model = joblib.load(os.path.join(directory, MODEL_FILE), mmap_mode=mmap_mode)
+    scaler = joblib.load(os.path.join(directory, SCALER_FILE), mmap_mode=mmap_mode)
+    return model, scaler, read_manifest(version, registry_dir)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        index = read_index()
+        for entry in index["versions"]:
+            marker = "*" if entry["version"] == index["current"] else " "
+            print(f"{marker} {entry['version']}  params={entry['params']}  metrics={entry['metrics']}")
+    elif command == "promote" and len(sys.argv) == 3:
+        set_current(sys.argv[2])
+        print(f"Current model is now {sys.argv[2]}.")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,309 @@
+"""
+Replay a recorded tick log (see recorder.py) through detectors, as fast as
+the CPU allows rather than in wall-clock time.
+
+Use it to backtest a model from model.py against recorded telemetry, or to
+reproduce an incident deterministically: the same log and detectors always
+give the same verdicts.
+
+Usage (from Back/Backend):
+    python replay.py ticks.log                                # Registry current model
+    python replay.py ticks.log --engine forest:v0003 --engine online
+    python replay.py ticks.log --from 1760000000 --to 1760003600 --output result.json
+
+Engines: "forest" (the registry's current model, or the legacy models/*.pkl),
+"forest:vNNNN" (one registry version) and "online" (a fresh OnlineDetector).
+Any object with a sampler-style record(snapshot, processes, changes) method
+can be driven by replay() directly.
+"""
+# Import required libraries
+import argparse
+import heapq
+import json
+import time
+
+import numpy as np
+
+import registry
+from model_store import ModelStore, scale_features
+from online_detector import OnlineDetector
+from process_cache import diff_rows
+from recorder import read_frames, unpack_rows
+
+# Process rows scored per forest call (rows from many ticks share one call)
+BATCH_ROWS = 65536
+
+# Most anomalous process readings kept per engine
+DEFAULT_TOP = 20
+
+
+def replay(path, hooks, start=None, end=None):
+    """
+    Rebuild every tick of a log and call each hook(snapshot, processes, changes)
+    on it, like the live sampler does. `start`/`end` bound the timestamps;
+    a replay starting mid-log waits for the first key frame.
+    Returns the number of ticks replayed.
+    """
+    table = None  # pid -> row
+    ticks = 0
+    for frame in read_frames(path):
+        snapshot = frame["metrics"]
+        timestamp = snapshot.get("timestamp", 0)
+        if end is not None and timestamp > end:
+            break
+
+        processes, changes = None, None
+        if frame["key"]:
+            rows = unpack_rows(frame["added"])
+            changes = diff_rows(table or {}, rows)
+            table = {row['pid']: row for row in rows}
+        elif "added" in frame and table is not None:
+            added, changed = unpack_rows(frame["added"]), unpack_rows(frame["changed"])
+            removed = frame["removed"]
+            for pid in removed:
+                table.pop(pid, None)
+            for row in added:
+                table[row['pid']] = row
+            for row in changed:
+                table[row['pid']] = row
+            changes = {"added": added, "removed": removed, "changed": changed}
+        elif "added" in frame:
+            continue  # Delta before any key frame: nothing to apply it to
+        if table is not None and changes is not None:
+            processes = list(table.values())
+
+        if start is not None and timestamp < start:
+            continue
+        for hook in hooks:
+            hook(dict(snapshot), processes, changes)
+        ticks += 1
+    return ticks
+
+
+class Backtest:
+    """
+    Verdicts of one engine over a replay: system anomalies (also as incidents,
+    runs of consecutive anomalous ticks), agreement with the verdicts recorded
+    live, process anomalies and the most anomalous process readings.
+    """
+
+    def __init__(self, name, top=DEFAULT_TOP):
+        self.name = name
+        self.top = top
+        self.timestamps = []
+        self.recorded = []  # Live verdicts stored in the log
+        self.system_scores = []
+        self.process_rows = 0
+        self.process_anomalies = 0
+        self._top = []  # Min-heap of (-score, timestamp, pid, name)
+
+    def add_system(self, snapshot, score):
+        self.timestamps.append(snapshot.get("timestamp", 0))
+        self.recorded.append(snapshot.get("status"))
+        self.system_scores.append(score)
+
+    def add_processes(self, timestamps, pids, names, scores):
+        """
+        Count one batch of process scores and keep the lowest ones.
+        """
+        self.process_rows += len(scores)
+        self.process_anomalies += int((scores < 0).sum())
+        count = min(self.top, len(scores))
+        if count == 0:
+            return
+        for i in np.argpartition(scores, count - 1)[:count]:
+            item = (-float(scores[i]), timestamps[i], pids[i], names[i])
+            if len(self._top) < self.top:
+                heapq.heappush(self._top, item)
+            elif item > self._top[0]:
+                heapq.heapreplace(self._top, item)
+
+    def incidents(self, anomalous):
+        """
+        Runs of consecutive anomalous ticks as {start, end, ticks, min_score}.
+        """
+        runs = []
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], anomalous.astype(np.int8), [0]))))
+        scores = np.asarray(self.system_scores, dtype=float)
+        for first, stop in zip(edges[::2], edges[1::2]):
+            runs.append({
+                "start": self.timestamps[first],
+                "end": self.timestamps[stop - 1],
+                "ticks": int(stop - first),
+                "min_score": round(float(scores[first:stop].min()), 6),
+            })
+        return runs
+
+    def result(self):
+        scores = np.asarray(self.system_scores, dtype=float)
+        anomalous = scores < 0
+        recorded = np.array([s in ("Normal", "Anomaly") for s in self.recorded], dtype=bool)
+        agree = np.array([s == "Anomaly" for s in self.recorded], dtype=bool) == anomalous
+        return {
+            "engine": self.name,
+            "ticks": len(scores),
+            "system_anomalies": int(anomalous.sum()),
+            "agreement_with_recorded": round(float(agree[recorded].mean()), 4) if recorded.any() else None,
+            "incidents": self.incidents(anomalous),
+            "process_rows": self.process_rows,
+            "process_anomalies": self.process_anomalies,
+            "top_processes": [
+                {"timestamp": t, "pid": pid, "name": name, "anomaly_score": round(-score, 6)}
+                for score, t, pid, name in sorted(self._top, reverse=True)
+            ],
+        }
+
+
+class ForestEngine:
+    """
+    Replays ticks through a model bundle's scaler and model. System readings
+    and process rows are buffered and scored in large batches, since one
+    vectorized call is far cheaper than one call per tick.
+    """
+
+    def __init__(self, bundle, name="forest", processes=True, top=DEFAULT_TOP, batch_rows=BATCH_ROWS):
+        self.bundle = bundle
+        self.processes = processes
+        self.batch_rows = batch_rows
+        self.backtest = Backtest(name, top)
+        self._snapshots = []
+        self._pending = []  # (timestamp, pids, names, features) per tick
+        self._pending_rows = 0
+
+    def _score(self, features):
+        return self.bundle.detector.decision_function(scale_features(self.bundle, features))
+
+    def record(self, snapshot, processes=None, changes=None):
+        self._snapshots.append(snapshot)
+        if len(self._snapshots) >= self.batch_rows:
+            self._flush_system()
+        if self.processes and processes:
+            features = np.empty((len(processes), 2))
+            features[:, 0] = [p['cpu_percent'] for p in processes]
+            features[:, 1] = [p['memory_percent'] for p in processes]
+            self._pending.append((snapshot.get("timestamp", 0), [p['pid'] for p in processes],
+                                  [p['name'] for p in processes], features))
+            self._pending_rows += len(processes)
+            if self._pending_rows >= self.batch_rows:
+                self._flush_processes()
+
+    def _flush_system(self):
+        if not self._snapshots:
+            return
+        features = [[s["cpu_usage"], s["memory_usage"]] for s in self._snapshots]
+        for snapshot, score in zip(self._snapshots, self._score(features)):
+            self.backtest.add_system(snapshot, float(score))
+        self._snapshots = []
+
+    def _flush_processes(self):
+        if not self._pending:
+            return
+        scores = self._score(np.concatenate([item[3] for item in self._pending]))
+        timestamps, pids, names = [], [], []
+        for timestamp, tick_pids, tick_names, _ in self._pending:
+            timestamps.extend([timestamp] * len(tick_pids))
+            pids.extend(tick_pids)
+            names.extend(tick_names)
+        self.backtest.add_processes(timestamps, pids, names, scores)
+        self._pending, self._pending_rows = [], 0
+
+    def result(self):
+        self._flush_system()
+        self._flush_processes()
+        return self.backtest.result()
+
+
+class OnlineEngine:
+    """
+    Replays ticks through a fresh OnlineDetector, which learns as it goes,
+    exactly as it would have live.
+    """
+
+    def __init__(self, name="online", processes=True, top=DEFAULT_TOP):
+        self.detector = OnlineDetector()
+        self.processes = processes
+        self.backtest = Backtest(name, top)
+
+    def record(self, snapshot, processes=None, changes=None):
+        self.detector.record(snapshot, processes if self.processes else None, changes)
+        self.backtest.add_system(snapshot, self.detector.system_result["score"])
+        if self.processes and processes:
+            scores, _ = self.detector.score_processes(processes)
+            timestamp = snapshot.get("timestamp", 0)
+            self.backtest.add_processes([timestamp] * len(processes), [p['pid'] for p in processes],
+                                        [p['name'] for p in processes], scores)
+
+    def result(self):
+        result = self.backtest.result()
+        result["detector"] = self.detector.status()
+        return result
+
+
+def make_engine(spec, registry_dir=registry.DEFAULT_REGISTRY, processes=True, top=DEFAULT_TOP):
+    """
+    Build an engine from "forest", "forest:vNNNN" or "online".
+    """
+    kind, _, version = spec.partition(":")
+    if kind == "online":
+        return OnlineEngine(spec, processes=processes, top=top)
+    if kind == "forest":
+        store = ModelStore(registry_dir)
+        store.reload(version or None)
+        return ForestEngine(store.get(), name=f"forest:{store.get().version}", processes=processes, top=top)
+    raise ValueError(f"Unknown engine '{spec}'. Choose from: forest, forest:vNNNN, online")
+
+
+def backtest(path, engines, start=None, end=None):
+    """
+    Replay a log once through every engine and return their results.
+    """
+    began = time.perf_counter()
+    ticks = replay(path, [engine.record for engine in engines], start=start, end=end)
+    results = [engine.result() for engine in engines]
+    elapsed = time.perf_counter() - began
+
+    timestamps = engines[0].backtest.timestamps if engines else []
+    span = timestamps[-1] - timestamps[0] if timestamps else 0.0
+    return {
+        "log": path,
+        "ticks": ticks,
+        "seconds": round(elapsed, 3),
+        "ticks_per_second": round(ticks / elapsed, 1) if elapsed > 0 else None,
+        "speedup": round(span / elapsed, 1) if elapsed > 0 and span else None,  # Recorded time / replay time
+        "engines": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest detectors against a recorded tick log.")
+    parser.add_argument("path", help="log written with RECORD_PATH")
+    parser.add_argument("--engine", action="append", dest="engines",
+                        help="forest, forest:vNNNN or online (repeat to compare; default: forest)")
+    parser.add_argument("--from", dest="start", type=float, help="first timestamp to replay (epoch seconds)")
+    parser.add_argument("--to", dest="end", type=float, help="last timestamp to replay (epoch seconds)")
+    parser.add_argument("--no-processes", action="store_true", help="score system metrics only")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="anomalous process readings to report")
+    parser.add_argument("--registry", default=registry.DEFAULT_REGISTRY, help="model registry directory")
+    parser.add_argument("--output", help="write the full result as JSON to this file")
+    args = parser.parse_args()
+
+    engines = [make_engine(spec, args.registry, processes=not args.no_processes, top=args.top)
+               for spec in args.engines or ["forest"]]
+    result = backtest(args.path, engines, start=args.start, end=args.end)
+
+    print(f"Replayed {result['ticks']} ticks in {result['seconds']}s "
+          f"({result['ticks_per_second']} ticks/s, {result['speedup']}x real time)")
+    for engine in result["engines"]:
+        agreement = engine["agreement_with_recorded"]
+        print(f"{engine['engine']}: {engine['system_anomalies']} anomalous ticks in "
+              f"{len(engine['incidents'])} incidents, {engine['process_anomalies']} of "
+              f"{engine['process_rows']} process readings anomalous"
+              + (f", {agreement:.1%} agreement with the live verdicts" if agreement is not None else ""))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Import required libraries
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+
+# Seconds a cached response stays fresh (override with RESPONSE_CACHE_TTL)
+DEFAULT_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "1.0"))
+
+# Maximum number of cached responses before the least recently used is evicted
+DEFAULT_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+
+
+class _Flight:
+    """
+    One in-flight computation that concurrent callers wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    TTL cache with request coalescing (single flight).
+    Concurrent callers asking for the same key while it is being computed wait
+    for that one computation and share its result. Entries expire after their
+    TTL; when the cache is full the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._flights = {}  # key -> _Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, ttl=None, store=None):
+        """
+        Return the cached value for `key`, or compute it once for all concurrent callers.
+        `store(value)` can veto caching a result (e.g. error responses).
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]  # Expired
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and ttl > 0 and (store is None or store(flight.value)):
+                    self._entries[key] = (time.monotonic() + ttl, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            flight.done.set()
+        return flight.value
+
+    def cached(self, ttl=None):
+        """
+        Decorator for Flask views: cache the response per path and query string.
+        Only 200 responses are kept; streamed responses should not be decorated.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                def compute():
+                    response = make_response(view(*args, **kwargs))
+                    return response.get_data(), response.status_code, list(response.headers.items())
+
+                body, status, headers = self.get_or_compute(
+                    request.full_path, compute, ttl=ttl, store=lambda value: value[1] == 200
+                )
+                # Build a fresh response so per-request headers (e.g. CORS) are not shared
+                return Response(body, status=status, headers=headers)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Hit/miss counters and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Shared cache for the sampling endpoints
+response_cache = ResponseCache()
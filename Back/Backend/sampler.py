@@ -0,0 +1,197 @@
+# Import required libraries
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import psutil
+
+from instrumentation import timed_stage
+
+# Default sampling interval in seconds (override with SAMPLER_INTERVAL)
+DEFAULT_INTERVAL = float(os.environ.get("SAMPLER_INTERVAL", "1.0"))
+
+# Number of snapshots kept in the ring buffer (override with SAMPLER_HISTORY)
+DEFAULT_HISTORY = int(os.environ.get("SAMPLER_HISTORY", "300"))
+
+
+@timed_stage("collect_system")
+def collect_system_metrics():
+    """
+    Take one non-blocking reading of CPU, memory and disk usage.
+    CPU usage is measured since the previous call, so the sampler's
+    interval acts as the measurement window.
+    """
+    return {
+        "cpu_usage": psutil.cpu_percent(interval=None),
+        "memory_usage": psutil.virtual_memory().percent,
+        "disk_usage": psutil.disk_usage('/').percent,
+    }
+
+
+class MetricsSampler:
+    """
+    Background thread that samples system metrics on a fixed schedule.
+    Each snapshot is stored in a ring buffer so request handlers can answer
+    from the latest reading instead of sampling inside the request.
+    """
+
+    def __init__(self, classify=None, process_cache=None, interval=DEFAULT_INTERVAL, history=DEFAULT_HISTORY,
+                 collect=collect_system_metrics, governor=None):
+        self.classify = classify  # Callable (cpu, memory) -> "Normal" / "Anomaly"
+        self.collect = collect  # Callable returning the system metrics dict for one tick
+        self.process_cache = process_cache  # Optional ProcessCache refreshed on every tick
+        self.governor = governor  # Optional SamplingGovernor setting the cadence
+        self._interval = interval
+        self.buffer = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._subscribers = set()
+        self._hooks = []
+        self.ticks = 0
+
+    def start(self):
+        """
+        Start the sampling thread (calling it again is a no-op).
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # Prime cpu_percent so the first real sample covers a full interval
+            psutil.cpu_percent(interval=None)
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    @property
+    def interval(self):
+        """
+        Seconds between ticks (the governor's current interval, if there is one).
+        """
+        return self.governor.interval if self.governor is not None else self._interval
+
+    def stop(self):
+        """
+        Ask the sampling thread to exit and wait for it.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        next_tick = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            try:
+                self.sample()
+            except Exception as e:
+                # Keep sampling even if one reading fails
+                print(f"Error sampling system metrics: {e}")
+            next_tick += self.interval
+            # Skip missed ticks instead of bursting to catch up
+            if next_tick < time.monotonic():
+                next_tick = time.monotonic() + self.interval
+
+    def sample(self):
+        """
+        Take one snapshot and append it to the ring buffer.
+        The process cache (if any) is refreshed on the same tick, or only on
+        the ticks the governor picks; hooks get processes=None on the others.
+        """
+        started = time.thread_time()
+        snapshot = self.collect()
+        if self.classify is not None:
+            snapshot["status"] = self.classify(snapshot["cpu_usage"], snapshot["memory_usage"])
+        snapshot.setdefault("timestamp", time.time())
+
+        processes, changes = None, None
+        refresh = self.process_cache is not None and (self.governor is None or self.governor.refresh_due())
+        if refresh:
+            processes, changes = self._refresh_processes()
+        if self.process_cache is not None:
+            snapshot["process_count"] = len(self.process_cache)
+
+        with self._lock:
+            self.buffer.append(snapshot)
+            self.ticks += 1
+            tick = self.ticks
+        self._ready.set()
+        for hook in self._hooks:
+            try:
+                hook(snapshot, processes, changes)
+            except Exception as e:
+                print(f"Error in sampler hook {getattr(hook, '__name__', hook)}: {e}")
+        if self.governor is not None:
+            # Thread CPU time: only this thread's work counts, not time waiting or other threads
+            self.governor.observe(snapshot, time.thread_time() - started, refresh, processes, changes)
+        self._publish({"tick": tick, "metrics": snapshot, "processes": changes})
+        return snapshot
+
+    def _refresh_processes(self):
+        """
+        Refresh the process cache for this tick; returns (processes, changes).
+        """
+        return self.process_cache.tick()
+
+    def add_hook(self, hook):
+        """
+        Call `hook(snapshot, processes, changes)` on the sampler thread after every tick.
+        """
+        self._hooks.append(hook)
+
+    def subscribe(self, maxsize=10):
+        """
+        Register a listener and return the queue that receives every new tick.
+        All listeners share this sampler, so adding clients adds no sampling work.
+        """
+        listener = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.add(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        """
+        Stop delivering ticks to a listener returned by subscribe().
+        """
+        with self._lock:
+            self._subscribers.discard(listener)
+
+    def _publish(self, event):
+        with self._lock:
+            listeners = list(self._subscribers)
+        for listener in listeners:
+            try:
+                listener.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop its oldest tick rather than block the sampler
+                try:
+                    listener.get_nowait()
+                    listener.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def latest(self, timeout=None):
+        """
+        Return the most recent snapshot, waiting up to `timeout` seconds
+        for the first one. Returns None if nothing has been sampled yet.
+        """
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            return dict(self.buffer[-1])
+
+    def snapshots(self):
+        """
+        Return a copy of every snapshot currently in the ring buffer (oldest first).
+        """
+        with self._lock:
+            return list(self.buffer)
+
+
+def snapshot_age(snapshot):
+    """
+    Seconds elapsed since the snapshot was taken.
+    """
+    return round(time.time() - snapshot["timestamp"], 3)
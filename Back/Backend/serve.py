@@ -0,0 +1,106 @@
+"""
+Production serving mode: one collector process and N HTTP worker processes.
+
+The collector process runs the only sampler (psutil / procfs collection and
+model classification) and publishes every tick to a shared-memory segment
+(see shared_snapshot.py). Workers share one listening socket, answer
+requests, and read the snapshots instead of sampling, so collection cost
+stays the same however many workers run.
+
+Usage (from Back/Backend):
+    python serve.py --workers 4 --host 0.0.0.0 --port 5000
+
+The collector also publishes each refresh's process changes, epoch and
+version, so workers neither diff the table nor version it themselves and
+/api/processes deltas are valid whichever worker answers. History, recording
+(HISTORY_PATH, RECORD_PATH) and the online detector run in the collector
+process only; workers answer /api/history with 404 and reject ?engine=online.
+Cluster mode (CLUSTER_LISTEN, see cluster.py) needs the single-process app.
+The collector's sampling governor (SAMPLING_BUDGET, see governor.py) paces the
+ticks every worker sees; /api/sampling is answered by a single-process app only.
+"""
+# Import required libraries
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from shared_snapshot import SnapshotBuffer
+
+
+def run_collector(shm_name):
+    """
+    Collector process: the app's own sampler plus a hook publishing each tick.
+    """
+    os.environ.pop("SNAPSHOT_SHM", None)
+    os.environ.pop("CLUSTER_LISTEN", None)  # Workers could not serve the cluster view
+    import app
+    buffer = SnapshotBuffer.attach(shm_name, process_cache=app.process_cache)
+    app.sampler.add_hook(buffer.publish_hook)
+    signal.sigwait({signal.SIGTERM, signal.SIGINT})
+
+
+def run_worker(shm_name, host, port, fd, threads):
+    """
+    Worker process: serve the Flask app on the inherited listening socket.
+    """
+    from werkzeug.serving import make_server
+
+    # Shutdown is driven by the parent's SIGTERM; Ctrl-C reaches the parent too
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+
+    os.environ["SNAPSHOT_SHM"] = shm_name
+    import app
+    make_server(host, port, app.app, threaded=threads, fd=fd).serve_forever()
+
+
+def serve(host="127.0.0.1", port=5000, workers=None, threads=True):
+    """
+    Start the collector and `workers` HTTP workers; block until interrupted.
+    """
+    workers = workers or os.cpu_count()
+    context = multiprocessing.get_context("fork")
+    buffer = SnapshotBuffer.create()
+
+    listener = socket.create_server((host, port), reuse_port=False, backlog=1024)
+    listener.set_inheritable(True)
+
+    children = [context.Process(target=run_collector, args=(buffer.name,), name="collector")]
+    children += [context.Process(target=run_worker, args=(buffer.name, host, port, listener.fileno(), threads),
+                                 name=f"worker-{i}") for i in range(workers)]
+
+    # Block the signals in the parent while forking so children can sigwait on them
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM, signal.SIGINT})
+    for child in children:
+        child.start()
+    print(f"Serving on http://{host}:{port} with {workers} workers and one collector (shm {buffer.name}).")
+    try:
+        signal.sigwait({signal.SIGTERM, signal.SIGINT})
+    finally:
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+        deadline = time.monotonic() + 5
+        for child in children:
+            child.join(max(0.0, deadline - time.monotonic()))
+            if child.is_alive():
+                child.kill()
+        listener.close()
+        buffer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="HTTP worker processes (default: CPU count)")
+    parser.add_argument("--no-threads", action="store_true", help="one request at a time per worker")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, threads=not args.no_threads)
+
+
+if __name__ == "__main__":
+    main()
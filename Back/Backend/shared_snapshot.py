@@ -0,0 +1,188 @@
+# Import required libraries
+import os
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory
+
+from sampler import MetricsSampler
+
+# Bytes reserved per snapshot slot (override with SNAPSHOT_SHM_SIZE, in MB)
+DEFAULT_SLOT_SIZE = int(float(os.environ.get("SNAPSHOT_SHM_SIZE", "8")) * 1024 * 1024)
+
+# Seconds between checks for a new snapshot in worker processes
+POLL_INTERVAL = 0.02
+
+# Header: sequence number, slot size, then the payload length of each slot
+HEADER = struct.Struct("=QQQQ")
+HEADER_SIZE = 64  # Slots start on their own cache line
+
+
+class SnapshotBuffer:
+    """
+    Latest sampler snapshot in a shared-memory segment: one writer (the
+    collector process), any number of reader processes.
+
+    The segment holds two slots (double buffer) and a sequence number used as
+    a seqlock. The sequence is odd while a slot is being written and advances
+    by 2 per publish; publish k writes slot k % 2, so the writer never touches
+    the slot readers are on. A read is valid if the sequence was even when it
+    started and advanced at most one publish by the time it finished.
+    """
+
+    def __init__(self, shm, owner=False, process_cache=None):
+        self.shm = shm
+        self.owner = owner
+        self.slot_size = HEADER.unpack_from(shm.buf, 0)[1]
+        self.process_cache = process_cache  # The publisher's cache, for its epoch and version
+        self.frame = None  # Last frame read by this process
+        self._frame_seq = None
+        self._processes = []  # Last process table published
+        self._version = None  # Cache version of the last table published
+
+    @classmethod
+    def create(cls, name=None, slot_size=DEFAULT_SLOT_SIZE):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + 2 * slot_size)
+        HEADER.pack_into(shm.buf, 0, 0, slot_size, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name, process_cache=None):
+        # serve.py forks the readers, so they share the creator's resource
+        # tracker and the segment is unlinked once, by the creator
+        return cls(shared_memory.SharedMemory(name=name), process_cache=process_cache)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def sequence(self):
+        return struct.unpack_from("=Q", self.shm.buf, 0)[0]
+
+    def publish(self, frame):
+        """
+        Write a frame (any picklable object) to the free slot and make it current.
+        """
+        payload = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.slot_size:
+            raise ValueError(f"Snapshot of {len(payload)} bytes exceeds the {self.slot_size}-byte slot "
+                             f"(raise SNAPSHOT_SHM_SIZE)")
+        seq = self.sequence()
+        slot = (seq // 2 + 1) % 2
+        start = HEADER_SIZE + slot * self.slot_size
+        buf = self.shm.buf
+        struct.pack_into("=Q", buf, 0, seq + 1)  # Odd: publish in progress
+        buf[start:start + len(payload)] = payload
+        struct.pack_into("=Q", buf, 16 + 8 * slot, len(payload))
+        struct.pack_into("=Q", buf, 0, seq + 2)
+
+    def read(self, retries=100):
+        """
+        Return the current frame, or None if nothing was published yet.
+        Frames are unpickled straight from the shared slot (no intermediate
+        copy) and only once per publish; later calls reuse the decoded frame.
+        """
+        buf = self.shm.buf
+        for _ in range(retries):
+            seq = self.sequence()
+            if seq == 1:
+                # First publish still in progress
+                time.sleep(0.001)
+                continue
+            seq -= seq % 2  # A publish in progress writes the other slot
+            if seq == 0:
+                return None
+            if seq == self._frame_seq:
+                return self.frame
+            slot = (seq // 2) % 2
+            length = struct.unpack_from("=Q", buf, 16 + 8 * slot)[0]
+            start = HEADER_SIZE + slot * self.slot_size
+            try:
+                frame = pickle.loads(buf[start:start + length])
+            except Exception:
+                frame = None
+            if self.sequence() <= seq + 2 and frame is not None:
+                self.frame, self._frame_seq = frame, seq
+                return frame
+        raise RuntimeError("Could not read a consistent snapshot")
+
+    def publish_hook(self, snapshot, processes=None, changes=None):
+        """
+        Sampler hook for the collector process: publish every tick.
+        Ticks without a process refresh republish the last table with
+        changes None. Refreshes also carry their changes and the cache's
+        epoch and version, so workers never diff or version the table again.
+        """
+        frame = {"metrics": snapshot, "processes": self._processes, "changes": None}
+        if processes is not None:
+            cache = self.process_cache
+            frame.update(processes=processes, changes=changes, epoch=cache.epoch,
+                         version=cache.version, base=self._version)
+            self._processes, self._version = processes, cache.version
+        self.publish(frame)
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedMemoryCollector:
+    """
+    Process collector for worker processes: returns the rows the collector
+    process published instead of reading /proc or calling psutil.
+    """
+
+    name = "shared-memory"
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def collect(self):
+        frame = self.buffer.frame or self.buffer.read()
+        return frame["processes"] if frame else []
+
+
+class SharedMemorySampler(MetricsSampler):
+    """
+    MetricsSampler for worker processes. Instead of sampling on a schedule it
+    waits for the collector process to publish, then runs the usual tick
+    (ring buffer, hooks, stream subscribers) on that data. The process cache
+    takes the collector's table, changes and versions as published (see
+    ProcessCache.follow), so adding workers adds no sampling or diffing work.
+    """
+
+    def __init__(self, name, process_cache=None, **kwargs):
+        self.shared = SnapshotBuffer.attach(name)
+        if process_cache is not None:
+            # Only reads before the first frame collect; after that the
+            # published frames alone keep the table current
+            process_cache.collector = SharedMemoryCollector(self.shared)
+            process_cache.max_age = float("inf")
+        super().__init__(classify=None, process_cache=process_cache, collect=self._collect, **kwargs)
+
+    def _collect(self):
+        frame = self.shared.read()
+        if frame is None:
+            raise RuntimeError("No snapshot published yet")
+        return dict(frame["metrics"])
+
+    def _refresh_processes(self):
+        frame = self.shared.frame  # The frame _collect() read for this tick
+        if frame["changes"] is None:
+            return None, None
+        changes = self.process_cache.follow(frame["processes"], frame["changes"], frame["epoch"],
+                                            frame["version"], frame["base"])
+        return frame["processes"], changes
+
+    def _run(self):
+        last = 0  # Nothing published yet
+        while not self._stop.wait(POLL_INTERVAL):
+            seq = self.shared.sequence()
+            if seq == last or seq % 2:
+                continue
+            try:
+                self.sample()
+                last = seq
+            except Exception as e:
+                print(f"Error reading shared snapshot: {e}")
@@ -0,0 +1,6 @@
+# Import required libraries
+import os
+import sys
+
+# Tests import the backend modules directly, like the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
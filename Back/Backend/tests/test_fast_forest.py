@@ -0,0 +1,49 @@
+# Import required libraries
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from fast_forest import FlatIsolationForest, check_parity
+
+TOLERANCE = 1e-9
+
+
+def fitted_forest(n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 1, size=(500, n_features))
+    return IsolationForest(n_estimators=25, max_samples=64, contamination=0.1, random_state=seed).fit(X)
+
+
+def parity_rows(forest, seed=1):
+    """
+    Random rows around the training range plus rows sitting exactly on every
+    split threshold, where an off-by-one comparison sends a row the wrong way.
+    """
+    rng = np.random.default_rng(seed)
+    random_rows = rng.uniform(-0.5, 1.5, size=(2000, forest.n_features_in_))
+    on_threshold = np.repeat(forest.threshold[:, None], forest.n_features_in_, axis=1).astype(np.float32)
+    return np.vstack([random_rows, on_threshold])
+
+
+@pytest.mark.parametrize("n_features", [1, 2])
+@pytest.mark.parametrize("lookup", [True, False])
+def test_flat_forest_matches_sklearn(n_features, lookup):
+    model = fitted_forest(n_features)
+    forest = FlatIsolationForest.from_sklearn(model)
+    if not lookup:
+        forest.lookup = None  # Force the tree walk instead of the lookup table
+
+    max_diff, labels_match = check_parity(model, forest, parity_rows(forest))
+    assert labels_match
+    assert max_diff <= TOLERANCE
+
+
+def test_rows_on_the_decision_threshold_get_the_same_label():
+    model = fitted_forest(2)
+    forest = FlatIsolationForest.from_sklearn(model)
+    rows = parity_rows(forest)
+    # The rows scoring closest to the offset are the ones a tiny score drift would flip
+    nearest = rows[np.argsort(np.abs(model.decision_function(rows)))[:50]]
+
+    assert np.array_equal(model.predict(nearest), forest.predict(nearest))
+    assert np.abs(model.decision_function(nearest) - forest.decision_function(nearest)).max() <= TOLERANCE
@@ -0,0 +1,70 @@
+# Import required libraries
+import numpy as np
+import pytest
+
+import governor as governor_module
+from governor import MAX_PROCESS_INTERVAL, SamplingGovernor
+from online_detector import OnlineDetector
+
+PROCESSES = [{"pid": pid} for pid in range(200)]
+NO_CHANGES = {"added": [], "removed": [], "changed": []}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Monotonic time as a one-item list; feed() advances it one second per tick.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(governor_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_governor():
+    detector = OnlineDetector()
+
+    def score():
+        result = detector.system_result
+        return None if result is None or result["warming_up"] else result["score"]
+
+    return SamplingGovernor(budget=0.01, interval=1.0, score=score), detector
+
+
+def feed(governor, detector, clock, cpu_values):
+    """
+    Run one-second ticks through the detector and the governor with a small,
+    steady cost, refreshing the process table whenever the governor says so.
+    """
+    for cpu in cpu_values:
+        clock[0] += 1.0
+        snapshot = {"cpu_usage": cpu, "memory_usage": 40.0, "disk_usage": 50.0}
+        refreshed = governor.refresh_due()
+        detector.record(snapshot)
+        governor.observe(snapshot, 0.0001 if refreshed else 0.00005, refreshed,
+                         PROCESSES if refreshed else None, NO_CHANGES if refreshed else None)
+
+
+def quiet(ticks, seed=0):
+    return np.clip(np.random.default_rng(seed).normal(3.0, 1.0, ticks), 0, None)
+
+
+def test_quiet_feed_backs_off(clock):
+    governor, detector = make_governor()
+    feed(governor, detector, clock, quiet(600))
+
+    assert governor.reason == "quiet"
+    assert governor.process_interval == MAX_PROCESS_INTERVAL
+    assert governor.process_ticks < 100
+
+
+def test_new_alert_refreshes_on_the_next_tick(clock):
+    governor, detector = make_governor()
+    feed(governor, detector, clock, quiet(600))
+    while governor.refresh_due():
+        feed(governor, detector, clock, quiet(1))
+    assert governor.process_interval == MAX_PROCESS_INTERVAL
+
+    # A CPU spike the detector calls an anomaly, on a tick without a refresh
+    feed(governor, detector, clock, [95.0])
+    assert governor.reason.startswith("anomaly")
+    assert governor.refresh_due()
@@ -0,0 +1,29 @@
+# Import required libraries
+from online_detector import OnlineDetector
+
+SNAPSHOT = {"cpu_usage": 5.0, "memory_usage": 40.0, "disk_usage": 50.0}
+
+
+def make_processes(pids):
+    return [{"pid": pid, "create_time": 1.0, "cpu_percent": 1.0, "memory_percent": 2.0} for pid in pids]
+
+
+def test_more_processes_than_slots_never_share_a_slot():
+    detector = OnlineDetector(max_processes=4)
+    detector.record(SNAPSHOT, make_processes(range(6)))
+
+    slots = [slot for _, slot in detector._slots.values()]
+    assert len(slots) == len(set(slots)) == 4
+    assert len(detector.process_scores) == 4
+
+
+def test_new_processes_evict_only_processes_missing_from_the_tick():
+    detector = OnlineDetector(max_processes=4)
+    detector.record(SNAPSHOT, make_processes([3, 4, 1, 2]))
+    # 1 and 2 exited without a removal; 3 and 4 are still running
+    detector.record(SNAPSHOT, make_processes([5, 6, 3, 4]))
+
+    assert set(detector._slots) == {3, 4, 5, 6}
+    assert detector.process_stats.count[detector._slots[3][1]] == 2
+    slots = [slot for _, slot in detector._slots.values()]
+    assert len(set(slots)) == 4
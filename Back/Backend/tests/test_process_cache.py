@@ -0,0 +1,77 @@
+# Import required libraries
+from process_cache import ProcessCache
+
+
+class ScriptedCollector:
+    """
+    Collector returning a fixed sequence of process tables, one per collect().
+    """
+
+    def __init__(self, *tables):
+        self.tables = list(tables)
+
+    def collect(self):
+        return [dict(row) for row in self.tables.pop(0)]
+
+
+def row(pid, cpu=0.0, create_time=1.0):
+    return {"pid": pid, "ppid": 1, "name": f"p{pid}", "status": "running",
+            "create_time": create_time, "cpu_percent": cpu, "memory_percent": 0.5}
+
+
+def pids(rows):
+    return sorted(r["pid"] for r in rows)
+
+
+def test_tick_merges_changes_from_reads_in_between():
+    cache = ProcessCache(ScriptedCollector(
+        [row(1), row(2)],
+        [row(1), row(2, cpu=5.0), row(3)],  # Refreshed by a stale read, not the sampler
+        [row(1), row(2, cpu=5.0), row(3), row(4)],
+    ))
+    cache.tick()
+    cache.processes(max_age=0)
+    rows, changes = cache.tick()
+
+    assert pids(rows) == [1, 2, 3, 4]
+    assert pids(changes["added"]) == [3, 4]
+    assert pids(changes["changed"]) == [2]
+    assert changes["removed"] == []
+
+
+def test_tick_without_reads_reuses_the_refresh_diff():
+    cache = ProcessCache(ScriptedCollector(
+        [row(1), row(2)],
+        [row(1), row(3)],
+    ))
+    cache.tick()
+    rows, changes = cache.tick()
+
+    assert changes is cache.last_changes
+    assert changes["removed"] == [2]
+    assert pids(changes["added"]) == [3]
+
+
+def test_follow_takes_published_versions_and_catches_up_after_a_gap():
+    publisher = ProcessCache(ScriptedCollector(
+        [row(1), row(2)],
+        [row(1), row(2, cpu=5.0)],
+        [row(1), row(3)],
+        [row(1), row(3), row(4)],
+    ))
+    worker = ProcessCache(ScriptedCollector())
+
+    rows, changes = publisher.tick()
+    worker.follow(rows, changes, publisher.epoch, publisher.version, None)
+    first = publisher.version
+    rows, changes = publisher.tick()
+    assert worker.follow(rows, changes, publisher.epoch, publisher.version, first) is changes
+
+    publisher.tick()  # A frame the worker never read
+    missed = publisher.version
+    rows, changes = publisher.tick()
+    caught_up = worker.follow(rows, changes, publisher.epoch, publisher.version, missed)
+    assert caught_up["removed"] == [2]
+    assert pids(caught_up["added"]) == [3, 4]
+    assert (worker.epoch, worker.version) == (publisher.epoch, publisher.version)
+    assert worker.changes_since(first) == publisher.changes_since(first)
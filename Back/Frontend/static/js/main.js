@@ -154,8 +154,34 @@ document.addEventListener("DOMContentLoaded", () => {
         console.error(`Error fetching ${section}:`, message);
     }
 
-    // Initialize monitoring
-    function startMonitoring() {
+    // Subscribe to the server-push stream; fall back to polling if it is unavailable
+    function startStreaming() {
+        if (!window.EventSource) {
+            return false;
+        }
+        const source = new EventSource("/api/stream");
+        const onMessage = event => {
+            const data = JSON.parse(event.data);
+            if (data.metrics) {
+                updateMetrics(data.metrics);
+                updateAnomalies(data.metrics);
+            }
+        };
+        source.addEventListener("snapshot", onMessage);
+        source.addEventListener("tick", onMessage);
+        source.onerror = () => {
+            // EventSource reconnects on its own; it only closes for good on a non-stream response
+            if (source.readyState === EventSource.CLOSED) {
+                handleFetchError("Stream closed", "metrics");
+                startPolling();
+            }
+        };
+        window.addEventListener("beforeunload", () => source.close());
+        return true;
+    }
+
+    // Initialize polling
+    function startPolling() {
         clearTimeout(metricsTimeout);
         clearTimeout(anomaliesTimeout);
         fetchSystemMetrics();
@@ -165,7 +191,9 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     let metricsTimeout, anomaliesTimeout;
-    startMonitoring();
+    if (!startStreaming()) {
+        startPolling();
+    }
 
     window.addEventListener("beforeunload", () => {
         clearTimeout(metricsTimeout);